@@ -3,14 +3,27 @@ ASGI config for MachineFixture project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Deployment (machine polling endpoints are async views, one worker holds many connections):
+
+    gunicorn MachineFixture.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+    # or: uvicorn MachineFixture.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'MachineFixture.settings')
+# Settings drop the sync-only WhiteNoise middleware under ASGI - otherwise every request hops to a thread
+os.environ.setdefault('DJANGO_ASGI', '1')
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    # WhiteNoise served static files only from finders (DEBUG, no STATIC_ROOT) - same here
+    application = ASGIStaticFilesHandler(application)
@@ -86,6 +86,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# WhiteNoise is sync-only - under ASGI (MachineFixture/asgi.py) it would push every request through a thread
+if os.getenv('DJANGO_ASGI'):
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 STATIC_URL = "/static/"
 
@@ -110,6 +114,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'MachineFixture.wsgi.application'
+ASGI_APPLICATION = 'MachineFixture.asgi.application'
 
 
 CORS_ALLOW_METHODS = [
@@ -140,6 +145,18 @@ DATABASES = {
     }
 }
 
+REDIS_HOST = os.getenv('REDIS_HOST', '127.0.0.1')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+
+# Shared between gunicorn/daphne workers (kill snapshots, compiled process graphs, process settings).
+# Redis: add() is SET NX and incr() is INCRBY - atomic across workers, no culling of generation keys
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/1',
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -207,6 +224,13 @@ EVENTSTREAM_CHANNELS = {
     "fixture-updates": lambda request: True,
 }
 
+# send_event goes through Redis pub/sub, so streams held by other workers get the event too
+EVENTSTREAM_REDIS = {
+    'host': REDIS_HOST,
+    'port': REDIS_PORT,
+    'db': 2,
+}
+
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "10.10.10.34"
@@ -21,6 +21,7 @@ from rest_framework.authentication import SessionAuthentication
 
 from .models import Fixture, CounterSumFromLastMaint, CounterHistory, FullCounter
 from .serializers import UpdateCreateCounter, FixtureSerializer, FullInfoFixtureSerializer
+from global_app.async_views import MachineAsyncView
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -119,20 +120,22 @@ class GetInfoViewSet(viewsets.ReadOnlyModelViewSet):
             ),
         )
     
-class CheckExceedCyclesLimit(GenericAPIView):
+class CheckExceedCyclesLimit(MachineAsyncView):
     serializer_class = UpdateCreateCounter
 
-    def post(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        fixture_name = serializer.validated_data['fixture_name']
+    async def post(self, request, *args, **kwargs):
+        data, error = self.validate(request)
+        if error:
+            return error
+        fixture_name = data['fixture_name']
 
         try:
-            machine = Fixture.objects.get(name=fixture_name)
-        except:
-            return Response({"error": "Fixture doesnt exist"})
+            # W async nie ma leniwego ładowania FK - licznik od razu w zapytaniu
+            machine = await Fixture.objects.select_related('counter_last_maint').aget(name=fixture_name)
+        except Fixture.DoesNotExist:
+            return self.respond({"error": "Fixture doesnt exist"})
 
         if machine.counter_last_maint.counter >= machine.cycles_limit:
-            return Response({"fail": "Limit exceeded stop machine"})
+            return self.respond({"fail": "Limit exceeded stop machine"})
         else:
-            return Response({"pass": "Can produce"})
+            return self.respond({"pass": "Can produce"})
@@ -31,6 +31,7 @@ admin.site.register(ProductProcessFields)
 
 admin.site.register(DataBasesSpiMapNew)
 admin.site.register(DataBasesSpiAsmMapNew)
+admin.site.register(PlaceOccupancy)
 
 @admin.register(LogFromMistake)
 class LogFromMistakeAdmin(admin.ModelAdmin):
@@ -0,0 +1,82 @@
+"""
+Mikrobenchmark silnika parserów SN na korpusie prawdziwych formatów etykiet.
+
+    python -m checkprocess.benchmarks.parsers_benchmark [--number 20000]
+
+Nie wymaga bazy ani ustawień Django - parsery to czysty Python.
+"""
+import argparse
+import timeit
+
+from checkprocess.parsers import detect_parser_type, parse_sn, parse_many, _parse_sn
+
+
+CORPUS = [
+    # (full_sn, oczekiwany typ parsera)
+    ("[)>@06@1P262298@1T52916365@3SM5291636522322@Q12KGM000@6D20250702@14D21251229@@", 'alpha_parser'),
+    ("[)>@06@1P262298@1T52916365@3SJ5291636522323@Q500GM000@6D20250702@14D20251229@@", 'alpha_parser'),
+    ("(V)AIM(P)40900900(S)2503AH10-0417(D)20250312(E)20250912(Q)6 KG", 'aim_parser'),
+    ("(V)AIM(P)40900900(S)2503AH10-0418(D)20250312(E)20250912(Q)500 G", 'aim_parser'),
+    ("(V)AIM(P)62420118330(S)2504V9-1102(D)20250401(E)20251001(Q)6 kg", 'aim-v9-parser'),
+    ("(V)MACDERMID ALPHA(P)ITG-220(S)MD77120(D)20250115(E)20250715(Q)6 KG", 'italgas'),
+    ("(V)heraeus(P)F640(S)HE-55123(D)20250201(E)20250801(Q)500 G", 'heraus_parser'),
+    ("(V)Heraeus Electronics(P)F640(S)HE-55124(D)20250201(E)20250801(Q)6 Kg", 'heraus_parser'),
+    ("(V)LOCTITE(P)SE4420(S)KL-0091(D)20250105(E)20260105(Q)330 ML", 'klej_parser'),
+    ("120325D.520-0012", 'dek_parser'),
+    ("150125E.420-0007", 'ekra_parser'),
+    ("S-0455-TOP", 'sito_default'),
+    ("T-1021-BOT", 'sito_default'),
+    ("#SITO-77", 'sito_default'),
+]
+
+
+def _per_op_us(stmt, number):
+    return timeit.timeit(stmt, number=number) / number / len(CORPUS) * 1e6
+
+
+def run(number):
+    full_sns = [full_sn for full_sn, parser_type in CORPUS]
+
+    for full_sn, parser_type in CORPUS:
+        detected = detect_parser_type(full_sn)
+        if detected != parser_type:
+            raise SystemExit(f"Zły typ parsera dla {full_sn!r}: {detected} (oczekiwano {parser_type})")
+
+    def detect_all():
+        for full_sn in full_sns:
+            detect_parser_type(full_sn)
+
+    def parse_cold():
+        _parse_sn.cache_clear()
+        for full_sn in full_sns:
+            parse_sn(full_sn)
+
+    def parse_memo():
+        for full_sn in full_sns:
+            parse_sn(full_sn)
+
+    def parse_batch():
+        parse_many(full_sns)
+
+    results = [
+        ("detect_parser_type", _per_op_us(detect_all, number)),
+        ("parse_sn (zimny)", _per_op_us(parse_cold, number)),
+        ("parse_sn (z pamięci)", _per_op_us(parse_memo, number)),
+        ("parse_many", _per_op_us(parse_batch, number)),
+    ]
+
+    print(f"Korpus: {len(CORPUS)} etykiet, {number} powtórzeń")
+    for label, per_op in results:
+        print(f"  {label:<24} {per_op:8.2f} us / SN")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+    run(args.number)
+
+
+if __name__ == '__main__':
+    main()
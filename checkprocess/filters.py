@@ -1,4 +1,6 @@
 import django_filters
+from django.db.models import Case, Q, Value, When
+from rest_framework.filters import SearchFilter
 from .models import ProductObject, ProductObjectProcessLog
 
 
@@ -6,10 +8,11 @@ class ProductObjectFilter(django_filters.FilterSet):
     current_process = django_filters.UUIDFilter(field_name='current_process__id')
     current_place = django_filters.CharFilter(field_name='current_place__name', lookup_expr='icontains')
     place_isnull = django_filters.BooleanFilter(field_name='current_place', lookup_expr='isnull')
+    expired = django_filters.BooleanFilter(field_name='expired_at', lookup_expr='isnull', exclude=True)
 
     class Meta:
         model = ProductObject
-        fields = ['current_process', 'current_place', 'place_isnull']
+        fields = ['current_process', 'current_place', 'place_isnull', 'expired']
         
 
 class ProductObjectProcessLogFilter(django_filters.FilterSet):
@@ -18,4 +21,42 @@ class ProductObjectProcessLogFilter(django_filters.FilterSet):
 
     class Meta:
         model = ProductObjectProcessLog
-        fields = ['serial_number', 'full_sn']
\ No newline at end of file
+        fields = ['serial_number', 'full_sn']
+
+
+class ProductObjectProcessLogExportFilter(django_filters.FilterSet):
+    date_from = django_filters.IsoDateTimeFilter(field_name='entry_time', lookup_expr='gte')
+    date_to = django_filters.IsoDateTimeFilter(field_name='entry_time', lookup_expr='lt')
+    process = django_filters.UUIDFilter(field_name='process_id')
+    place = django_filters.NumberFilter(field_name='place_id')
+    sn = django_filters.CharFilter(method='filter_sn')
+
+    class Meta:
+        model = ProductObjectProcessLog
+        fields = ['date_from', 'date_to', 'process', 'place', 'sn']
+
+    def filter_sn(self, queryset, name, value):
+        return queryset.filter(Q(product_object__full_sn=value) | Q(product_object__serial_number=value))
+
+
+class TrigramSearchFilter(SearchFilter):
+    """
+    Wyszukiwarka ProductObject po search_document (indeks GIN pg_trgm) zamiast ILIKE po każdym z search_fields.
+    Każde słowo musi wystąpić w którymś z pól. Dokładne trafienie w full_sn idzie pierwsze, potem początek full_sn,
+    dalej dotychczasowa kolejność - dlatego backend stoi w filter_backends za OrderingFilter.
+    """
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+
+        for term in search_terms:
+            queryset = queryset.filter(search_document__contains=term.lower())
+
+        search = ' '.join(search_terms)
+        search_rank = Case(
+            When(full_sn__iexact=search, then=Value(0)),
+            When(full_sn__istartswith=search, then=Value(1)),
+            default=Value(2),
+        )
+        return queryset.annotate(search_rank=search_rank).order_by('search_rank', *queryset.query.order_by)
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from checkprocess.services.log_partitions import (ensure_partitions, archive_partitions, is_partitioned,
+                                                  PARTITION_MONTHS_AHEAD, LOG_RETENTION_MONTHS)
+
+
+class Command(BaseCommand):
+    help = "Zakłada partycje miesięczne logów ruchu na zapas i archiwizuje najstarsze. Uruchamiać codziennie (cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD,
+            help="Na ile miesięcy naprzód zakładać partycje."
+        )
+        parser.add_argument(
+            '--retention-months', type=int, default=LOG_RETENTION_MONTHS,
+            help="Ile miesięcy logów trzymać w tabeli (0 = bez archiwizacji)."
+        )
+        parser.add_argument(
+            '--archive-dir',
+            help="Katalog na archiwum CSV (gzip). Bez niego stare partycje zostają jako tabele *_archive_RRRRMM."
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stdout.write("Tabela logów nie jest partycjonowana - nic do zrobienia.")
+            return
+
+        with transaction.atomic():
+            for name in ensure_partitions(months_ahead=options['months_ahead']):
+                self.stdout.write(f"Utworzono partycję {name}.")
+
+            if options['retention_months']:
+                archived = archive_partitions(
+                    retention_months=options['retention_months'], archive_dir=options['archive_dir']
+                )
+                for month, destination in archived:
+                    self.stdout.write(f"Zarchiwizowano {month:%Y-%m} -> {destination}.")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from checkprocess.services.occupancy_service import reconcile_occupancy
+
+
+class Command(BaseCommand):
+    help = "Przelicza liczniki zajętości miejsc (PlaceOccupancy) od zera na podstawie obiektów."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Tylko pokaż rozjazdy, bez przepisywania tabeli."
+        )
+
+    def handle(self, *args, **options):
+        drift = reconcile_occupancy(fix=not options['dry_run'])
+
+        for (process_id, place_id, sub_product_id), stored, actual in drift:
+            self.stdout.write(
+                f"Proces {process_id}, miejsce {place_id}, subprodukt {sub_product_id}: zapisane {stored}, faktycznie {actual}"
+            )
+
+        if not drift:
+            self.stdout.write("Liczniki zgodne.")
+        elif options['dry_run']:
+            self.stdout.write(f"Rozjazdy: {len(drift)} (bez zmian).")
+        else:
+            self.stdout.write(f"Poprawiono liczniki: {len(drift)}.")
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from checkprocess.services.expiry_service import sweep_expired
+from checkprocess.services.kill_service import invalidate_kill_snapshots_for_places
+
+
+class Command(BaseCommand):
+    help = "Oznacza przeterminowane obiekty (expired_at) i powiadamia linie, których to dotyczy."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Co ile sekund powtarzać przebieg (0 = jeden przebieg i koniec)."
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            expired_place_ids = sweep_expired()
+            # Jedna paczka powiadomień na przebieg - każda dotknięta grupa przelicza / wypycha stan kill raz
+            invalidate_kill_snapshots_for_places(expired_place_ids)
+
+            if expired_place_ids:
+                self.stdout.write(f"Nowe przeterminowania na {len(expired_place_ids)} miejscach.")
+
+            if not interval:
+                break
+
+            close_old_connections()
+            time.sleep(interval)
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:20
+
+import datetime
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkprocess', '0064_remove_logfromspinew_unique_fixed_id_to_database_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productobject',
+            name='fifo_sort_date',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce('exp_date_in_process', 'expire_date', models.Value(datetime.date(9999, 12, 31))), output_field=models.DateField()),
+        ),
+        migrations.AddIndex(
+            model_name='productobject',
+            index=models.Index(condition=models.Q(('current_place__isnull', False)), fields=['current_process', 'sub_product', 'fifo_sort_date', 'created_at'], name='idx_fifo_rank'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkprocess', '0065_productobject_fifo_sort_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='messagetoapp',
+            index=models.Index(condition=models.Q(('send', False)), fields=['line', 'when_trigger'], name='idx_message_pending'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:28
+
+from django.db import migrations, models
+
+
+def fill_expired_at(apps, schema_editor):
+    # Obiekty przeterminowane przed migracją - bez tego sweeper oznaczyłby je dopiero przy pierwszym przebiegu
+    from checkprocess.services.expiry_service import sweep_expired
+    sweep_expired(model=apps.get_model('checkprocess', 'ProductObject'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkprocess', '0066_messagetoapp_pending_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productobject',
+            name='expired_at',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='productobject',
+            index=models.Index(condition=models.Q(('expired_at__isnull', False)), fields=['current_place'], name='idx_expired_on_place'),
+        ),
+        migrations.RunPython(fill_expired_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkprocess', '0067_productobject_expired_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logfrommistake',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='logfrommistake',
+            name='repeat_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='logfrommistake',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
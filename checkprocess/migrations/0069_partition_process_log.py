@@ -0,0 +1,166 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:41
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from datetime import datetime
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Zamrożona kopia konwersji - migracja nie importuje modeli ani serwisów, żeby zmiany w kodzie aplikacji
+# nie psuły migrate na świeżej bazie. Bieżące utrzymanie partycji: services/log_partitions.py.
+LOG_TABLE = 'checkprocess_productobjectprocesslog'
+DEFAULT_PARTITION = f'{LOG_TABLE}_default'
+MONTHS_AHEAD = 2
+
+
+def _month_start(value):
+    value = timezone.localtime(value)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return timezone.make_aware(datetime(index // 12, index % 12 + 1, 1))
+
+
+def _is_partitioned(cursor):
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [LOG_TABLE])
+    return cursor.fetchone()[0]
+
+
+def _indexes_and_foreign_keys(cursor):
+    cursor.execute(
+        "SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE i.indrelid = to_regclass(%s) AND NOT i.indisprimary", [LOG_TABLE]
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [LOG_TABLE]
+    )
+    return indexes, cursor.fetchall()
+
+
+def _restore_indexes_and_foreign_keys(cursor, indexes, foreign_keys):
+    # Definicje pobrane przed zmianą nazwy - wskazują już na nową tabelę
+    for name, definition in indexes:
+        # Indeks tabeli partycjonowanej ma postać "ON ONLY" - na zwykłej tabeli tworzymy go normalnie
+        cursor.execute(definition.replace(' ON ONLY ', ' ON '))
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE {LOG_TABLE} ADD CONSTRAINT "{name}" {definition}')
+
+
+def partition_process_log(apps, schema_editor):
+    """
+    Zamienia zwykłą tabelę logów na partycjonowaną miesięcznie po entry_time (RANGE).
+    Klucz główny to (id, entry_time) - Postgres wymaga klucza partycji w każdym unikalnym indeksie.
+    """
+    old_table = f'{LOG_TABLE}_old'
+    current_month = _month_start(timezone.now())
+
+    with schema_editor.connection.cursor() as cursor:
+        if _is_partitioned(cursor):
+            return
+        # Odroczone sprawdzenia FK z tej samej transakcji blokowałyby ALTER TABLE
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        indexes, foreign_keys = _indexes_and_foreign_keys(cursor)
+        cursor.execute(f"SELECT min(entry_time), COALESCE(max(id), 0) FROM {LOG_TABLE}")
+        first_entry, last_id = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {LOG_TABLE} RENAME TO {old_table}")
+        cursor.execute(f"CREATE TABLE {LOG_TABLE} (LIKE {old_table}) PARTITION BY RANGE (entry_time)")
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {LOG_TABLE} DEFAULT")
+
+        month = _month_start(first_entry) if first_entry else current_month
+        last_month = _add_months(current_month, MONTHS_AHEAD)
+        while month <= last_month:
+            cursor.execute(
+                f"CREATE TABLE {LOG_TABLE}_p{month:%Y%m} PARTITION OF {LOG_TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            )
+            month = _add_months(month, 1)
+
+        cursor.execute(f"INSERT INTO {LOG_TABLE} SELECT * FROM {old_table}")
+        # Razem ze starą tabelą znika jej sekwencja / identity - nazwy indeksów i sekwencji są wolne
+        cursor.execute(f"DROP TABLE {old_table}")
+
+        cursor.execute(f"CREATE SEQUENCE {LOG_TABLE}_id_seq OWNED BY {LOG_TABLE}.id")
+        cursor.execute(f"SELECT setval('{LOG_TABLE}_id_seq', %s, %s)", [max(last_id, 1), last_id > 0])
+        cursor.execute(f"ALTER TABLE {LOG_TABLE} ALTER COLUMN id SET DEFAULT nextval('{LOG_TABLE}_id_seq')")
+        cursor.execute(f"ALTER TABLE {LOG_TABLE} ADD CONSTRAINT {LOG_TABLE}_pkey PRIMARY KEY (id, entry_time)")
+
+        _restore_indexes_and_foreign_keys(cursor, indexes, foreign_keys)
+
+
+def unpartition_process_log(apps, schema_editor):
+    """
+    Cofnięcie do 0068: wiersze ze wszystkich partycji wracają do zwykłej tabeli z kluczem głównym id (identity).
+    Partycje odłączone wcześniej do archiwum (<log>_archive_RRRRMM) zostają osobnymi tabelami.
+    """
+    partitioned_table = f'{LOG_TABLE}_partitioned'
+
+    with schema_editor.connection.cursor() as cursor:
+        if not _is_partitioned(cursor):
+            return
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        indexes, foreign_keys = _indexes_and_foreign_keys(cursor)
+        cursor.execute(f"SELECT COALESCE(max(id), 0) FROM {LOG_TABLE}")
+        last_id = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {LOG_TABLE} RENAME TO {partitioned_table}")
+        cursor.execute(f"CREATE TABLE {LOG_TABLE} (LIKE {partitioned_table})")
+        cursor.execute(f"INSERT INTO {LOG_TABLE} SELECT * FROM {partitioned_table}")
+        # Usuwa też wszystkie partycje i sekwencję id
+        cursor.execute(f"DROP TABLE {partitioned_table}")
+
+        cursor.execute(f"ALTER TABLE {LOG_TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+        cursor.execute(f"ALTER TABLE {LOG_TABLE} ALTER COLUMN id RESTART WITH {int(last_id) + 1}")
+        cursor.execute(f"ALTER TABLE {LOG_TABLE} ADD CONSTRAINT {LOG_TABLE}_pkey PRIMARY KEY (id)")
+
+        _restore_indexes_and_foreign_keys(cursor, indexes, foreign_keys)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkprocess', '0068_logfrommistake_repeat_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productobjectprocesslog',
+            name='place',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='process_logs', to='checkprocess.place'),
+        ),
+        migrations.AlterField(
+            model_name='productobjectprocesslog',
+            name='process',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='checkprocess.productprocess'),
+        ),
+        migrations.AlterField(
+            model_name='productobjectprocesslog',
+            name='product_object',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='checkprocess.productobject'),
+        ),
+        migrations.AddIndex(
+            model_name='productobjectprocesslog',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['entry_time'], name='idx_log_entry_brin'),
+        ),
+        migrations.AddIndex(
+            model_name='productobjectprocesslog',
+            index=models.Index(fields=['product_object', 'entry_time'], name='idx_log_object_time'),
+        ),
+        migrations.AddIndex(
+            model_name='productobjectprocesslog',
+            index=models.Index(fields=['place', 'entry_time'], name='idx_log_place_time'),
+        ),
+        migrations.AddIndex(
+            model_name='productobjectprocesslog',
+            index=models.Index(fields=['process', 'entry_time'], name='idx_log_process_time'),
+        ),
+        # Po indeksach - konwersja przepisuje dane i odtwarza na tabeli partycjonowanej wszystkie indeksy naraz
+        migrations.RunPython(partition_process_log, unpartition_process_log),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkprocess', '0069_partition_process_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='logfrommistake',
+            name='place',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='checkprocess.place'),
+        ),
+        migrations.AlterField(
+            model_name='logfrommistake',
+            name='process',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='checkprocess.productprocess'),
+        ),
+        migrations.AlterField(
+            model_name='logfrommistake',
+            name='product_object',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='checkprocess.productobject'),
+        ),
+        migrations.AddIndex(
+            model_name='logfrommistake',
+            index=models.Index(fields=['process', 'created_at'], name='idx_mistake_process_time'),
+        ),
+        migrations.AddIndex(
+            model_name='logfrommistake',
+            index=models.Index(fields=['place', 'created_at'], name='idx_mistake_place_time'),
+        ),
+        migrations.AddIndex(
+            model_name='logfrommistake',
+            index=models.Index(fields=['product_object', 'created_at'], name='idx_mistake_object_time'),
+        ),
+    ]
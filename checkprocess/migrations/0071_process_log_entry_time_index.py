@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkprocess', '0070_logfrommistake_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productobjectprocesslog',
+            index=models.Index(fields=['entry_time'], name='idx_log_entry_time'),
+        ),
+    ]
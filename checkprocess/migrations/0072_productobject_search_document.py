@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:47
+
+import django.contrib.postgres.operations
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkprocess', '0071_process_log_entry_time_index'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddField(
+            model_name='productobject',
+            name='search_document',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(django.db.models.functions.text.Concat('full_sn', models.Value('\n'), 'serial_number', models.Value('\n'), 'free_plain_text', models.Value('\n'), 'sito_basic_unnamed_place', output_field=models.TextField())), output_field=models.TextField()),
+        ),
+        # Poza stanem modelu - baza bez pg_trgm (np. testowa budowana bez migracji) i tak nie utworzy tego indeksu
+        migrations.RunSQL(
+            "CREATE INDEX idx_object_search_trgm ON checkprocess_productobject USING gin (search_document gin_trgm_ops)",
+            reverse_sql="DROP INDEX IF EXISTS idx_object_search_trgm",
+        ),
+    ]
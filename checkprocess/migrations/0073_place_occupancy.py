@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_place_occupancy(apps, schema_editor):
+    ProductObject = apps.get_model('checkprocess', 'ProductObject')
+    PlaceOccupancy = apps.get_model('checkprocess', 'PlaceOccupancy')
+
+    rows = (
+        ProductObject.objects
+        .filter(current_place__isnull=False, end=False)
+        .values_list('current_process_id', 'current_place_id', 'sub_product_id')
+        .annotate(total=Count('id'))
+    )
+    PlaceOccupancy.objects.bulk_create([
+        PlaceOccupancy(process_id=process_id, place_id=place_id, sub_product_id=sub_product_id, quantity=total)
+        for process_id, place_id, sub_product_id, total in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkprocess', '0072_productobject_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=0)),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='checkprocess.place')),
+                ('process', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='checkprocess.productprocess')),
+                ('sub_product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='checkprocess.subproduct')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('place', 'process', 'sub_product'), name='uniq_place_occupancy', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(fill_place_occupancy, migrations.RunPython.noop),
+    ]
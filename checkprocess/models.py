@@ -1,7 +1,15 @@
 from django.db import models
+from django.utils import timezone
+from django.db.models.functions import Coalesce, Concat, Lower
+from django.contrib.postgres.indexes import BrinIndex
+from datetime import date
 import uuid
 
 
+FIFO_FAR_FUTURE = date(9999, 12, 31) # Sort date for objects without any expiry - always picked last
+OCCUPANCY_FIELDS = {'current_process_id', 'current_place_id', 'sub_product_id', 'end'} # ProductObject.occupancy_key
+
+
 class Product(models.Model):
     name = models.CharField(max_length=255)
 
@@ -153,6 +161,7 @@ class ProductObject(models.Model):
     exp_date_in_process = models.DateField(null=True, blank=True, default=None)
     quranteen_time = models.DateTimeField(null=True, blank=True, default=None)
     max_in_process = models.DateTimeField(null=True, blank=True, default=None)
+    expired_at = models.DateTimeField(null=True, blank=True, default=None) # Set by the expiry sweeper when exp_date_in_process / max_in_process passes
 
     ex_mother = models.CharField(max_length=255, null=True, blank=True)
 
@@ -162,9 +171,38 @@ class ProductObject(models.Model):
     end = models.BooleanField(default=False)
     is_full = models.BooleanField(default=True)
 
+    # Effective FIFO date (exp in process -> expire date -> far future), kept by the database so bulk writes stay correct
+    fifo_sort_date = models.GeneratedField(
+        expression=Coalesce('exp_date_in_process', 'expire_date', models.Value(FIFO_FAR_FUTURE)),
+        output_field=models.DateField(),
+        db_persist=True,
+    )
+
+    # Pola wyszukiwarki sklejone małymi literami w jedną kolumnę pod TrigramSearchFilter.
+    # Indeks GIN (gin_trgm_ops) zakłada migracja 0072 - wymaga rozszerzenia pg_trgm, więc nie ma go w Meta.indexes
+    search_document = models.GeneratedField(
+        expression=Lower(Concat(
+            'full_sn', models.Value('\n'), 'serial_number', models.Value('\n'),
+            'free_plain_text', models.Value('\n'), 'sito_basic_unnamed_place',
+            output_field=models.TextField(),
+        )),
+        output_field=models.TextField(),
+        db_persist=True,
+    )
+
     class Meta:
         indexes = [
             models.Index(fields=["current_place", "end"], name="idx_place_end"),
+            models.Index(
+                fields=["current_process", "sub_product", "fifo_sort_date", "created_at"],
+                condition=models.Q(current_place__isnull=False),
+                name="idx_fifo_rank",
+            ),
+            models.Index(
+                fields=["current_place"],
+                condition=models.Q(expired_at__isnull=False),
+                name="idx_expired_on_place",
+            ),
         ]
 
         permissions = [
@@ -175,6 +213,23 @@ class ProductObject(models.Model):
     def __str__(self):
         return f"{self.serial_number} ({self.product.name})"
 
+    def occupancy_key(self):
+        # Klucz licznika PlaceOccupancy - liczą się tylko aktywne obiekty leżące w miejscu
+        if self.current_place_id is None or self.end:
+            return None
+        return self.current_process_id, self.current_place_id, self.sub_product_id
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Place the object was loaded on - needed to refresh kill status of the place it leaves
+        if 'current_place_id' in instance.__dict__:
+            instance._loaded_place_id = instance.current_place_id
+        # Stan licznika z chwili wczytania - zapis przenosi obiekt ze starego klucza na nowy (occupancy_service)
+        if OCCUPANCY_FIELDS.issubset(instance.__dict__):
+            instance._loaded_occupancy = instance.occupancy_key()
+        return instance
+
 
 class ProductObjectProcess(models.Model):
     product_object = models.ForeignKey(ProductObject, on_delete=models.CASCADE, related_name='assigned_processes')
@@ -188,15 +243,32 @@ class ProductObjectProcess(models.Model):
 
 
 class ProductObjectProcessLog(models.Model):
-    product_object = models.ForeignKey(ProductObject, on_delete=models.CASCADE, related_name='logs')
-    process = models.ForeignKey(ProductProcess, on_delete=models.CASCADE, null=True, blank=True)
-    place = models.ForeignKey(Place, on_delete=models.SET_NULL, null=True, blank=True, related_name="process_logs")
+    # Indeksy FK zastępują złożone (FK, entry_time) z Meta - na każdej partycji jeden indeks mniej do utrzymania
+    product_object = models.ForeignKey(ProductObject, on_delete=models.CASCADE, related_name='logs', db_index=False)
+    process = models.ForeignKey(ProductProcess, on_delete=models.CASCADE, null=True, blank=True, db_index=False)
+    place = models.ForeignKey(Place, on_delete=models.SET_NULL, null=True, blank=True, related_name="process_logs", db_index=False)
 
     entry_time = models.DateTimeField(auto_now_add=True)
     who_entry = models.CharField(max_length=255, null=True, blank=True)
     movement_type = models.CharField(max_length=255, null=True, blank=True)
     name_of_productig_product = models.CharField(max_length=255, null=True, blank=True)
 
+    class Meta:
+        # Tabela partycjonowana miesięcznie po entry_time (migracja 0069, services/log_partitions.py).
+        # Indeksy tabeli nadrzędnej Postgres zakłada na każdej partycji.
+        # Klucz główny w bazie to (id, entry_time) - Postgres wymaga klucza partycji w każdym unikalnym indeksie.
+        # Django 5.1 nie ma CompositePrimaryKey, więc model zostawia pk=id: unikalność id daje jedna sekwencja,
+        # baza jej nie wymusza. Zapis id ręcznie (bulk_create z id, kopiowanie archiwum) musi to pilnować sam,
+        # a get/save/delete po samym id przeszukują wszystkie partycje.
+        indexes = [
+            BrinIndex(fields=["entry_time"], name="idx_log_entry_brin"),
+            # Kolejność eksportu all-logs bez sortowania całej tabeli - partycje czytane po kolei od najnowszej
+            models.Index(fields=["entry_time"], name="idx_log_entry_time"),
+            models.Index(fields=["product_object", "entry_time"], name="idx_log_object_time"),
+            models.Index(fields=["place", "entry_time"], name="idx_log_place_time"),
+            models.Index(fields=["process", "entry_time"], name="idx_log_process_time"),
+        ]
+
     def __str__(self):
         return f"Log for @ {self.entry_time:%Y-%m-%d %H:%M}"
 
@@ -352,11 +424,21 @@ class MessageToApp(models.Model):
     send = models.BooleanField(default=False)
     when_trigger = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["line", "when_trigger"],
+                condition=models.Q(send=False),
+                name="idx_message_pending",
+            ),
+        ]
+
 
 class LogFromMistake(models.Model):
-    process = models.ForeignKey(ProductProcess, on_delete=models.SET_NULL, null=True, blank=True)
-    place = models.ForeignKey(Place, on_delete=models.SET_NULL, null=True, blank=True)
-    product_object = models.ForeignKey(ProductObject, on_delete=models.SET_NULL, null=True, blank=True)
+    # Zamiast indeksów FK złożone (FK, created_at) z Meta - pod stronicowanie po kluczu w UnifiedLogsViewSet
+    process = models.ForeignKey(ProductProcess, on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
+    place = models.ForeignKey(Place, on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
+    product_object = models.ForeignKey(ProductObject, on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
     
     # Pola tekstowe (zawsze dostępne z requestu)
     process_uuid_raw = models.CharField(max_length=255, null=True, blank=True) # ID przesłane w żądaniu
@@ -367,10 +449,43 @@ class LogFromMistake(models.Model):
     
     error_message = models.TextField()
     error_code = models.CharField(max_length=255)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Czas zdarzenia, nie zapisu - logi są zapisywane paczkami z opóźnieniem (ErrorLogWriter)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    # Powtórzenia tego samego błędu (SN, kod, miejsce) w oknie ERROR_LOG_COLLAPSE_WINDOW zwiększają licznik zamiast dodawać wiersze
+    repeat_count = models.PositiveIntegerField(default=1)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
 
     movement_type = models.CharField(max_length=255, null=True, blank=True)
     date_time = models.DateTimeField(auto_now_add=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["process", "created_at"], name="idx_mistake_process_time"),
+            models.Index(fields=["place", "created_at"], name="idx_mistake_place_time"),
+            models.Index(fields=["product_object", "created_at"], name="idx_mistake_object_time"),
+        ]
+
+    def __str__(self):
+        return f"Error {self.error_code} for {self.product_sn}"
+
+
+class PlaceOccupancy(models.Model):
+    """
+    Ile aktywnych obiektów (end=False) leży w miejscu, per proces i subprodukt.
+    Utrzymywane w transakcji zapisu obiektów (services/occupancy_service.py), odbudowa: manage.py reconcile_occupancy.
+    """
+    process = models.ForeignKey(ProductProcess, on_delete=models.CASCADE, related_name='occupancy', null=True, blank=True)
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='occupancy')
+    sub_product = models.ForeignKey(SubProduct, on_delete=models.CASCADE, related_name='occupancy', null=True, blank=True)
+    quantity = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["place", "process", "sub_product"], name="uniq_place_occupancy", nulls_distinct=False
+            ),
+        ]
+
     def __str__(self):
-        return f"Error {self.error_code} for {self.product_sn}"
\ No newline at end of file
+        return f"{self.place_id} / {self.sub_product_id}: {self.quantity}"
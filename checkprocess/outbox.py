@@ -0,0 +1,34 @@
+import requests
+from django.conf import settings
+
+from global_app.outbox import outbox_handler, set_target_limit
+
+
+POKE_KIND = 'poke'
+POKE_TARGET = 'micro-service'
+POKE_TIMEOUT = 30
+
+set_target_limit(POKE_TARGET, 10)
+
+
+def _poke_url(process_id):
+    return f"http://127.0.0.1:{settings.MICRO_SERVICE_PORT}/{settings.MICRO_SERVICE_NAME}/new-product-poke/{process_id}/"
+
+
+@outbox_handler(POKE_KIND)
+def deliver_pokes(payloads):
+    # Poke niesie tylko id procesu - kilka poke tego samego procesu w jednej paczce to jedno wywołanie
+    results = {}
+    for process_id in {payload['process_id'] for payload in payloads}:
+        try:
+            response = requests.get(_poke_url(process_id), timeout=POKE_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            results[process_id] = f"Nie udało się skontaktować z endpointem poke: {e}"
+            continue
+
+        if 200 <= response.status_code < 1000:
+            results[process_id] = None
+        else:
+            results[process_id] = f"Endpoint poke zwrócił błąd {response.status_code}."
+
+    return [results[payload['process_id']] for payload in payloads]
@@ -1,7 +1,43 @@
 import re
-from datetime import datetime
+from datetime import date
+from functools import lru_cache
 from rest_framework.exceptions import ValidationError
 
+
+# Wzorce kompilowane raz przy imporcie - parsery są singletonami i tylko z nich korzystają
+ALPHA_SERIAL = re.compile(r'3S([A-Z])(\d+)')
+ALPHA_PROD_DATE = re.compile(r'6D(\d{8})')
+ALPHA_EXP_DATE = re.compile(r'14D(\d{8})')
+ALPHA_Q = re.compile(r'@Q(\d+)')
+
+LABEL_SERIAL = re.compile(r'\(S\)([^\(]+)')
+LABEL_PROD_DATE = re.compile(r'\(D\)(\d{8})')
+LABEL_EXP_DATE = re.compile(r'\(E\)(\d{8})')
+LABEL_Q = re.compile(r'\(Q\)([^\(]+)')
+
+PARSE_CACHE_SIZE = 4096
+
+
+def _label_date(match):
+    # Wzorzec gwarantuje 8 cyfr RRRRMMDD - date() zamiast strptime, które kosztowało więcej niż całe dopasowanie
+    if not match:
+        return None
+    value = match.group(1)
+    return date(int(value[:4]), int(value[4:6]), int(value[6:]))
+
+
+def _is_stencil_date(date_str):
+    # To samo co strptime(date_str, "%d%m%y"), ale bez parsera formatu - to był najdroższy krok wykrywania
+    if len(date_str) != 6 or not date_str.isdigit():
+        return False
+    year = int(date_str[4:])
+    try:
+        date(year + 2000 if year < 69 else year + 1900, int(date_str[2:4]), int(date_str[:2]))
+    except ValueError:
+        return False
+    return True
+
+
 class BaseSNParser:
     def parse(self, full_sn: str):
         raise NotImplementedError("Każdy parser musi mieć metodę `parse()`")
@@ -10,10 +46,7 @@ class BaseSNParser:
 class AlphaSNParser(BaseSNParser):
     def parse(self, full_sn: str):
         sub_product = 'Alpha'
-        serial_match = re.search(r'3S([A-Z])(\d+)', full_sn)
-        prod_date_match = re.search(r'6D(\d{8})', full_sn)
-        exp_date_match = re.search(r'14D(\d{8})', full_sn)
-        q_match = re.search(r'@Q(\d+)', full_sn)
+        serial_match = ALPHA_SERIAL.search(full_sn)
 
         if not serial_match:
             raise ValueError("Brak numeru seryjnego z prefiksem 3S.")
@@ -21,181 +54,62 @@ class AlphaSNParser(BaseSNParser):
         serial_type = serial_match.group(1)
         serial_number = serial_match.group(2)
 
-        production_date = (
-            datetime.strptime(prod_date_match.group(1), "%Y%m%d").date()
-            if prod_date_match else None
-        )
-        expire_date = (
-            datetime.strptime(exp_date_match.group(1), "%Y%m%d").date()
-            if exp_date_match else None
-        )
+        production_date = _label_date(ALPHA_PROD_DATE.search(full_sn))
+        expire_date = _label_date(ALPHA_EXP_DATE.search(full_sn))
+
+        q_match = ALPHA_Q.search(full_sn)
         q_code = q_match.group(1) if q_match else None
 
         return sub_product, serial_number, production_date, expire_date, serial_type, q_code
-    
 
-class AimSnParser(BaseSNParser):
-    def parse(self, full_sn: str):
-        sub_product = 'AIM-H10'
 
-        sn_match = re.search(r'\(S\)([^\(]+)', full_sn)
-        if not sn_match:
-            raise ValueError("Brak numeru seryjnego (S).")
-        serial_number = sn_match.group(1).strip()
-
-        prod_date_match = re.search(r'\(D\)(\d{8})', full_sn)
-        exp_date_match = re.search(r'\(E\)(\d{8})', full_sn)
-        q_match = re.search(r'\(Q\)([^\(]+)', full_sn)
-
-        production_date = (
-            datetime.strptime(prod_date_match.group(1), "%Y%m%d").date()
-            if prod_date_match else None
-        )
-        expire_date = (
-            datetime.strptime(exp_date_match.group(1), "%Y%m%d").date()
-            if exp_date_match else None
-        )
-
-        q_code = q_match.group(1).strip() if q_match else None
+class LabelSnParser(BaseSNParser):
+    """
+    Etykiety "(V)..." (AIM, Heraeus, MacDermid, klej) - te same pola (S)/(D)/(E)/(Q),
+    różnią się tylko nazwą subproduktu i tym, czy "6 kg" oznacza karton.
+    """
+    sub_product = None
+    detects_carton = True
 
-        serial_type = None
-        if q_code:
-            q_lower = q_code.lower()
-            if "6 kg" in q_lower:
-                serial_type = "karton"
-
-        return sub_product, serial_number, production_date, expire_date, serial_type, q_code
-    
-
-class AimV9SnParser(BaseSNParser):
     def parse(self, full_sn: str):
-        sub_product = 'AIM-V9'
-
-        sn_match = re.search(r'\(S\)([^\(]+)', full_sn)
+        sn_match = LABEL_SERIAL.search(full_sn)
         if not sn_match:
             raise ValueError("Brak numeru seryjnego (S).")
         serial_number = sn_match.group(1).strip()
 
-        prod_date_match = re.search(r'\(D\)(\d{8})', full_sn)
-        exp_date_match = re.search(r'\(E\)(\d{8})', full_sn)
-        q_match = re.search(r'\(Q\)([^\(]+)', full_sn)
-
-        production_date = (
-            datetime.strptime(prod_date_match.group(1), "%Y%m%d").date()
-            if prod_date_match else None
-        )
-        expire_date = (
-            datetime.strptime(exp_date_match.group(1), "%Y%m%d").date()
-            if exp_date_match else None
-        )
+        production_date = _label_date(LABEL_PROD_DATE.search(full_sn))
+        expire_date = _label_date(LABEL_EXP_DATE.search(full_sn))
 
+        q_match = LABEL_Q.search(full_sn)
         q_code = q_match.group(1).strip() if q_match else None
 
         serial_type = None
-        if q_code:
-            q_lower = q_code.lower()
-            if "6 kg" in q_lower:
-                serial_type = "karton"
+        if self.detects_carton and q_code and "6 kg" in q_code.lower():
+            serial_type = "karton"
 
-        return sub_product, serial_number, production_date, expire_date, serial_type, q_code
+        return self.sub_product, serial_number, production_date, expire_date, serial_type, q_code
 
 
-class KlejSnParser(BaseSNParser):
-    def parse(self, full_sn: str):
-        sub_product = 'Klej'
+class AimSnParser(LabelSnParser):
+    sub_product = 'AIM-H10'
 
-        sn_match = re.search(r'\(S\)([^\(]+)', full_sn)
-        if not sn_match:
-            raise ValueError("Brak numeru seryjnego (S).")
-        serial_number = sn_match.group(1).strip()
 
-        prod_date_match = re.search(r'\(D\)(\d{8})', full_sn)
-        exp_date_match = re.search(r'\(E\)(\d{8})', full_sn)
-        q_match = re.search(r'\(Q\)([^\(]+)', full_sn)
+class AimV9SnParser(LabelSnParser):
+    sub_product = 'AIM-V9'
 
-        production_date = (
-            datetime.strptime(prod_date_match.group(1), "%Y%m%d").date()
-            if prod_date_match else None
-        )
-        expire_date = (
-            datetime.strptime(exp_date_match.group(1), "%Y%m%d").date()
-            if exp_date_match else None
-        )
 
-        q_code = q_match.group(1).strip() if q_match else None
+class KlejSnParser(LabelSnParser):
+    sub_product = 'Klej'
+    detects_carton = False
 
-        serial_type = None
 
-        return sub_product, serial_number, production_date, expire_date, serial_type, q_code
-    
+class HerausSnParser(LabelSnParser):
+    sub_product = 'HERAEUS'
 
-class HerausSnParser(BaseSNParser):
-    def parse(self, full_sn: str):
-        sub_product = 'HERAEUS'
 
-        sn_match = re.search(r'\(S\)([^\(]+)', full_sn)
-        if not sn_match:
-            raise ValueError("Brak numeru seryjnego (S).")
-        serial_number = sn_match.group(1).strip()
-
-        prod_date_match = re.search(r'\(D\)(\d{8})', full_sn)
-        exp_date_match = re.search(r'\(E\)(\d{8})', full_sn)
-        q_match = re.search(r'\(Q\)([^\(]+)', full_sn)
-
-        production_date = (
-            datetime.strptime(prod_date_match.group(1), "%Y%m%d").date()
-            if prod_date_match else None
-        )
-
-        expire_date = (
-            datetime.strptime(exp_date_match.group(1), "%Y%m%d").date()
-            if exp_date_match else None
-        )
-
-        q_code = q_match.group(1).strip() if q_match else None
-
-        serial_type = None
-        if q_code:
-            q_lower = q_code.lower()
-            if "6 kg" in q_lower:
-                serial_type = "karton"
-
-        return sub_product, serial_number, production_date, expire_date, serial_type, q_code
-    
-
-class ItalgasSnParser(BaseSNParser):
-    def parse(self, full_sn: str):
-        sub_product = 'ITALGAS'
-
-        sn_match = re.search(r'\(S\)([^\(]+)', full_sn)
-        if not sn_match:
-            raise ValueError("Brak numeru seryjnego (S).")
-        serial_number = sn_match.group(1).strip()
-
-        prod_date_match = re.search(r'\(D\)(\d{8})', full_sn)
-        exp_date_match = re.search(r'\(E\)(\d{8})', full_sn)
-        q_match = re.search(r'\(Q\)([^\(]+)', full_sn)
+class ItalgasSnParser(LabelSnParser):
+    sub_product = 'ITALGAS'
 
-        production_date = (
-            datetime.strptime(prod_date_match.group(1), "%Y%m%d").date()
-            if prod_date_match else None
-        )
-
-        expire_date = (
-            datetime.strptime(exp_date_match.group(1), "%Y%m%d").date()
-            if exp_date_match else None
-        )
-
-        q_code = q_match.group(1).strip() if q_match else None
-
-        serial_type = None
-        if q_code:
-            q_lower = q_code.lower()
-            if "6 kg" in q_lower:
-                serial_type = "karton"
-
-        return sub_product, serial_number, production_date, expire_date, serial_type, q_code
-    
 
 class TecnoLabSNParser(BaseSNParser):
     def parse(self, full_sn: str):
@@ -219,41 +133,105 @@ class DekSnParser(BaseSNParser):
         serial_number = f"{length}mm {full_name} {full_sn}"
 
         return sub_product, serial_number, None, None, None, None
-    
 
-class EkraSnParser(BaseSNParser):
-    def parse(self, full_sn: str):
-        sub_product = 'Dek'
 
-        letter = full_sn[6]
-        full_name = codes_dict.get(letter, "UNKNOWN")
+class EkraSnParser(DekSnParser):
+    pass
 
-        length = full_sn.split(".")[1].split("-")[0]
 
-        serial_number = f"{length}mm {full_name} {full_sn}"
+PARSERS = {
+    'alpha_parser': AlphaSNParser(),
+    'aim_parser': AimSnParser(),
+    'aim-v9-parser': AimV9SnParser(),
+    'sito_default': TecnoLabSNParser(),
+    'heraus_parser': HerausSnParser(),
+    'klej_parser': KlejSnParser(),
+    'italgas': ItalgasSnParser(),
+    'dek_parser': DekSnParser(),
+    'ekra_parser': EkraSnParser(),
+}
 
-        return sub_product, serial_number, None, None, None, None
+STENCIL_PARSERS = {'D': 'dek_parser', 'E': 'ekra_parser'}
+SITO_PREFIXES = ('S', 'T', '#', 'W')
 
 
 def get_parser(parser_type: str):
-    if parser_type == 'alpha_parser':
-        return AlphaSNParser()
-    elif parser_type == 'aim_parser':
-        return AimSnParser()
-    elif parser_type == 'aim-v9-parser':
-        return AimV9SnParser()
-    elif parser_type == 'sito_default':
-        return TecnoLabSNParser()
-    elif parser_type == 'heraus_parser':
-        return HerausSnParser()
-    elif parser_type == 'klej_parser':
-        return KlejSnParser()
-    elif parser_type == 'italgas':
-        return ItalgasSnParser()
-    elif parser_type == 'dek_parser':
-        return DekSnParser()
-    elif parser_type == 'ekra_parser':
-        return EkraSnParser()
-    raise ValidationError(f"Nieobsługiwany typ parsera: '{parser_type}'")
-
-
+    try:
+        return PARSERS[parser_type]
+    except KeyError:
+        raise ValidationError(f"Nieobsługiwany typ parsera: '{parser_type}'")
+
+
+def _detect_label_parser(full_sn):
+    # Kolejność jak w dawnym łańcuchu if/elif - AIM bez znanego kodu nie szuka dalej wśród producentów
+    if 'AIM' in full_sn:
+        if '40900900' in full_sn:
+            return 'aim_parser'
+        if '62420118330' in full_sn:
+            return 'aim-v9-parser'
+        return None
+    if 'MACDERMID' in full_sn:
+        return 'italgas'
+    if 'heraeus' in full_sn.lower():
+        return 'heraus_parser'
+    if 'SE4420' in full_sn:
+        return 'klej_parser'
+    return None
+
+
+def detect_parser_type(full_sn: str) -> str:
+    if not full_sn or not isinstance(full_sn, str):
+        return 'undefined'
+
+    full_sn = full_sn.strip()
+
+    if full_sn.startswith('(V)'):
+        parser_type = _detect_label_parser(full_sn)
+        if parser_type:
+            return parser_type
+
+    if '[)>' in full_sn:
+        return 'alpha_parser'
+
+    if len(full_sn) > 8 and full_sn[7] == '.' and full_sn[6] in STENCIL_PARSERS and _is_stencil_date(full_sn[:6]):
+        return STENCIL_PARSERS[full_sn[6]]
+
+    if full_sn.startswith(SITO_PREFIXES):
+        return 'sito_default'
+
+    return 'undefined'
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_sn(full_sn: str):
+    return get_parser(detect_parser_type(full_sn)).parse(full_sn)
+
+
+def parse_sn(full_sn: str):
+    """
+    Wykrycie typu + parsowanie w jednym. Wynik to niezmienna krotka, więc powtórzone skany idą z pamięci.
+    """
+    # Sprawdzenie przed cache - lista/słownik z JSON-a dałyby TypeError (unhashable) zamiast 400
+    if not isinstance(full_sn, str):
+        raise ValidationError("SN musi być tekstem.")
+    return _parse_sn(full_sn)
+
+
+def _error_message(error):
+    # get_parser rzuca ValidationError z DRF - str() dałby repr listy ErrorDetail
+    if isinstance(error, ValidationError):
+        return " ".join(str(detail) for detail in error.detail)
+    return str(error)
+
+
+def parse_many(full_sns):
+    """
+    Parsuje listę SN - zwraca (full_sn, wynik, błąd) w kolejności wejścia, błąd jednego SN nie przerywa reszty.
+    """
+    results = []
+    for full_sn in full_sns:
+        try:
+            results.append((full_sn, parse_sn(full_sn), None))
+        except (ValueError, ValidationError) as e:
+            results.append((full_sn, None, _error_message(e)))
+    return results
@@ -5,6 +5,7 @@ from .models import (Product, ProductProcess, ProductObject, ProductObjectProces
 from datetime import timedelta
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
+from .services.heartbeat_service import get_last_check
 
 class ProductProcessDefaultsSerializer(serializers.ModelSerializer):
     class Meta:
@@ -90,11 +91,12 @@ class ProductObjectSerializer(serializers.ModelSerializer):
                 'production_date', 'expire_date',
                 'place_name', 'who_entry', 'current_place_name', 'mother_object',
                 'exp_date_in_process', 'quranteen_time', 'mother_sn', 'is_mother', 'sub_product', 'sub_product_name',
-                'sito_cycles_count', 'sito_cycle_limit', 'max_in_process', 'last_move', 'sito_basic_unnamed_place', 'free_plain_text'
+                'sito_cycles_count', 'sito_cycle_limit', 'max_in_process', 'last_move', 'sito_basic_unnamed_place', 'free_plain_text',
+                'expired_at'
             ]
         read_only_fields = [
             'serial_number', 'production_date', 'expire_date',
-            'current_process', 'current_place', 'sub_product_name'
+            'current_process', 'current_place', 'sub_product_name', 'expired_at'
         ]
         
     def get_current_place_name(self, obj):
@@ -161,16 +163,22 @@ class BulkProductObjectCreateToMotherSerializer(serializers.Serializer):
 
 
 class PlaceGroupToAppKillSerializer(serializers.ModelSerializer):
+    last_check = serializers.SerializerMethodField()
     status = serializers.SerializerMethodField()
 
     class Meta:
         model = PlaceGroupToAppKill
         fields = ['id', 'name', 'last_check', 'status', 'checking']
 
+    def get_last_check(self, obj):
+        last_check = get_last_check(obj)
+        return serializers.DateTimeField().to_representation(last_check) if last_check else None
+
     def get_status(self, obj):
-        if obj.last_check is None:
+        last_check = get_last_check(obj)
+        if last_check is None:
             return False
-        return (timezone.now() - obj.last_check) <= timedelta(minutes=1)
+        return (timezone.now() - last_check) <= timedelta(minutes=1)
     
 
 class PlaceGroupToAppKillUpdateSerializer(serializers.ModelSerializer):
@@ -315,4 +323,13 @@ class ProductObjectAdminSerializerProcessHelper(serializers.ModelSerializer):
 class ProductObjectAdminSerializerPlaceHelper(serializers.ModelSerializer):
     class Meta:
         model = Place
-        fields = ['id', 'name']
\ No newline at end of file
+        fields = ['id', 'name']
+
+class FifoNextToPickSerializer(serializers.ModelSerializer):
+    sub_product_name = serializers.CharField(source='sub_product.name', read_only=True, allow_null=True)
+    place_name = serializers.CharField(source='current_place.name', read_only=True, allow_null=True)
+
+    class Meta:
+        model = ProductObject
+        fields = ['id', 'full_sn', 'serial_number', 'sub_product', 'sub_product_name', 'place_name',
+                  'fifo_sort_date', 'exp_date_in_process', 'expire_date', 'created_at']
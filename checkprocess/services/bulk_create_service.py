@@ -0,0 +1,155 @@
+from checkprocess.models import ProductObject, ProductObjectProcessLog, SubProduct
+from checkprocess.parsers import parse_many
+from checkprocess.services.expiry_service import refresh_expired_at
+from checkprocess.services.kill_service import invalidate_kill_snapshots_for_places_on_commit
+from checkprocess.services.occupancy_service import record_occupancy
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+
+BULK_CREATE_BATCH_SIZE = 500
+
+
+class BulkProductObjectCreator:
+    """
+    Przyjęcie wielu obiektów naraz: SN parsowane razem, subprodukty i duplikaty sprawdzane jednym zapytaniem,
+    zapis obiektów i logów przez bulk_create. Błędy zbierane per SN - przy jakimkolwiek błędzie nic nie jest zapisywane.
+    """
+    def __init__(self, product, process, place, who_entry):
+        self.product = product
+        self.process = process
+        self.place = place
+        self.who_entry = who_entry
+        self.product_objects = []
+        self.errors = []
+
+    def prepare(self, full_sns):
+        now = timezone.now()
+        parsed_items = parse_many(full_sns)
+
+        sub_product_names = {parsed[0] for full_sn, parsed, error in parsed_items if parsed}
+        sub_products = {
+            sub_product.name: sub_product
+            for sub_product in SubProduct.objects.filter(product=self.product, name__in=sub_product_names)
+        }
+        existing = set(ProductObject.objects.filter(full_sn__in=full_sns).values_list('full_sn', flat=True))
+
+        seen = set()
+        for full_sn, parsed, error in parsed_items:
+            if error:
+                self.add_error(full_sn, f"Błąd parsowania SN '{full_sn}': {error}", 'parse_error')
+                continue
+
+            if full_sn in existing or full_sn in seen:
+                self.add_error(full_sn, "Taki obiekt już istnieje", 'object_already_exists')
+                continue
+            seen.add(full_sn)
+
+            sub_product, serial_number, production_date, expire_date, serial_type, q_code = parsed
+            sub_product_obj = sub_products.get(sub_product)
+            if sub_product_obj is None:
+                self.add_error(
+                    full_sn, f"SubProduct '{sub_product}' nie istnieje dla produktu '{self.product.name}'.", 'sub_product_not_found'
+                )
+                continue
+
+            product_object = self.build_object(
+                full_sn, sub_product_obj, serial_number, production_date, expire_date, serial_type, q_code
+            )
+            # bulk_create pomija pre_save - flaga liczona przy budowie, dzieci dziedziczą termin matki, który mógł już minąć
+            refresh_expired_at(product_object, now)
+            self.product_objects.append(product_object)
+
+        return not self.errors
+
+    def build_object(self, full_sn, sub_product_obj, serial_number, production_date, expire_date, serial_type, q_code):
+        return ProductObject(
+            full_sn=full_sn,
+            product=self.product,
+            sub_product=sub_product_obj,
+            serial_number=serial_number,
+            production_date=production_date,
+            expire_date=expire_date,
+            current_place=self.place,
+            current_process=self.process,
+            is_mother=(serial_type == "M" and q_code == "12") or serial_type == 'karton',
+        )
+
+    def add_error(self, full_sn, message, code):
+        self.errors.append({"full_sn": full_sn, "error": message, "code": code})
+
+    def save(self):
+        now = timezone.now()
+        with transaction.atomic():
+            created = ProductObject.objects.bulk_create(self.product_objects, batch_size=BULK_CREATE_BATCH_SIZE)
+            ProductObjectProcessLog.objects.bulk_create([
+                ProductObjectProcessLog(
+                    product_object=product_object,
+                    process=self.process,
+                    entry_time=now,
+                    who_entry=self.who_entry,
+                    place=self.place,
+                    movement_type='create'
+                )
+                for product_object in created
+            ], batch_size=BULK_CREATE_BATCH_SIZE)
+            # bulk_create nie wysyła sygnałów
+            record_occupancy(created, created=True)
+            invalidate_kill_snapshots_for_places_on_commit([self.place.id if self.place else None])
+        return created
+
+
+class BulkChildObjectCreator(BulkProductObjectCreator):
+    """
+    Dodanie wielu dzieci do matki (kartonu). Limit dzieci liczony raz na (matka, sub_product)
+    pod blokadą wiersza matki - równoległe dokładanie do tego samego kartonu czeka zamiast przekroczyć limit.
+    Wywoływać w transaction.atomic().
+    """
+    def __init__(self, product, process, place, who_entry, mother):
+        super().__init__(product, process, place, who_entry)
+        self.mother = mother
+
+    def prepare(self, full_sns):
+        ProductObject.objects.select_for_update().filter(pk=self.mother.pk).values_list('pk', flat=True).first()
+
+        if super().prepare(full_sns):
+            self.validate_child_limits()
+        return not self.errors
+
+    def build_object(self, full_sn, sub_product_obj, serial_number, production_date, expire_date, serial_type, q_code):
+        return ProductObject(
+            full_sn=full_sn,
+            product=self.product,
+            sub_product=sub_product_obj,
+            serial_number=serial_number,
+            production_date=production_date,
+            expire_date=expire_date,
+            current_place=self.place,
+            current_process=self.process,
+            exp_date_in_process=self.mother.exp_date_in_process,
+            quranteen_time=self.mother.quranteen_time,
+            mother_object=self.mother,
+        )
+
+    def validate_child_limits(self):
+        children_count = dict(
+            ProductObject.objects
+            .filter(mother_object=self.mother)
+            .values('sub_product_id')
+            .annotate(total=Count('id'))
+            .values_list('sub_product_id', 'total')
+        )
+
+        for product_object in self.product_objects:
+            sub_product = product_object.sub_product
+            count = children_count.get(sub_product.id, 0)
+
+            if sub_product.child_limit is not None and count >= sub_product.child_limit:
+                self.add_error(
+                    product_object.full_sn,
+                    f"Przekroczono limit {sub_product.child_limit} dla SubProduct '{sub_product.name}' (matka {self.mother.full_sn}).",
+                    'child_limit_exceeded'
+                )
+                continue
+            children_count[sub_product.id] = count + 1
@@ -0,0 +1,229 @@
+import atexit
+import logging
+import queue
+import threading
+from datetime import timedelta
+
+from django.db import DatabaseError, DataError, IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from checkprocess.models import LogFromMistake
+
+
+ERROR_LOG_BATCH_SIZE = 200
+ERROR_LOG_FLUSH_INTERVAL = 2 # seconds; 0 = zapis od razu w wątku requestu
+ERROR_LOG_QUEUE_SIZE = 5000
+ERROR_LOG_COLLAPSE_WINDOW = 60 # seconds; 0 = bez zwijania powtórzeń
+
+logger = logging.getLogger(__name__)
+
+# Błędy konkretnego wiersza (usunięty obiekt / miejsce, za długi tekst) - ponowienie nic nie da, wiersz jest pomijany
+ROW_ERRORS = (IntegrityError, DataError)
+
+
+def _collapse_key(log):
+    return log.product_sn, log.error_code, log.place_id, log.place_name_raw
+
+
+def _forget_ids(logs):
+    # bulk_create dzielony na paczki nadaje id jeszcze przed wycofaniem savepointu - te wiersze nie istnieją
+    for log in logs:
+        log.pk = None
+
+
+class ErrorLogWriter:
+    """
+    Bufor logów błędnych skanów. Requesty tylko wrzucają log do ograniczonej kolejki,
+    wątek w tle zapisuje je paczkami (bulk_create) co flush_interval albo po zebraniu batch_size.
+    Przy pełnej kolejce log zapisuje się od razu w wątku requestu - nic nie ginie, najwyżej zwalnia.
+
+    Powtórzenia (ten sam SN, kod i miejsce) w oknie collapse_window od pierwszego wystąpienia
+    nie tworzą nowych wierszy - zwiększają repeat_count i last_seen_at pierwszego logu.
+
+    Paczka odrzucona przez bazę (np. miejsce / obiekt usunięte w międzyczasie) jest zapisywana po jednym wierszu
+    i przepadają tylko wiersze błędne. Przy niedostępnej bazie niezapisane logi wracają do kolejki na kolejny flush.
+    """
+    def __init__(self, batch_size=ERROR_LOG_BATCH_SIZE, flush_interval=ERROR_LOG_FLUSH_INTERVAL,
+                 queue_size=ERROR_LOG_QUEUE_SIZE, collapse_window=ERROR_LOG_COLLAPSE_WINDOW):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.collapse_window = timedelta(seconds=collapse_window)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.recent = {} # klucz -> (id zapisanego logu, czas pierwszego wystąpienia)
+        self.pending_repeats = {} # powtórzenia, których nie udało się dopisać - idą z kolejnym zapisem
+        self.write_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.start_lock = threading.Lock()
+
+    def add(self, *logs):
+        if not self.flush_interval:
+            self.report_lost(self.write(logs))
+            return
+
+        self.start()
+        for log in logs:
+            try:
+                self.queue.put_nowait(log)
+            except queue.Full:
+                self.report_lost(self.write([log]))
+
+        if self.queue.qsize() >= self.batch_size:
+            self.wakeup.set()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='error-log-writer', daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Zapis logów błędnych skanów nie powiódł się")
+            finally:
+                close_old_connections()
+
+    def close(self):
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=10)
+        # Reszta kolejki zapisywana przy wyłączaniu procesu
+        self.flush()
+
+    def drain(self):
+        logs = []
+        while True:
+            try:
+                logs.append(self.queue.get_nowait())
+            except queue.Empty:
+                return logs
+
+    def flush(self):
+        logs = self.drain()
+        while logs:
+            failed = self.write(logs[:self.batch_size])
+            logs = logs[self.batch_size:]
+            if failed:
+                # Baza niedostępna - nie próbujemy kolejnych paczek, wszystko czeka na następny flush
+                self.requeue(failed + logs)
+                return
+
+    def requeue(self, logs):
+        lost = []
+        for log in logs:
+            try:
+                self.queue.put_nowait(log)
+            except queue.Full:
+                lost.append(log)
+        self.report_lost(lost)
+
+    def report_lost(self, logs):
+        if logs:
+            logger.error("Utracono %d logów błędnych skanów (baza niedostępna, kolejka pełna)", len(logs))
+
+    def write(self, logs):
+        """
+        Zwraca logi niezapisane przez błąd bazy (do ponowienia). Wiersze odrzucone przez bazę są pomijane.
+        """
+        with self.write_lock:
+            new_logs, repeats = self.collapse(logs)
+
+            failed = self.insert(new_logs)
+            if self.collapse_window:
+                for log in new_logs:
+                    if log.pk is not None:
+                        self.recent[_collapse_key(log)] = (log.id, log.created_at)
+
+            self.update_repeats(repeats)
+            return failed
+
+    def insert(self, logs):
+        if not logs:
+            return []
+        try:
+            # Savepoint - w wątku requestu błąd nie psuje jego transakcji
+            with transaction.atomic():
+                LogFromMistake.objects.bulk_create(logs, batch_size=self.batch_size)
+            return []
+        except ROW_ERRORS:
+            _forget_ids(logs)
+            logger.warning("Paczka %d logów błędnych skanów odrzucona - zapis po jednym", len(logs), exc_info=True)
+        except DatabaseError:
+            _forget_ids(logs)
+            logger.exception("Zapis %d logów błędnych skanów nie powiódł się - ponowienie przy kolejnym flushu", len(logs))
+            return list(logs)
+
+        for index, log in enumerate(logs):
+            try:
+                with transaction.atomic():
+                    LogFromMistake.objects.bulk_create([log])
+            except ROW_ERRORS:
+                logger.error("Pominięty log błędnego skanu %s (%s)", log.product_sn, log.error_code, exc_info=True)
+            except DatabaseError:
+                logger.exception("Zapis logów błędnych skanów przerwany - ponowienie przy kolejnym flushu")
+                return list(logs[index:])
+        return []
+
+    def update_repeats(self, repeats):
+        for log_id, (count, last_seen_at) in repeats.items():
+            pending_count, pending_last_seen_at = self.pending_repeats.pop(log_id, (0, last_seen_at))
+            self.pending_repeats[log_id] = (pending_count + count, max(pending_last_seen_at, last_seen_at))
+
+        for log_id, (count, last_seen_at) in list(self.pending_repeats.items()):
+            try:
+                with transaction.atomic():
+                    LogFromMistake.objects.filter(id=log_id).update(
+                        repeat_count=F('repeat_count') + count, last_seen_at=last_seen_at
+                    )
+            except DatabaseError:
+                logger.exception("Dopisanie powtórzeń logów błędnych skanów nie powiodło się - ponowienie przy kolejnym zapisie")
+                return
+            del self.pending_repeats[log_id]
+
+    def collapse(self, logs):
+        if not self.collapse_window:
+            return list(logs), {}
+
+        horizon = timezone.now() - self.collapse_window
+        self.recent = {key: value for key, value in self.recent.items() if value[1] >= horizon}
+
+        new_logs = []
+        heads = {}
+        repeats = {}
+        for log in logs:
+            key = _collapse_key(log)
+
+            if key in self.recent and log.created_at - self.recent[key][1] <= self.collapse_window:
+                log_id = self.recent[key][0]
+                count, last_seen_at = repeats.get(log_id, (0, None))
+                repeats[log_id] = (count + 1, log.created_at)
+                continue
+
+            head = heads.get(key)
+            if head and log.created_at - head.created_at <= self.collapse_window:
+                head.repeat_count += 1
+                head.last_seen_at = log.created_at
+                continue
+
+            heads[key] = log
+            new_logs.append(log)
+
+        return new_logs, repeats
+
+
+_error_log_writer = ErrorLogWriter()
+
+
+def get_error_log_writer():
+    return _error_log_writer
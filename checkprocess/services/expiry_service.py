@@ -0,0 +1,44 @@
+from checkprocess.models import ProductObject
+from django.db.models import Q
+from django.utils import timezone
+
+
+def expired_condition(current_time):
+    return Q(exp_date_in_process__lt=timezone.localdate(current_time)) | Q(max_in_process__lt=current_time)
+
+
+def is_expired(product_obj, current_time):
+    today = timezone.localdate(current_time)
+    return bool(
+        (product_obj.exp_date_in_process and product_obj.exp_date_in_process < today)
+        or (product_obj.max_in_process and product_obj.max_in_process < current_time)
+    )
+
+
+def refresh_expired_at(product_obj, current_time):
+    # Ruch przelicza terminy (exp_date_in_process / max_in_process) - flaga musi za nimi nadążyć
+    if not is_expired(product_obj, current_time):
+        product_obj.expired_at = None
+    elif product_obj.expired_at is None:
+        product_obj.expired_at = current_time
+
+
+def sweep_expired(current_time=None, place_ids=None, model=ProductObject):
+    """
+    Oznacza expired_at obiektom na miejscach, którym właśnie minął termin.
+    Zwraca id miejsc z nowo przeterminowanymi obiektami (do powiadomienia linii).
+    model - migracja podaje historyczny ProductObject z apps.get_model.
+    """
+    current_time = current_time or timezone.now()
+    queryset = (
+        model.objects
+        .filter(expired_at__isnull=True, current_place__isnull=False)
+        .filter(expired_condition(current_time))
+    )
+    if place_ids is not None:
+        queryset = queryset.filter(current_place_id__in=place_ids)
+
+    expired_place_ids = set(queryset.values_list('current_place_id', flat=True).distinct())
+    if expired_place_ids:
+        queryset.update(expired_at=current_time)
+    return expired_place_ids
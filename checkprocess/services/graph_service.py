@@ -0,0 +1,77 @@
+from checkprocess.models import Edge, ProductProcess
+from django.core.cache import cache
+
+
+GRAPH_CACHE_KEY = 'process_graph_{product_id}'
+GRAPH_CACHE_TIMEOUT = 5 * 60 # upper bound on staleness if a worker misses the on-commit invalidation
+
+
+class CompiledProcessGraph:
+    """
+    Topologia procesów jednego produktu (węzły + krawędzie) zbudowana raz i trzymana w cache.
+    Walidator pyta graf zamiast robić zapytania o Edge / ProductProcessCondition przy każdym skanie.
+    """
+    def __init__(self, product_id, nodes, adjacency):
+        self.product_id = product_id
+        self.nodes = nodes
+        self.adjacency = adjacency
+
+    @classmethod
+    def build(cls, product_id):
+        nodes = {}
+        rows = (
+            ProductProcess.objects
+            .filter(product_id=product_id)
+            .values('id', 'label', 'cond_path', 'killing_app', 'respect_fifo_rules', 'conditions__id')
+        )
+        for row in rows:
+            nodes[str(row['id'])] = {
+                'label': row['label'],
+                'cond_path': row['cond_path'],
+                'killing_app': row['killing_app'],
+                'respect_fifo_rules': row['respect_fifo_rules'],
+                'is_condition': row['conditions__id'] is not None,
+            }
+
+        adjacency = {process_id: set() for process_id in nodes}
+        edges = Edge.objects.filter(source__product_id=product_id).values_list('source_id', 'target_id')
+        for source_id, target_id in edges:
+            adjacency.setdefault(str(source_id), set()).add(str(target_id))
+
+        return cls(product_id, nodes, adjacency)
+
+    def node(self, process_id):
+        if process_id is None:
+            return None
+        return self.nodes.get(str(process_id))
+
+    def label(self, process_id):
+        node = self.node(process_id)
+        return node['label'] if node else None
+
+    def has_edge(self, source_id, target_id):
+        if source_id is None or target_id is None:
+            return False
+        return str(target_id) in self.adjacency.get(str(source_id), ())
+
+    def is_condition(self, process_id):
+        node = self.node(process_id)
+        return bool(node and node['is_condition'])
+
+    def targets(self, process_id):
+        return self.adjacency.get(str(process_id), set())
+
+
+def get_process_graph(product_id):
+    key = GRAPH_CACHE_KEY.format(product_id=product_id)
+    graph = cache.get(key)
+    if graph is None:
+        graph = CompiledProcessGraph.build(product_id)
+        cache.set(key, graph, timeout=GRAPH_CACHE_TIMEOUT)
+    return graph
+
+
+def invalidate_process_graph(product_id):
+    if product_id is None:
+        return
+    cache.delete(GRAPH_CACHE_KEY.format(product_id=product_id))
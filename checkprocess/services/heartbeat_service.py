@@ -0,0 +1,41 @@
+from checkprocess.models import PlaceGroupToAppKill
+from django.core.cache import cache
+from django.utils import timezone
+
+
+HEARTBEAT_KEY = 'group_heartbeat_{group_id}'
+HEARTBEAT_FLUSH_LOCK_KEY = 'group_heartbeat_flush_{group_id}'
+HEARTBEAT_FLUSH_INTERVAL = 15 # seconds, well below the 1 minute window of validate_status_of_line
+HEARTBEAT_TIMEOUT = 60 * 10
+
+
+def record_heartbeat(group_id, current_time=None):
+    """
+    Odnotowuje że aplikacja grupy żyje. Świeży czas trafia do cache przy każdym sygnale,
+    do bazy (PlaceGroupToAppKill.last_check) najwyżej raz na HEARTBEAT_FLUSH_INTERVAL.
+    """
+    current_time = current_time or timezone.now()
+    cache.set(HEARTBEAT_KEY.format(group_id=group_id), current_time, timeout=HEARTBEAT_TIMEOUT)
+
+    # add() na RedisCache to SET NX (atomowe) - przy kilku workerach tylko jeden zapisze do bazy w danym oknie.
+    # Na cache bez atomowego add (np. FileBasedCache) zdarzy się co najwyżej podwójny, nieszkodliwy UPDATE last_check
+    if cache.add(HEARTBEAT_FLUSH_LOCK_KEY.format(group_id=group_id), True, timeout=HEARTBEAT_FLUSH_INTERVAL):
+        PlaceGroupToAppKill.objects.filter(id=group_id).update(last_check=current_time)
+
+
+async def arecord_heartbeat(group_id, current_time=None):
+    # Wersja dla widoków async - to samo, przez async API cache i ORM
+    current_time = current_time or timezone.now()
+    await cache.aset(HEARTBEAT_KEY.format(group_id=group_id), current_time, timeout=HEARTBEAT_TIMEOUT)
+
+    if await cache.aadd(HEARTBEAT_FLUSH_LOCK_KEY.format(group_id=group_id), True, timeout=HEARTBEAT_FLUSH_INTERVAL):
+        await PlaceGroupToAppKill.objects.filter(id=group_id).aupdate(last_check=current_time)
+
+
+def get_last_check(group):
+    heartbeat = cache.get(HEARTBEAT_KEY.format(group_id=group.id))
+    if heartbeat is None:
+        return group.last_check
+    if group.last_check is None:
+        return heartbeat
+    return max(heartbeat, group.last_check)
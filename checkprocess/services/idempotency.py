@@ -0,0 +1,93 @@
+import functools
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+
+SCAN_KEY = 'scan_{scope}_{digest}'
+SCAN_IN_PROGRESS = 'in_progress'
+SCAN_DEDUPE_WINDOW = 10 # seconds; powtórzony skan bez klucza (podwójny odczyt skanera, retry terminala)
+SCAN_IDEMPOTENCY_TTL = 10 * 60 # seconds; skan z nagłówkiem Idempotency-Key
+SCAN_CLAIM_TIMEOUT = 30 # ile najdłużej może trwać obsługa pierwszego skanu, zanim blokada wygaśnie
+SCAN_WAIT_TIMEOUT = 5 # ile powtórka czeka na odpowiedź pierwszego skanu
+SCAN_WAIT_STEP = 0.05
+
+
+def scan_fingerprint(path, data):
+    return hashlib.sha256((path + json.dumps(data, sort_keys=True, default=str)).encode()).hexdigest()
+
+
+def scan_key(scope, path, data, idempotency_key=None):
+    """
+    Klucz skanu: nagłówek Idempotency-Key, a bez niego treść żądania (ścieżka + body).
+    Zwraca (klucz w cache, czas przechowania odpowiedzi).
+    """
+    if idempotency_key:
+        digest, ttl = hashlib.sha256(idempotency_key.encode()).hexdigest(), SCAN_IDEMPOTENCY_TTL
+    else:
+        digest, ttl = scan_fingerprint(path, data), SCAN_DEDUPE_WINDOW
+
+    return SCAN_KEY.format(scope=scope, digest=digest), ttl
+
+
+def _replay(key, fingerprint):
+    # Powtórka czeka, aż pierwszy skan skończy - dostaje jego odpowiedź zamiast przechodzić walidację drugi raz
+    deadline = time.monotonic() + SCAN_WAIT_TIMEOUT
+    while True:
+        stored = cache.get(key)
+        if stored is None:
+            return None
+        stored_fingerprint, result = stored
+        if stored_fingerprint != fingerprint:
+            # Ten sam Idempotency-Key z inną treścią - to nie powtórka, tylko błąd klienta
+            return Response(
+                {"detail": "Ten Idempotency-Key został użyty z inną treścią skanu.", "code": "idempotency_key_reused"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if result != SCAN_IN_PROGRESS:
+            status_code, data = result
+            return Response(data, status=status_code, headers={'Idempotent-Replayed': 'true'})
+        if time.monotonic() >= deadline:
+            return Response(
+                {"detail": "Ten skan jest już przetwarzany.", "code": "scan_in_progress"},
+                status=status.HTTP_409_CONFLICT
+            )
+        time.sleep(SCAN_WAIT_STEP)
+
+
+def idempotent_scan(post):
+    """
+    Dekorator metody post widoku skanu. Pierwszy skan zajmuje klucz w cache i zapisuje swoją odpowiedź,
+    powtórki w oknie dostają tę samą odpowiedź bez dotykania bazy (także bez drugiego wpisu w LogFromMistake).
+    Przy kluczu zapisany jest skrót treści - Idempotency-Key powtórzony z innym body dostaje 422.
+    Wyjątek w obsłudze zwalnia klucz - kolejna próba idzie normalnie.
+    """
+    @functools.wraps(post)
+    def wrapper(view, request, *args, **kwargs):
+        key, ttl = scan_key(view.__class__.__name__, request.path, request.data, request.headers.get('Idempotency-Key'))
+        fingerprint = scan_fingerprint(request.path, request.data)
+
+        # add() na RedisCache to SET NX - z równoczesnych skanów klucz zajmuje dokładnie jeden, także między workerami
+        while not cache.add(key, (fingerprint, SCAN_IN_PROGRESS), timeout=SCAN_CLAIM_TIMEOUT):
+            response = _replay(key, fingerprint)
+            if response is not None:
+                return response
+            # Klucz zniknął w międzyczasie (wygasł albo pierwszy skan padł) - próbujemy zająć go sami
+
+        try:
+            response = post(view, request, *args, **kwargs)
+        except Exception:
+            cache.delete(key)
+            raise
+
+        if isinstance(response, Response) and response.status_code < 500:
+            cache.set(key, (fingerprint, (response.status_code, response.data)), timeout=ttl)
+        else:
+            cache.delete(key)
+        return response
+
+    return wrapper
@@ -0,0 +1,360 @@
+from checkprocess.models import PlaceGroupToAppKill, Place, ProductObject, AppToKill
+from checkprocess.services.heartbeat_service import record_heartbeat
+from checkprocess.services.message_scheduler import next_due_at, claim_due_message
+from checkprocess.services.expiry_service import sweep_expired
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+from django_eventstream import send_event
+from django_eventstream.utils import sse_encode_event
+from django_eventstream.views import events
+from django.http import StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from datetime import datetime, time, timedelta
+from time import time_ns
+import hashlib
+
+
+KILL_SNAPSHOT_KEY = 'kill_snapshot_{generation}_{group_generation}_{group_hash}'
+KILL_SNAPSHOT_GENERATION_KEY = 'kill_snapshot_generation'
+KILL_GROUP_GENERATION_KEY = 'kill_group_generation_{group_hash}'
+KILL_SNAPSHOT_TIMEOUT = 60 * 60 # safety net for changes which do not go through signals / handlers
+
+KILL_CHANNEL = 'kill-group-{group_id}'
+KILL_PUBLISHED_KEY = 'kill_published_{group_id}'
+KILL_STREAM_ALIVE_KEY = 'kill_stream_alive_{group_id}'
+KILL_STREAM_ALIVE_TIMEOUT = 60 # stream yields at least a keep-alive every 20 s
+
+
+class KillSnapshot:
+    """
+    Stan "kill" jednej grupy linii: przeterminowane miejsca, flagi AppToKill i termin najbliższej wiadomości.
+    Przeliczany tylko po ruchu / zmianie flagi / wiadomości albo gdy minie valid_until (najbliższe przeterminowanie).
+    """
+    def __init__(self, group_id, group_name, checking, place_ids=(), places_with_expired=(), per_place=None,
+                 valid_until=None, next_message_at=None):
+        self.group_id = group_id
+        self.group_name = group_name
+        self.checking = checking
+        self.place_ids = list(place_ids)
+        self.places_with_expired = list(places_with_expired)
+        self.per_place = per_place or {}
+        self.valid_until = valid_until
+        self.next_message_at = next_message_at
+
+    @property
+    def is_active(self):
+        return self.checking and bool(self.place_ids)
+
+    @property
+    def expired(self):
+        return bool(self.places_with_expired)
+
+    @property
+    def kill(self):
+        return self.expired or any(self.per_place.values())
+
+    def is_stale(self, current_time):
+        return self.valid_until is not None and current_time >= self.valid_until
+
+    @classmethod
+    def build(cls, group_name, current_time):
+        group = PlaceGroupToAppKill.objects.filter(name=group_name).values('id', 'checking').first()
+        if group is None:
+            return None
+
+        if not group['checking']:
+            return cls(group['id'], group_name, checking=False)
+
+        places = dict(
+            Place.objects
+            .filter(group_id=group['id'], process__killing_app=True)
+            .values_list('id', 'name')
+        )
+        if not places:
+            return cls(group['id'], group_name, checking=True)
+
+        today = timezone.localdate(current_time)
+        on_places = ProductObject.objects.filter(current_place_id__in=places.keys())
+
+        # Dociągamy to, czego sweeper jeszcze nie oznaczył, potem tylko indeksowany odczyt expired_at
+        sweep_expired(current_time, place_ids=places.keys())
+        expired_place_ids = set(
+            on_places
+            .filter(expired_at__isnull=False)
+            .values_list('current_place_id', flat=True)
+            .distinct()
+        )
+        upcoming = on_places.aggregate(
+            next_max_in_process=Min('max_in_process', filter=Q(max_in_process__gte=current_time)),
+            next_exp_date=Min('exp_date_in_process', filter=Q(exp_date_in_process__gte=today)),
+        )
+
+        per_place = dict(
+            AppToKill.objects.filter(line_name_id__in=places.keys())
+            .values_list('line_name_id', 'killing_flag')
+        )
+        next_message_at = next_due_at(places.keys())
+
+        return cls(
+            group['id'],
+            group_name,
+            checking=True,
+            place_ids=places.keys(),
+            places_with_expired=[name for place_id, name in places.items() if place_id in expired_place_ids],
+            per_place=per_place,
+            valid_until=_next_expiry(upcoming['next_max_in_process'], upcoming['next_exp_date']),
+            next_message_at=next_message_at,
+        )
+
+
+def _next_expiry(next_max_in_process, next_exp_date):
+    candidates = []
+    if next_max_in_process is not None:
+        candidates.append(next_max_in_process)
+    if next_exp_date is not None:
+        # exp_date_in_process < today - obiekt przeterminowuje się o północy dnia następnego
+        candidates.append(timezone.make_aware(datetime.combine(next_exp_date + timedelta(days=1), time.min)))
+    return min(candidates) if candidates else None
+
+
+def _group_hash(group_name):
+    # Nazwy grup mają spacje ("SMT 11") - w kluczu trzymamy hash
+    return hashlib.md5(group_name.encode()).hexdigest()
+
+
+def _generation_keys(group_name):
+    return KILL_SNAPSHOT_GENERATION_KEY, KILL_GROUP_GENERATION_KEY.format(group_hash=_group_hash(group_name))
+
+
+def _format_snapshot_key(group_name, generations):
+    global_key, group_key = _generation_keys(group_name)
+    return KILL_SNAPSHOT_KEY.format(
+        generation=generations[global_key],
+        group_generation=generations[group_key],
+        group_hash=_group_hash(group_name),
+    )
+
+
+def _snapshot_key(group_name):
+    """
+    Klucz zawiera generację globalną i generację grupy. Inwalidacja podbija generację zamiast kasować klucz,
+    więc snapshot zbudowany przed commitem i zapisany po nim ląduje pod starym kluczem, którego nikt już nie czyta.
+    """
+    keys = _generation_keys(group_name)
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # Brak licznika (pierwszy odczyt albo utrata cache) - start od czasu, nie od 1, żeby stare klucze nie wróciły
+            cache.add(key, time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return _format_snapshot_key(group_name, generations)
+
+
+def _bump_generation(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time_ns(), timeout=None)
+
+
+def _bump_group_generation(group_name):
+    _bump_generation(KILL_GROUP_GENERATION_KEY.format(group_hash=_group_hash(group_name)))
+
+
+def get_kill_snapshot(group_name, current_time=None):
+    current_time = current_time or timezone.now()
+    key = _snapshot_key(group_name)
+
+    snapshot = cache.get(key)
+    if snapshot is None or snapshot.is_stale(current_time):
+        snapshot = KillSnapshot.build(group_name, current_time)
+        if snapshot is not None:
+            cache.set(key, snapshot, timeout=KILL_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+async def aget_kill_snapshot(group_name, current_time=None):
+    """
+    Wersja get_kill_snapshot dla widoków async. Odczyt z cache (zwykła ścieżka pollingu) jest async,
+    przeliczenie snapshotu zostaje synchroniczne w wątku - jest rzadkie i woła sweeper.
+    """
+    current_time = current_time or timezone.now()
+    key = await _asnapshot_key(group_name)
+
+    snapshot = await cache.aget(key)
+    if snapshot is None or snapshot.is_stale(current_time):
+        snapshot = await sync_to_async(KillSnapshot.build)(group_name, current_time)
+        if snapshot is not None:
+            await cache.aset(key, snapshot, timeout=KILL_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+async def _asnapshot_key(group_name):
+    keys = _generation_keys(group_name)
+    generations = await cache.aget_many(keys)
+    for key in keys:
+        if key not in generations:
+            await cache.aadd(key, time_ns(), timeout=None)
+            generations[key] = await cache.aget(key)
+    return _format_snapshot_key(group_name, generations)
+
+
+def pop_due_message(snapshot, current_time):
+    """
+    Zwraca (i oznacza jako wysłaną) najstarszą zaległą wiadomość grupy - zapytanie tylko gdy jakaś jest już należna.
+    """
+    if snapshot.next_message_at is None or snapshot.next_message_at > current_time:
+        return ""
+
+    message = claim_due_message(snapshot.place_ids, current_time)
+    # Wiadomość wydana albo zmienił się termin - snapshot musi przeliczyć next_message_at
+    _bump_group_generation(snapshot.group_name)
+    return message or ""
+
+
+async def apop_due_message(snapshot, current_time):
+    if snapshot.next_message_at is None or snapshot.next_message_at > current_time:
+        return ""
+
+    message = await sync_to_async(claim_due_message)(snapshot.place_ids, current_time)
+    group_key = KILL_GROUP_GENERATION_KEY.format(group_hash=_group_hash(snapshot.group_name))
+    try:
+        await cache.aincr(group_key)
+    except ValueError:
+        await cache.aadd(group_key, time_ns(), timeout=None)
+    return message or ""
+
+
+def kill_status_payload(snapshot, message=""):
+    if not snapshot.is_active:
+        return {
+            "group": snapshot.group_name,
+            "expired": False,
+            "places_with_expired": [],
+            "kill": False,
+            "per_place": {}
+        }
+
+    return {
+        "group": snapshot.group_name,
+        "expired": snapshot.expired,
+        "places_with_expired": snapshot.places_with_expired,
+        "kill": snapshot.kill,
+        "per_place": snapshot.per_place,
+        "message": message
+    }
+
+
+def kill_channel(group_id):
+    return KILL_CHANNEL.format(group_id=group_id)
+
+
+def mark_kill_stream_alive(group_id):
+    cache.set(KILL_STREAM_ALIVE_KEY.format(group_id=group_id), True, timeout=KILL_STREAM_ALIVE_TIMEOUT)
+
+
+def publish_kill_status(group_name, current_time=None):
+    """
+    Wysyła stan grupy na jej kanał, ale tylko gdy się zmienił albo jest wiadomość do przekazania.
+    """
+    current_time = current_time or timezone.now()
+    snapshot = get_kill_snapshot(group_name, current_time)
+    if snapshot is None:
+        return None
+
+    message = pop_due_message(snapshot, current_time) if snapshot.is_active else ""
+    payload = kill_status_payload(snapshot, message)
+    state = _kill_state(payload)
+
+    published_key = KILL_PUBLISHED_KEY.format(group_id=snapshot.group_id)
+    if not message and cache.get(published_key) == state:
+        return None
+
+    cache.set(published_key, state, timeout=None)
+    send_event(kill_channel(snapshot.group_id), 'kill-status', payload)
+    return payload
+
+
+def _kill_state(payload):
+    return {key: value for key, value in payload.items() if key != "message"}
+
+
+def kill_stream_tick(group_id, group_name):
+    """
+    Zwraca bieżący stan grupy (payload bez wiadomości), żeby strumień mógł sprawdzić, czy linia go ma.
+    """
+    # Każdy fragment strumienia (zdarzenie albo keep-alive co 20 s) liczy się jako heartbeat linii
+    record_heartbeat(group_id)
+    mark_kill_stream_alive(group_id)
+    # Zmiany zależne tylko od czasu (przeterminowanie, należna wiadomość) nie mają zdarzenia - łapiemy je tutaj
+    publish_kill_status(group_name)
+    snapshot = get_kill_snapshot(group_name)
+    return kill_status_payload(snapshot) if snapshot is not None else None
+
+
+async def _kill_stream(content, group_id, group_name, initial_payload):
+    first_chunk = True
+    delivered = _kill_state(initial_payload)
+    async for chunk in content:
+        if first_chunk:
+            first_chunk = False
+            chunk += sse_encode_event('kill-status', initial_payload, json_encode=True).encode()
+        payload = await sync_to_async(kill_stream_tick)(group_id, group_name)
+        state = _kill_state(payload) if payload is not None else delivered
+        if b'event: kill-status' in chunk:
+            delivered = state
+        elif state != delivered:
+            # django_eventstream gubi zdarzenia kanału bez storage, które przyjdą, zanim strumień zacznie na nie czekać
+            # (np. tuż po pierwszym fragmencie) - taka linia dostaje stan przy najbliższym fragmencie, najpóźniej z keep-alive
+            delivered = state
+            chunk += sse_encode_event('kill-status', payload, json_encode=True).encode()
+        yield chunk
+
+
+def open_kill_stream(request, group_id, group_name):
+    """
+    Strumień SSE decyzji kill dla grupy - linia dostaje aktualny stan na start, potem tylko zmiany.
+    """
+    record_heartbeat(group_id)
+    mark_kill_stream_alive(group_id)
+
+    snapshot = get_kill_snapshot(group_name)
+    initial_payload = kill_status_payload(snapshot, pop_due_message(snapshot, timezone.now()) if snapshot.is_active else "")
+
+    response = events(request, channels=[kill_channel(group_id)])
+    if isinstance(response, StreamingHttpResponse) and response.is_async:
+        response.streaming_content = _kill_stream(response.streaming_content, group_id, group_name, initial_payload)
+    return response
+
+
+def invalidate_kill_snapshots_for_places(place_ids):
+    place_ids = {place_id for place_id in place_ids if place_id is not None}
+    if not place_ids:
+        return
+
+    groups = dict(
+        Place.objects
+        .filter(id__in=place_ids, group__isnull=False)
+        .values_list('group_id', 'group__name')
+        .distinct()
+    )
+    for group_name in groups.values():
+        _bump_group_generation(group_name)
+
+    # Grupy ze słuchającą linią dostają nowy stan od razu, reszta przeliczy się przy odpytaniu
+    alive = cache.get_many([KILL_STREAM_ALIVE_KEY.format(group_id=group_id) for group_id in groups])
+    for group_id, group_name in groups.items():
+        if KILL_STREAM_ALIVE_KEY.format(group_id=group_id) in alive:
+            publish_kill_status(group_name)
+
+
+def invalidate_kill_snapshots_for_places_on_commit(place_ids):
+    place_ids = set(place_ids)
+    transaction.on_commit(lambda: invalidate_kill_snapshots_for_places(place_ids))
+
+
+def invalidate_all_kill_snapshots():
+    # Zmiana konfiguracji (grupy, miejsca, procesy) - nowa generacja kluczy, stare wygasną same
+    _bump_generation(KILL_SNAPSHOT_GENERATION_KEY)
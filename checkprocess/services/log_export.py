@@ -0,0 +1,50 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+
+EXPORT_CHUNK_SIZE = 2000 # wierszy na jeden fetch kursora serwerowego
+EXPORT_FIELDS = ['id', 'entry_time', 'who_entry', 'full_sn', 'process_name', 'place_name', 'movement_type']
+
+
+def export_rows(queryset):
+    """
+    Wiersze logów jako krotki w kolejności EXPORT_FIELDS, czytane kursorem serwerowym po EXPORT_CHUNK_SIZE -
+    w pamięci jest najwyżej jedna paczka, niezależnie od rozmiaru tabeli.
+    """
+    return (
+        queryset
+        .annotate(
+            full_sn=F('product_object__full_sn'),
+            process_name=F('process__label'),
+            place_name=F('place__name'),
+        )
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+class _Echo:
+    # csv.writer pisze do "pliku", który oddaje zapisany wiersz zamiast go trzymać
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([value.isoformat() if hasattr(value, 'isoformat') else value for value in row])
+
+
+def ndjson_stream(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + "\n"
+
+
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_stream, 'application/x-ndjson'),
+    'csv': (csv_stream, 'text/csv; charset=utf-8'),
+}
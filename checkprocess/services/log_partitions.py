@@ -0,0 +1,151 @@
+import gzip
+import os
+import re
+from datetime import datetime
+
+from django.db import connection as default_connection
+from django.utils import timezone
+
+from checkprocess.models import ProductObjectProcessLog
+
+
+LOG_TABLE = ProductObjectProcessLog._meta.db_table
+DEFAULT_PARTITION = f"{LOG_TABLE}_default"
+ARCHIVE_TABLE = LOG_TABLE + "_archive_{month:%Y%m}"
+PARTITION_NAME = re.compile(rf"^{LOG_TABLE}_p(\d{{4}})(\d{{2}})$")
+
+PARTITION_MONTHS_AHEAD = 2
+LOG_RETENTION_MONTHS = 24
+
+
+def month_start(value):
+    # Granice partycji w czasie lokalnym (TIME_ZONE) - miesiąc partycji to miesiąc kalendarzowy na hali
+    value = timezone.localtime(value)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return timezone.make_aware(datetime(index // 12, index % 12 + 1, 1))
+
+
+def partition_name(month):
+    return f"{LOG_TABLE}_p{month:%Y%m}"
+
+
+def is_partitioned(connection=default_connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [LOG_TABLE]
+        )
+        return cursor.fetchone()[0]
+
+
+def existing_partitions(connection=default_connection):
+    """
+    Miesiące, dla których istnieje partycja (bez domyślnej), od najstarszego.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)", [LOG_TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    months = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append(timezone.make_aware(datetime(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(months)
+
+
+def _bounds(month):
+    return f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+
+def create_partition(cursor, month):
+    """
+    Nowa partycja miesiąca. Wiersze tego miesiąca, które trafiły wcześniej do partycji domyślnej,
+    są do niej przenoszone - inaczej ATTACH by się nie udał.
+    """
+    name = partition_name(month)
+    cursor.execute(f"CREATE TABLE {name} (LIKE {LOG_TABLE} INCLUDING DEFAULTS)")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE entry_time >= %s AND entry_time < %s RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        [month, add_months(month, 1)]
+    )
+    # Indeksy i klucz główny partycji tworzy ATTACH na podstawie indeksów tabeli nadrzędnej
+    cursor.execute(f"ALTER TABLE {LOG_TABLE} ATTACH PARTITION {name} FOR VALUES {_bounds(month)}")
+    return name
+
+
+def ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD, current_time=None, connection=default_connection):
+    """
+    Zakłada brakujące partycje od bieżącego miesiąca do months_ahead naprzód. Zwraca nazwy utworzonych.
+    Na niepartycjonowanej tabeli (np. baza testowa bez migracji) nic nie robi.
+    """
+    if not is_partitioned(connection):
+        return []
+
+    current_month = month_start(current_time or timezone.now())
+    existing = set(existing_partitions(connection))
+
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(current_month, offset)
+            if month not in existing:
+                created.append(create_partition(cursor, month))
+    return created
+
+
+def _export_table(cursor, table, path):
+    query = f"COPY {table} TO STDOUT WITH (FORMAT csv, HEADER)"
+    raw_cursor = cursor.cursor
+    with gzip.open(path, 'wb') as archive_file:
+        if hasattr(raw_cursor, 'copy'):
+            with raw_cursor.copy(query) as copy:
+                for data in copy:
+                    archive_file.write(data)
+        else:
+            raw_cursor.copy_expert(query, archive_file)
+
+
+def archive_partitions(retention_months=LOG_RETENTION_MONTHS, archive_dir=None, current_time=None, connection=default_connection):
+    """
+    Odłącza partycje starsze niż retention_months. Bez archive_dir odłączona partycja zostaje
+    jako osobna tabela <log>_archive_RRRRMM, z archive_dir trafia do pliku CSV (gzip) i jest usuwana.
+    Zwraca listę (miesiąc, tabela albo plik).
+    """
+    if not is_partitioned(connection):
+        return []
+
+    cutoff = add_months(month_start(current_time or timezone.now()), -retention_months)
+
+    archived = []
+    with connection.cursor() as cursor:
+        for month in existing_partitions(connection):
+            if month >= cutoff:
+                break
+
+            name = partition_name(month)
+            cursor.execute(f"ALTER TABLE {LOG_TABLE} DETACH PARTITION {name}")
+
+            # Odłączona tabela zachowuje klucze obce - kaskadowe usuwanie obiektów kasowałoby archiwum
+            cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'", [name])
+            for (constraint,) in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"')
+
+            if archive_dir:
+                path = os.path.join(archive_dir, f"{name}.csv.gz")
+                _export_table(cursor, name, path)
+                cursor.execute(f"DROP TABLE {name}")
+                archived.append((month, path))
+            else:
+                archive_table = ARCHIVE_TABLE.format(month=month)
+                cursor.execute(f"ALTER TABLE {name} RENAME TO {archive_table}")
+                archived.append((month, archive_table))
+
+    return archived
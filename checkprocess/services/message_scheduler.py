@@ -0,0 +1,75 @@
+from checkprocess.models import MessageToApp
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from datetime import timedelta
+
+
+STENCIL_WARNINGS = [
+    (timedelta(hours=7, minutes=30), 'Produkcja tym sitem trwa ponad 7.5 godziny za 30 min aplikacja zostanie wyłączona'),
+    (timedelta(hours=8), 'Produkcja trwa już 8 godzin wyłączam aplikacje do czasu przezbrojenia'),
+]
+
+
+def _pending(place_ids):
+    # send=False + line + when_trigger idzie po częściowym indeksie idx_message_pending - historia wysłanych nie jest czytana
+    return MessageToApp.objects.filter(line_id__in=place_ids, send=False)
+
+
+def schedule_messages(place, messages, product=None, start_time=None):
+    """
+    Planuje wiadomości dla linii: messages to lista (za ile, treść) liczona od start_time.
+    """
+    start_time = start_time or timezone.now()
+    scheduled = MessageToApp.objects.bulk_create([
+        MessageToApp(line=place, message=message, send=False, when_trigger=start_time + delay, product=product)
+        for delay, message in messages
+    ])
+    # bulk_create nie wysyła sygnałów - status kill linii odświeżamy ręcznie
+    _invalidate_kill_snapshot_on_commit([place.id])
+    return scheduled
+
+
+def schedule_stencil_warnings(place, product, start_time=None):
+    return schedule_messages(place, STENCIL_WARNINGS, product=product, start_time=start_time)
+
+
+def cancel_pending_messages(place_ids):
+    place_ids = [place_id for place_id in place_ids if place_id is not None]
+    if not place_ids:
+        return 0
+
+    cancelled = _pending(place_ids).update(send=True)
+    if cancelled:
+        _invalidate_kill_snapshot_on_commit(place_ids)
+    return cancelled
+
+
+def next_due_at(place_ids):
+    return _pending(place_ids).aggregate(next_due_at=Min('when_trigger'))['next_due_at']
+
+
+def claim_due_message(place_ids, current_time=None):
+    """
+    Wydaje najstarszą należną wiadomość dokładnie raz - SKIP LOCKED pozwala kilku workerom nie czekać na siebie.
+    """
+    current_time = current_time or timezone.now()
+    with transaction.atomic():
+        msg_obj = (
+            _pending(place_ids)
+            .filter(when_trigger__lte=current_time)
+            .order_by('when_trigger')
+            .select_for_update(skip_locked=True)
+            .only('id', 'message')
+            .first()
+        )
+        if msg_obj is None:
+            return None
+
+        MessageToApp.objects.filter(id=msg_obj.id).update(send=True)
+    return msg_obj.message
+
+
+def _invalidate_kill_snapshot_on_commit(place_ids):
+    from checkprocess.services.kill_service import invalidate_kill_snapshots_for_places_on_commit
+    invalidate_kill_snapshots_for_places_on_commit(place_ids)
@@ -0,0 +1,86 @@
+from django.core.exceptions import ObjectDoesNotExist
+
+from checkprocess.models import Place, ProductObject, ProductProcess
+from checkprocess.services.graph_service import get_process_graph
+from checkprocess.services.settings_service import get_process_settings
+from checkprocess.services.unit_of_work import UnitOfWork
+
+
+class MovementContext:
+    """
+    Proces, miejsce i obiekty jednego ruchu ładowane raz na request. Walidator, handler i widok
+    korzystają z tych samych instancji zamiast ładować je każdy osobno.
+    Miejsce przychodzi w jednym zapytaniu razem z procesem (i jego defaults), grupą i AppToKill,
+    obiekty w dwóch - z bieżącym procesem, miejscem, subproduktem i matką, plus dzieci.
+    Zapisy walidatora i handlera idą przez wspólny unit_of_work.
+    """
+    OBJECT_RELATED = ('current_process', 'current_place', 'sub_product', 'mother_object')
+
+    def __init__(self, process_uuid, place_name):
+        self.process_uuid = process_uuid
+        self.place_name = place_name
+
+        self.process = None
+        self.place = None
+        self.objects = {}
+        self.loaded = False
+        self.unit_of_work = UnitOfWork()
+        self._graph = None
+        self._settings = None
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = get_process_graph(self.process.product_id)
+        return self._graph
+
+    @property
+    def settings(self):
+        if self._settings is None and self.process:
+            self._settings = get_process_settings(self.process.id)
+        return self._settings
+
+    def load(self, full_sns):
+        # Drugie wywołanie (np. widok załadował kontekst przed walidatorem) nic nie robi
+        if self.loaded:
+            return self
+
+        self.load_place_and_process()
+        self.load_objects(full_sns)
+        self.loaded = True
+        return self
+
+    def load_place_and_process(self):
+        try:
+            self.place = (
+                Place.objects
+                .select_related('process', 'process__defaults', 'group', 'apptokill')
+                .get(name=self.place_name, process_id=self.process_uuid)
+            )
+        except (ObjectDoesNotExist, ValueError, TypeError):
+            self.place = None
+
+        if self.place:
+            self.process = self.place.process
+            return
+
+        try:
+            self.process = ProductProcess.objects.select_related('defaults').get(id=self.process_uuid)
+        except (ObjectDoesNotExist, ValueError, TypeError):
+            self.process = None
+
+    def load_objects(self, full_sns):
+        full_sns = [sn for sn in full_sns if sn]
+        if not full_sns:
+            return
+
+        objects = (
+            ProductObject.objects
+            .filter(full_sn__in=full_sns)
+            .select_related(*self.OBJECT_RELATED)
+            .prefetch_related('child_object')
+        )
+        self.objects.update({obj.full_sn: obj for obj in objects})
+
+    def get_object(self, full_sn):
+        return self.objects.get(full_sn)
@@ -1,23 +1,27 @@
 from checkprocess.validation import ValidationErrorWithCode
-from checkprocess.models import ProductObjectProcessLog, AppToKill, ConditionLog, MessageToApp, ProductObject
-from django.core.exceptions import ObjectDoesNotExist
-from datetime import datetime, timedelta
-from django.utils.timezone import now
+from checkprocess.models import ProductObjectProcessLog, AppToKill, ConditionLog, ProductObject
+from checkprocess.services.settings_service import get_process_settings
+from checkprocess.services.kill_service import invalidate_kill_snapshots_for_places_on_commit
+from checkprocess.services.expiry_service import refresh_expired_at
+from checkprocess.services.occupancy_service import load_occupancy_state, record_occupancy
+from checkprocess.services.unit_of_work import UnitOfWork
+from datetime import timedelta
 from django.db import transaction
 from django.utils import timezone
+from django.db.models import Count
 
 
 class MovementHandler:
     @staticmethod
-    def get_handler(movement_type, product_object, place, process, who, result=None, printer_name=None):
+    def get_handler(movement_type, product_object, place, process, who, result=None, printer_name=None, context=None):
         if movement_type == 'move':
-            return MoveHandler(product_object, place, process, who, movement_type=movement_type)
+            return MoveHandler(product_object, place, process, who, movement_type=movement_type, context=context)
         elif movement_type == 'receive':
-            return ReceiveHandler(product_object, place, process, who, printer_name=printer_name, movement_type=movement_type)
+            return ReceiveHandler(product_object, place, process, who, printer_name=printer_name, movement_type=movement_type, context=context)
         elif movement_type == 'check':
-            return CheckHandler(product_object, place, process, who, result=result, movement_type=movement_type)
+            return CheckHandler(product_object, place, process, who, result=result, movement_type=movement_type, context=context)
         elif movement_type == 'trash':
-            return TrashHandler(product_object, place, process, who, movement_type=movement_type)
+            return TrashHandler(product_object, place, process, who, movement_type=movement_type, context=context)
         else:
             raise ValidationErrorWithCode(
                 message='Brak obsługi dla tego typu ruchu',
@@ -25,157 +29,237 @@ class MovementHandler:
             )
         
 
-class BaseMovementHandler:
-    def __init__(self, product_object, place, process, who, *, printer_name=None, result=None, movement_type=None):
-        self.product_object = product_object
+def _unit_of_work(context):
+    return context.unit_of_work if context else UnitOfWork()
+
+
+def _process_settings(process, context):
+    # Ustawienia z kontekstu ruchu (MovementContext), jeśli dotyczy tego samego procesu
+    if not process:
+        return None
+    if context and context.process and context.process.id == process.id:
+        return context.settings
+    return get_process_settings(process.id)
+
+
+BATCH_UPDATE_FIELDS = [
+    'current_place', 'current_process', 'last_move', 'quranteen_time', 'exp_date_in_process',
+    'max_in_process', 'ex_mother', 'mother_object', 'end', 'expired_at',
+]
+
+
+class BatchMovementHandler:
+    @staticmethod
+    def get_handler(movement_type, product_objects, place, process, who, printer_name=None, context=None):
+        if movement_type == 'move':
+            return BatchMoveHandler(product_objects, place, process, who, movement_type=movement_type, context=context)
+        elif movement_type == 'receive':
+            return BatchReceiveHandler(product_objects, place, process, who, printer_name=printer_name, movement_type=movement_type, context=context)
+        else:
+            raise ValidationErrorWithCode(
+                message='Brak obsługi dla tego typu ruchu',
+                code='unsuported_movement_type'
+            )
+
+
+class BaseBatchMovementHandler:
+    """
+    Ruch jednego lub wielu obiektów: stan matek i dzieci liczony w pamięci,
+    zapis jednym bulk_update + jednym bulk_create logów w jednej transakcji.
+    MoveHandler / ReceiveHandler to ten sam mechanizm dla pojedynczego skanu.
+    """
+    def __init__(self, product_objects, place, process, who, *, printer_name=None, movement_type=None, context=None):
+        self.product_objects = list(product_objects)
         self.place = place
         self.process = process
         self.who = who
-        self.result = result
         self.printer_name = printer_name
         self.movement_type = movement_type
+        self.settings = _process_settings(process, context)
+        self.unit_of_work = _unit_of_work(context)
+        self.now = None
 
     def execute(self):
-        raise NotImplementedError
-    
-    def _handle_orphaning(self, product_obj):
-        mother = product_obj.mother_object
-
-        if not mother or mother == self.product_object:
-            return
-
-        if not mother.full_sn:
-            raise ValueError(f"Mother object {mother.id} has no full_sn")
-
-        product_obj.ex_mother = mother.full_sn
-        product_obj.mother_object = None
-        product_obj.save()
-
-        mother.refresh_from_db()
+        self.now = timezone.now()
+        targets = self.collect_targets()
+
+        touched_place_ids = {self.place.id if self.place else None}
+        logs = []
+        for product_obj, is_root in targets:
+            touched_place_ids.add(product_obj.current_place_id)
+            logs.append(self.build_log(product_obj))
+            self.apply(product_obj)
+            refresh_expired_at(product_obj, self.now)
+
+        ended_mothers = self.detach_from_foreign_mothers([obj for obj, is_root in targets if is_root], touched_place_ids)
+
+        changed = [obj for obj, is_root in targets] + ended_mothers
+        with transaction.atomic():
+            load_occupancy_state(changed)
+            ProductObject.objects.bulk_update(changed, BATCH_UPDATE_FIELDS)
+            ProductObjectProcessLog.objects.bulk_create(logs)
+            # bulk_update nie wysyła sygnałów - liczniki miejsc i status kill odświeżamy ręcznie
+            record_occupancy(changed)
+            invalidate_kill_snapshots_for_places_on_commit(touched_place_ids)
+            # Na końcu - zmiany zgłoszone przez after_execute trafiają do bazy tylko razem z całym ruchem
+            self.after_execute()
+            self.unit_of_work.flush()
+
+    def collect_targets(self):
+        children = {obj.id: list(obj.child_object.all()) for obj in self.product_objects}
+        # Obiekt zeskanowany razem ze swoją matką idzie jako dziecko - nie odpinamy go od matki
+        child_ids = {child.id for obj_children in children.values() for child in obj_children}
+
+        targets = []
+        seen = set()
+        for obj in self.product_objects:
+            if obj.id in child_ids or obj.id in seen:
+                continue
+            seen.add(obj.id)
+            targets.append((obj, True))
+
+            for child in children[obj.id]:
+                if child.id not in seen:
+                    seen.add(child.id)
+                    targets.append((child, False))
+        return targets
+
+    def detach_from_foreign_mothers(self, roots, touched_place_ids):
+        detached = {}
+        for product_obj in roots:
+            if not product_obj.mother_object_id:
+                continue
+
+            mother = product_obj.mother_object
+            if not mother.full_sn:
+                raise ValueError(f"Mother object {mother.id} has no full_sn")
+
+            product_obj.ex_mother = mother.full_sn
+            product_obj.mother_object = None
+            detached.setdefault(mother.id, [mother, 0])[1] += 1
+
+        if not detached:
+            return []
+
+        children_count = dict(
+            ProductObject.objects.filter(mother_object_id__in=detached.keys())
+            .values('mother_object_id')
+            .annotate(total=Count('id'))
+            .values_list('mother_object_id', 'total')
+        )
 
-        if not ProductObject.objects.filter(mother_object=mother).exists():
-            mother.end = True
-            mother.current_place = None
-            mother.current_process = None
-            mother.save()
-    
+        ended_mothers = []
+        for mother_id, (mother, detached_count) in detached.items():
+            if children_count.get(mother_id, 0) - detached_count <= 0:
+                touched_place_ids.add(mother.current_place_id)
+                mother.end = True
+                mother.current_place = None
+                mother.current_process = None
+                ended_mothers.append(mother)
+        return ended_mothers
+
+    def build_log(self, product_obj):
+        raise NotImplementedError
 
-class MoveHandler(BaseMovementHandler):
-    def execute(self):
-        self._move_product_object(self.product_object)
+    def apply(self, product_obj):
+        raise NotImplementedError
 
-        for child in self.product_object.child_object.all():
-            self._move_product_object(child)
+    def after_execute(self):
+        pass
 
-    def _move_product_object(self, product_object):
-        self.create_move_log(product_object) # I know it should be the last one but I need 'current_place' for admins
-        self.delete_current_place(product_object)
-        self.set_quarantin_if_needed(product_object)
-        self.set_expire_if_needed(product_object)
-        self._handle_orphaning(product_object)
 
-    def create_move_log(self, product_object):
-        ProductObjectProcessLog.objects.create(
-            product_object=product_object,
+class BatchMoveHandler(BaseBatchMovementHandler):
+    def build_log(self, product_obj):
+        return ProductObjectProcessLog(
+            product_object=product_obj,
             process=self.process,
-            entry_time=timezone.now(),
+            entry_time=self.now,
             who_entry=self.who,
-            place=product_object.current_place,
+            place_id=product_obj.current_place_id,
             movement_type=self.movement_type
         )
 
-    def delete_current_place(self, product_object):
-        product_object.current_place = None
-        product_object.last_move = timezone.now()
-        product_object.save()
-
-    def set_quarantin_if_needed(self, product_object):
-        for attr in ['defaults', 'starts', 'conditions']:
-            conf = getattr(self.process, attr, None)
-            if conf and conf.quranteen_time:
-                product_object.quranteen_time = now() + timedelta(hours=conf.quranteen_time)
-                product_object.save()
-                return
-
-    def set_expire_if_needed(self, product_object):
-        for attr in ['defaults', 'starts', 'conditions']:
-            conf = getattr(self.process, attr, None)
-            if conf and conf.how_much_days_exp_date:
-                product_object.exp_date_in_process = now().date() + timedelta(days=conf.how_much_days_exp_date)
-                product_object.save()
-                return
-            
-
-class ReceiveHandler(BaseMovementHandler):
-    def execute(self):
-        # Matka
-        self._receive_product_object(self.product_object)
+    def apply(self, product_obj):
+        product_obj.current_place = None
+        product_obj.last_move = self.now
 
-        # Dzieci
-        for child in self.product_object.child_object.all():
-            self._receive_product_object(child)
+        if self.settings and self.settings.quranteen_time:
+            product_obj.quranteen_time = self.now + timedelta(hours=self.settings.quranteen_time)
 
-        self.set_killing_flag_on_false_if_need()
+        if self.settings and self.settings.how_much_days_exp_date:
+            product_obj.exp_date_in_process = self.now.date() + timedelta(days=self.settings.how_much_days_exp_date)
 
-    def _receive_product_object(self, product_obj):
-        self.set_current_place_and_process(product_obj)
-        self.create_log(product_obj)
-        self._handle_orphaning(product_obj)
-        self.set_max_hours_on_product(product_obj)
-        self.set_quarantin_if_needed(product_obj)
-
-    def set_max_hours_on_product(self, product_object):
-        conf = getattr(self.process, 'defaults', None)
-        if conf and conf.how_much_hours_max_working:
-            product_object.max_in_process = now() + timedelta(hours=conf.how_much_hours_max_working)
-            product_object.save()
 
-    def create_log(self, product_obj):
-        ProductObjectProcessLog.objects.create(
+class BatchReceiveHandler(BaseBatchMovementHandler):
+    def build_log(self, product_obj):
+        return ProductObjectProcessLog(
             product_object=product_obj,
             process=self.process,
-            entry_time=timezone.now(),
+            entry_time=self.now,
             who_entry=self.who,
             place=self.place,
-            name_of_productig_product=self.printer_name, 
+            name_of_productig_product=self.printer_name,
             movement_type=self.movement_type
         )
 
-    def set_current_place_and_process(self, product_obj):
+    def apply(self, product_obj):
         product_obj.current_place = self.place
         product_obj.current_process = self.process
-        product_obj.last_move = timezone.now()
-        product_obj.save()
-    
-    def set_quarantin_if_needed(self, product_obj):
-        for attr in ['defaults', 'starts', 'conditions']:
-            conf = getattr(self.process, attr, None)
-            if conf and conf.quranteen_time_receive is not None:
-                product_obj.quranteen_time = now() + timedelta(minutes=conf.quranteen_time_receive)
-                product_obj.save()
-                return
-
-    def set_killing_flag_on_false_if_need(self):
+        product_obj.last_move = self.now
+
+        if self.settings and self.settings.how_much_hours_max_working:
+            product_obj.max_in_process = self.now + timedelta(hours=self.settings.how_much_hours_max_working)
+
+        if self.settings and self.settings.quranteen_time_receive is not None:
+            product_obj.quranteen_time = self.now + timedelta(minutes=self.settings.quranteen_time_receive)
+
+    def after_execute(self):
         if not self.process or not self.process.killing_app:
             return
 
         try:
-            kill_flag = AppToKill.objects.get(line_name=self.place)
+            kill_flag = self.place.apptokill
         except AppToKill.DoesNotExist:
             raise ValidationErrorWithCode(
                 message='AppKill nie istnieje dla danego miejsca.',
                 code='app_kill_no_exist'
             )
+        self.unit_of_work.update(kill_flag, killing_flag=False)
+
+
+class MoveHandler(BatchMoveHandler):
+    def __init__(self, product_object, place, process, who, *, printer_name=None, result=None, movement_type=None, context=None):
+        super().__init__([product_object], place, process, who, printer_name=printer_name, movement_type=movement_type, context=context)
+        self.product_object = product_object
+
+
+class ReceiveHandler(BatchReceiveHandler):
+    def __init__(self, product_object, place, process, who, *, printer_name=None, result=None, movement_type=None, context=None):
+        super().__init__([product_object], place, process, who, printer_name=printer_name, movement_type=movement_type, context=context)
+        self.product_object = product_object
 
-        if kill_flag:
-            kill_flag.killing_flag = False
-            kill_flag.save()
+
+class BaseMovementHandler:
+    def __init__(self, product_object, place, process, who, *, printer_name=None, result=None, movement_type=None, context=None):
+        self.product_object = product_object
+        self.place = place
+        self.process = process
+        self.who = who
+        self.result = result
+        self.printer_name = printer_name
+        self.movement_type = movement_type
+        self.settings = _process_settings(process, context)
+        self.unit_of_work = _unit_of_work(context)
+
+    def execute(self):
+        raise NotImplementedError
 
 
 class CheckHandler(BaseMovementHandler):
     def execute(self):
         self.set_current_place_and_process()
         self.create_log()
+        self.unit_of_work.flush()
 
     def create_log(self):
         ConditionLog.objects.create(process=self.process, product=self.product_object, result=self.result, who=self.who)
@@ -189,9 +273,7 @@ class CheckHandler(BaseMovementHandler):
         )
         
     def set_current_place_and_process(self):
-        product_object = self.product_object
-        product_object.current_process = self.process
-        product_object.save()
+        self.unit_of_work.update(self.product_object, current_process=self.process)
     
 
 class TrashHandler(BaseMovementHandler):
@@ -203,6 +285,8 @@ class TrashHandler(BaseMovementHandler):
         self.set_current_place_and_process(product_obj)
         self.create_log(product_obj)
         self.set_obj_as_ended(product_obj)
+        # Miejsce, proces i end=True jednym zapisem
+        self.unit_of_work.flush()
 
 
     def create_log(self, product_obj):
@@ -217,12 +301,9 @@ class TrashHandler(BaseMovementHandler):
         )
 
     def set_current_place_and_process(self, product_obj):
-        product_obj.current_place = self.place
-        product_obj.current_process = self.process
-        product_obj.last_move = timezone.now()
-        product_obj.save()
+        self.unit_of_work.update(
+            product_obj, current_place=self.place, current_process=self.process, last_move=timezone.now()
+        )
     
     def set_obj_as_ended(self, product_obj):
-        product_obj.end = True
-        product_obj.save()
-
+        self.unit_of_work.update(product_obj, end=True)
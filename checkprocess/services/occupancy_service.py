@@ -0,0 +1,159 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+
+from checkprocess.models import OCCUPANCY_FIELDS, PlaceOccupancy, ProductObject
+
+
+def _key_order(key):
+    return tuple('' if part is None else str(part) for part in key)
+
+
+def occupancy_changes(product_objects, created=False):
+    """
+    Zmiany liczników między stanem z wczytania (_loaded_occupancy) a bieżącym stanem obiektów.
+    Obiekt bez wczytanego stanu jest pomijany, chyba że created=True - przed zapisem uzupełnia go load_occupancy_state.
+    """
+    changes = Counter()
+    for product_object in product_objects:
+        if created:
+            old_key = None
+        elif hasattr(product_object, '_loaded_occupancy'):
+            old_key = product_object._loaded_occupancy
+        else:
+            continue
+
+        new_key = product_object.occupancy_key()
+        if old_key == new_key:
+            continue
+        if old_key:
+            changes[old_key] -= 1
+        if new_key:
+            changes[new_key] += 1
+    return changes
+
+
+def apply_occupancy_changes(changes):
+    # Stała kolejność wierszy - dwie transakcje zmieniające te same liczniki nie zakleszczą się
+    keys = sorted((key for key, delta in changes.items() if delta), key=_key_order)
+
+    for key in keys:
+        if changes[key] > 0:
+            continue
+        process_id, place_id, sub_product_id = key
+        # Brak wiersza - miejsce / proces właśnie usuwane kaskadowo albo licznik do rekonsyliacji
+        PlaceOccupancy.objects.filter(
+            process_id=process_id, place_id=place_id, sub_product_id=sub_product_id
+        ).update(quantity=F('quantity') + changes[key])
+
+    increments = [(*key, changes[key]) for key in keys if changes[key] > 0]
+    if not increments:
+        return
+
+    table = PlaceOccupancy._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (process_id, place_id, sub_product_id, quantity) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(increments))} "
+            f"ON CONFLICT ON CONSTRAINT uniq_place_occupancy DO UPDATE SET quantity = {table}.quantity + EXCLUDED.quantity",
+            [value for row in increments for value in row]
+        )
+
+
+def load_occupancy_state(product_objects):
+    """
+    Uzupełnia stan z wczytania (_loaded_occupancy, _loaded_place_id) obiektom wczytanym bez tych pól (only / defer).
+    Stan brany z bazy, więc wołać przed zapisem zmian. Obiekty ze stanem z wczytania nie kosztują zapytania.
+    """
+    missing = {
+        product_object.pk: product_object for product_object in product_objects
+        if product_object.pk is not None and not hasattr(product_object, '_loaded_occupancy')
+    }
+    if not missing:
+        return
+
+    fields = sorted(OCCUPANCY_FIELDS)
+    for pk, *values in ProductObject.objects.filter(pk__in=missing).values_list('pk', *fields):
+        stored = ProductObject(**dict(zip(fields, values)))
+        missing[pk]._loaded_occupancy = stored.occupancy_key()
+        if not hasattr(missing[pk], '_loaded_place_id'):
+            missing[pk]._loaded_place_id = stored.current_place_id
+
+
+def record_occupancy(product_objects, created=False):
+    """
+    Przenosi obiekty w licznikach ze stanu z wczytania na bieżący. Wołać w transakcji zapisu obiektów,
+    po zapisie - także po bulk_create / bulk_update, które nie wysyłają sygnałów.
+    """
+    product_objects = list(product_objects)
+    apply_occupancy_changes(occupancy_changes(product_objects, created=created))
+    for product_object in product_objects:
+        product_object._loaded_occupancy = product_object.occupancy_key()
+
+
+def release_occupancy(product_object):
+    # Po usunięciu pola odroczone nie dadzą się już doczytać - stan z wczytania uzupełnia pre_delete
+    key = product_object._loaded_occupancy if hasattr(product_object, '_loaded_occupancy') else product_object.occupancy_key()
+    if key:
+        apply_occupancy_changes({key: -1})
+
+
+def place_is_busy(place_id):
+    return PlaceOccupancy.objects.filter(place_id=place_id, quantity__gt=0).exists()
+
+
+def sub_product_counts(product_id, process_id):
+    rows = (
+        PlaceOccupancy.objects
+        .filter(process_id=process_id, process__product_id=product_id, quantity__gt=0)
+        .values('sub_product__name')
+        .annotate(count=Sum('quantity'))
+    )
+    return {row['sub_product__name'] or "Brak sub produktu": row['count'] for row in rows}
+
+
+def count_occupancy():
+    rows = (
+        ProductObject.objects
+        .filter(current_place__isnull=False, end=False)
+        .values_list('current_process_id', 'current_place_id', 'sub_product_id')
+        .annotate(total=Count('id'))
+    )
+    return {(process_id, place_id, sub_product_id): total for process_id, place_id, sub_product_id, total in rows}
+
+
+def reconcile_occupancy(fix=True):
+    """
+    Porównuje liczniki z policzeniem obiektów od zera i (fix=True) przepisuje tabelę.
+    Rozjazdy powstają przy zmianach poza ORM-em albo bez sygnałów, np. SET_NULL po usunięciu subproduktu.
+    Zwraca listę (klucz, zapisane, faktyczne) dla różniących się liczników.
+    """
+    with transaction.atomic():
+        if fix:
+            # Zapisy liczników z innych transakcji czekają na koniec przebudowy - ich zmiany lądują na nowej tabeli
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {PlaceOccupancy._meta.db_table} IN EXCLUSIVE MODE")
+
+        actual = count_occupancy()
+        stored = {
+            (process_id, place_id, sub_product_id): quantity
+            for process_id, place_id, sub_product_id, quantity in PlaceOccupancy.objects.values_list(
+                'process_id', 'place_id', 'sub_product_id', 'quantity'
+            )
+        }
+
+        drift = [
+            (key, stored.get(key, 0), actual.get(key, 0))
+            for key in sorted(stored.keys() | actual.keys(), key=_key_order)
+            if stored.get(key, 0) != actual.get(key, 0)
+        ]
+
+        if fix and drift:
+            PlaceOccupancy.objects.all().delete()
+            PlaceOccupancy.objects.bulk_create([
+                PlaceOccupancy(process_id=process_id, place_id=place_id, sub_product_id=sub_product_id, quantity=quantity)
+                for (process_id, place_id, sub_product_id), quantity in actual.items()
+            ], batch_size=1000)
+
+    return drift
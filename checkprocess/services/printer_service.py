@@ -0,0 +1,184 @@
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import pyodbc
+from django.conf import settings
+from django.core.cache import cache
+
+from checkprocess.custom_validators import ValidationErrorWithCode
+from checkprocess.models import OneToOneMap
+
+
+PRINTER_POOL_SIZE = 4
+PRINTER_POOL_TIMEOUT = 10 # ile sekund czekać na wolne połączenie
+PRINTER_CARD_TTL = 5 * 60
+PRINTER_CARD_NEGATIVE_TTL = 30 # nieznana karta mogła właśnie zostać dodana - pytamy ponownie szybciej
+
+ONE_TO_ONE_MAP_VERSION_KEY = 'one_to_one_map_version'
+
+
+class ConnectionPool:
+    """
+    Ograniczona pula połączeń DB-API. connect to dowolna funkcja zwracająca połączenie
+    (pyodbc do SQL Servera, sqlite3 jako lokalny zamiennik w testach).
+    """
+    def __init__(self, connect, max_size=PRINTER_POOL_SIZE, timeout=PRINTER_POOL_TIMEOUT):
+        self.connect = connect
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(max_size)
+
+    @contextmanager
+    def connection(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise TimeoutError("Brak wolnego połączenia do bazy drukarek.")
+
+        try:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = self.connect()
+
+            try:
+                yield conn
+            except Exception:
+                # Połączenie po błędzie może być zepsute - nie wraca do puli
+                self._close(conn)
+                raise
+            else:
+                self.idle.put(conn)
+        finally:
+            self.slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                self._close(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class PrinterCardConnector:
+    """
+    Karta produkcyjna -> (drukarka, modele) z zewnętrznej bazy drukarek.
+    Połączenia z puli, wyniki (także "brak karty") trzymane w pamięci przez TTL.
+    """
+    # Bez TOP/LIMIT - zapytanie działa tak samo na SQL Serverze i SQLite, wybór najlepszego wiersza (max 3) robimy w Pythonie
+    query = "SELECT * FROM printers WHERE name IN (?, ?, ?)"
+
+    def __init__(self, connect, pool_size=PRINTER_POOL_SIZE, ttl=PRINTER_CARD_TTL, negative_ttl=PRINTER_CARD_NEGATIVE_TTL):
+        self.pool = ConnectionPool(connect, max_size=pool_size)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cards = {}
+        self.lock = threading.Lock()
+
+    def lookup(self, production_card):
+        card = str(production_card)
+        now = time.monotonic()
+
+        with self.lock:
+            cached = self.cards.get(card)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        row = self.fetch(card)
+        with self.lock:
+            self.cards[card] = (now + (self.ttl if row else self.negative_ttl), row)
+        return row
+
+    def fetch(self, card):
+        names = [card, f"{card}_str1", f"{card}_str2"]
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(self.query, names)
+                    rows = cursor.fetchall()
+                finally:
+                    cursor.close()
+        except Exception as e:
+            raise ValidationErrorWithCode(
+                message=f"Błąd SQL: {str(e)}",
+                code="external_db_error"
+            )
+
+        if not rows:
+            return None
+
+        # Ta sama kolejność co dawne ORDER BY CASE: karta, karta_str1, reszta
+        best = min(rows, key=lambda row: names.index(row[1]) if row[1] in names[:2] else 2)
+        return best[3], best[4]
+
+    def printer_info(self, production_card):
+        row = self.lookup(production_card)
+        if not row:
+            raise ValidationErrorWithCode(
+                message=f"Brak danych drukarki dla karty: {production_card}",
+                code="printer_data_not_found"
+            )
+
+        printer_name, raw_model_name = row  # '15007535', 'LF(AIM-H10-SAC305); LF(OM-338-PT)'
+        model_names = [x.strip() for x in raw_model_name.split(';') if x.strip()]
+
+        one_to_one_map = get_one_to_one_map()
+        mapped_names = []
+        for name in model_names:
+            if name not in one_to_one_map:
+                raise ValidationErrorWithCode(
+                    message=f"Brak mapowania dla modelu: {name}",
+                    code="mapping_missing"
+                )
+            mapped_names.append(one_to_one_map[name])
+
+        return mapped_names, printer_name
+
+
+_one_to_one_map = {'version': None, 'entries': {}}
+
+
+def get_one_to_one_map():
+    # Mapa w pamięci procesu, przeładowywana gdy którykolwiek worker zmieni OneToOneMap (wersja we wspólnym cache)
+    # Wersja losowa, nie licznik - po wyczyszczeniu cache nie wróci do wartości, którą worker już ma
+    version = cache.get_or_set(ONE_TO_ONE_MAP_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    if _one_to_one_map['version'] != version:
+        _one_to_one_map['entries'] = dict(OneToOneMap.objects.values_list('s_input', 's_output'))
+        _one_to_one_map['version'] = version
+    return _one_to_one_map['entries']
+
+
+def invalidate_one_to_one_map():
+    cache.set(ONE_TO_ONE_MAP_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def _connect_printer_db():
+    return pyodbc.connect(
+        f"DRIVER={{SQL Server}};"
+        f"SERVER={settings.EXTERNAL_SQL_SERVER};"
+        f"DATABASE={settings.EXTERNAL_SQL_DB};"
+        f"UID={settings.EXTERNAL_SQL_USER};"
+        f"PWD={settings.EXTERNAL_SQL_PASSWORD}"
+    )
+
+
+_printer_connector = None
+_printer_connector_lock = threading.Lock()
+
+
+def get_printer_connector():
+    global _printer_connector
+    if _printer_connector is None:
+        with _printer_connector_lock:
+            if _printer_connector is None:
+                _printer_connector = PrinterCardConnector(_connect_printer_db)
+    return _printer_connector
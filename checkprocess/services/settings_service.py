@@ -0,0 +1,79 @@
+from checkprocess.models import ProductProcess
+from django.core.cache import cache
+
+
+SETTINGS_CACHE_KEY = 'process_settings_{process_id}'
+SETTINGS_CACHE_TIMEOUT = 5 * 60 # a worker that missed the on-commit invalidation serves old settings at most this long
+
+# Kolejność ma znaczenie - pierwsze ustawienie które jest wypełnione wygrywa (tak jak wcześniej getattr po defaults/starts/conditions)
+SETTINGS_SOURCES = {
+    'defaults': ['id', 'how_much_days_exp_date', 'how_much_hours_max_working', 'quranteen_time', 'quranteen_time_receive'],
+    'starts': ['id', 'how_much_days_exp_date', 'quranteen_time', 'quranteen_time_receive'],
+    'conditions': ['id'],
+    'endings': ['id'],
+}
+
+
+class EffectiveProcessSettings:
+    """
+    Spłaszczone ustawienia procesu (ProductProcessDefault / Start / Condition / Ending) w jednym obiekcie.
+    Zastępuje chodzenie getattr po relacjach OneToOne w walidatorze i handlerach.
+    """
+    def __init__(self, process_id, has_defaults=False, has_starts=False, has_conditions=False, has_endings=False,
+                 quranteen_time=None, quranteen_time_receive=None, how_much_days_exp_date=None, how_much_hours_max_working=None):
+        self.process_id = process_id
+        self.has_defaults = has_defaults
+        self.has_starts = has_starts
+        self.has_conditions = has_conditions
+        self.has_endings = has_endings
+        self.quranteen_time = quranteen_time # hours, set on move
+        self.quranteen_time_receive = quranteen_time_receive # minutes, set on receive
+        self.how_much_days_exp_date = how_much_days_exp_date
+        self.how_much_hours_max_working = how_much_hours_max_working
+
+    @property
+    def has_any(self):
+        return self.has_defaults or self.has_starts or self.has_conditions or self.has_endings
+
+    @classmethod
+    def build(cls, process_id):
+        lookups = [f'{source}__{field}' for source, fields in SETTINGS_SOURCES.items() for field in fields]
+        row = ProductProcess.objects.filter(id=process_id).values(*lookups).first()
+        if row is None:
+            return cls(process_id)
+
+        present = [source for source in SETTINGS_SOURCES if row[f'{source}__id'] is not None]
+
+        def first_set(field, accept):
+            for source in present:
+                value = row.get(f'{source}__{field}')
+                if accept(value):
+                    return value
+            return None
+
+        return cls(
+            process_id,
+            has_defaults='defaults' in present,
+            has_starts='starts' in present,
+            has_conditions='conditions' in present,
+            has_endings='endings' in present,
+            quranteen_time=first_set('quranteen_time', bool),
+            quranteen_time_receive=first_set('quranteen_time_receive', lambda value: value is not None),
+            how_much_days_exp_date=first_set('how_much_days_exp_date', bool),
+            how_much_hours_max_working=row['defaults__how_much_hours_max_working'] or None,
+        )
+
+
+def get_process_settings(process_id):
+    key = SETTINGS_CACHE_KEY.format(process_id=process_id)
+    process_settings = cache.get(key)
+    if process_settings is None:
+        process_settings = EffectiveProcessSettings.build(process_id)
+        cache.set(key, process_settings, timeout=SETTINGS_CACHE_TIMEOUT)
+    return process_settings
+
+
+def invalidate_process_settings(process_id):
+    if process_id is None:
+        return
+    cache.delete(SETTINGS_CACHE_KEY.format(process_id=process_id))
@@ -0,0 +1,69 @@
+import threading
+
+
+_stats = {'recorded': 0, 'executed': 0}
+_stats_lock = threading.Lock()
+
+
+def unit_of_work_stats():
+    # Od startu procesu: ile zapisów zgłoszono, ile UPDATE-ów poszło do bazy i ile dzięki temu oszczędzono
+    with _stats_lock:
+        return dict(_stats, saved=_stats['recorded'] - _stats['executed'])
+
+
+class UnitOfWork:
+    """
+    Zapisy jednego ruchu (walidator + handler) zbierane per wiersz i wykonywane przy flush:
+    kilka zmian tego samego wiersza to jeden UPDATE, a zmiana, która wraca do stanu sprzed ruchu
+    (np. killing_flag True w walidatorze i False w handlerze), nie idzie do bazy wcale.
+    Zapis przez save(update_fields) - sygnały modeli działają jak przy zwykłym save().
+    """
+    def __init__(self):
+        self.pending = {} # (model, pk) -> (instancja, {pole: wartość sprzed pierwszej zmiany})
+        self.recorded = 0
+        self.executed = 0
+        self.reported = 0 # recorded już doliczone do statystyk procesu
+
+    @property
+    def saved(self):
+        return self.recorded - self.executed
+
+    def update(self, instance, **fields):
+        instance_to_save, originals = self.pending.setdefault((instance._meta.label, instance.pk), (instance, {}))
+
+        for name, value in fields.items():
+            # attname - dla kluczy obcych porównujemy id, bez ładowania powiązanego obiektu
+            attname = instance._meta.get_field(name).attname
+            originals.setdefault(name, getattr(instance_to_save, attname))
+            setattr(instance, name, value)
+            if instance_to_save is not instance:
+                setattr(instance_to_save, name, value)
+
+        self.recorded += 1
+
+    def flush(self):
+        pending, self.pending = self.pending, {}
+
+        executed = 0
+        for instance, originals in pending.values():
+            changed = [
+                name for name, original in originals.items()
+                if getattr(instance, instance._meta.get_field(name).attname) != original
+            ]
+            if changed:
+                instance.save(update_fields=changed)
+                executed += 1
+
+        self.executed += executed
+        with _stats_lock:
+            _stats['recorded'] += self.recorded - self.reported
+            _stats['executed'] += executed
+        self.reported = self.recorded
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Także przy błędzie - to, co walidator zdążył zgłosić (np. killing_flag=True), ma trafić do bazy
+        self.flush()
+        return False
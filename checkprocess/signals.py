@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.utils import timezone
+from django.dispatch import receiver
+
+from .models import (ProductProcess, Edge, ProductProcessCondition, ProductProcessDefault, ProductProcessStart,
+                     ProductProcessEnding, ProductObject, AppToKill, MessageToApp, Place, PlaceGroupToAppKill, OneToOneMap)
+from .services.graph_service import invalidate_process_graph
+from .services.settings_service import invalidate_process_settings
+from .services.kill_service import invalidate_kill_snapshots_for_places_on_commit, invalidate_all_kill_snapshots
+from .services.expiry_service import refresh_expired_at
+from .services.printer_service import invalidate_one_to_one_map
+from .services.occupancy_service import load_occupancy_state, record_occupancy, release_occupancy
+
+
+def _invalidate_graph_on_commit(product_id):
+    transaction.on_commit(lambda: invalidate_process_graph(product_id))
+
+
+def _product_id_of_process(process_id):
+    return ProductProcess.objects.filter(id=process_id).values_list('product_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=ProductProcess)
+def process_graph_changed_by_process(sender, instance, **kwargs):
+    _invalidate_graph_on_commit(instance.product_id)
+    transaction.on_commit(lambda: invalidate_process_settings(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Edge)
+def process_graph_changed_by_edge(sender, instance, **kwargs):
+    for process_id in {instance.source_id, instance.target_id}:
+        _invalidate_graph_on_commit(_product_id_of_process(process_id))
+
+
+@receiver([post_save, post_delete], sender=ProductProcessCondition)
+def process_graph_changed_by_condition(sender, instance, **kwargs):
+    _invalidate_graph_on_commit(_product_id_of_process(instance.product_process_id))
+
+
+@receiver([post_save, post_delete], sender=ProductProcessDefault)
+@receiver([post_save, post_delete], sender=ProductProcessStart)
+@receiver([post_save, post_delete], sender=ProductProcessCondition)
+@receiver([post_save, post_delete], sender=ProductProcessEnding)
+def process_settings_changed(sender, instance, **kwargs):
+    process_id = instance.product_process_id
+    transaction.on_commit(lambda: invalidate_process_settings(process_id))
+
+
+@receiver(pre_save, sender=ProductObject)
+def expiry_flag_follows_deadlines(sender, instance, **kwargs):
+    refresh_expired_at(instance, timezone.now())
+
+
+@receiver([post_save, post_delete], sender=ProductObject)
+def kill_status_changed_by_object(sender, instance, **kwargs):
+    # Odroczone current_place_id nie było zmieniane - jest równe _loaded_place_id (po usunięciu nie da się go doczytać)
+    place_ids = {instance.__dict__.get('current_place_id'), getattr(instance, '_loaded_place_id', None)} - {None}
+    if place_ids:
+        invalidate_kill_snapshots_for_places_on_commit(place_ids)
+
+
+@receiver([pre_save, pre_delete], sender=ProductObject)
+def occupancy_state_before_write(sender, instance, **kwargs):
+    # Obiekt wczytany z odroczonymi polami licznika - stary klucz trzeba wziąć z bazy, zanim zapis go nadpisze
+    if not instance._state.adding and not kwargs.get('raw'):
+        load_occupancy_state([instance])
+
+
+@receiver(post_save, sender=ProductObject)
+def occupancy_follows_object(sender, instance, created, **kwargs):
+    record_occupancy([instance], created=created)
+
+
+@receiver(post_delete, sender=ProductObject)
+def occupancy_released_by_delete(sender, instance, **kwargs):
+    release_occupancy(instance)
+
+
+@receiver([post_save, post_delete], sender=AppToKill)
+def kill_status_changed_by_flag(sender, instance, **kwargs):
+    invalidate_kill_snapshots_for_places_on_commit([instance.line_name_id])
+
+
+@receiver([post_save, post_delete], sender=MessageToApp)
+def kill_status_changed_by_message(sender, instance, **kwargs):
+    invalidate_kill_snapshots_for_places_on_commit([instance.line_id])
+
+
+@receiver([post_save, post_delete], sender=ProductProcess)
+@receiver([post_save, post_delete], sender=Place)
+@receiver([post_save, post_delete], sender=PlaceGroupToAppKill)
+def kill_configuration_changed(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_all_kill_snapshots)
+
+
+@receiver([post_save, post_delete], sender=OneToOneMap)
+def one_to_one_map_changed(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_one_to_one_map)
@@ -4,7 +4,8 @@ from .views import (ProductViewSet, ProductProcessViewSet, ProductObjectViewSet,
                     PlaceViewSet, ProductMoveView, AppKillStatusView, GraphImportView, ProductStartNewProduction,
                     ContinueProduction, ScrapProduct, BulkProductObjectCreateView, ListGroupsStatuses, SubProductsCounter, ProductMoveListView,
                     RetoolingView, StencilStartNewProd, LogFromMistakeData, ProductProcessList, PlaceInGroupAdmin, UnifiedLogsViewSet, ProductObjectAdminViewSet,
-                    ProductObjectAdminViewSetProcessHelper, ProductObjectAdminViewSetPlaceHelper, GroupUpdateStatus)
+                    ProductObjectAdminViewSetProcessHelper, ProductObjectAdminViewSetPlaceHelper, GroupUpdateStatus,
+                    FifoNextToPick, AppKillStreamView)
 
 from rest_framework.routers import DefaultRouter
 
@@ -37,10 +38,12 @@ urlpatterns = [
     path('<int:product_id>/<uuid:process_uuid>/bulk-create-to-mother/', BulkProductObjectCreateAndAddMotherView.as_view(), name='bulk-product-object-create-to-mother'),
     
     path('kill-app/', AppKillStatusView.as_view(), name='kill-app'),
+    path('kill-app/stream/<str:group_name>/', AppKillStreamView.as_view(), name='kill-app-stream'),
     
     path('<int:product_id>/graph-import/', GraphImportView.as_view(), name='graph-import'),
     path('get-statuses-groups/', ListGroupsStatuses.as_view(), name='list-group-statuses'),
     path('counter-products/', SubProductsCounter.as_view(), name='couter-products'),
+    path('fifo/next-to-pick/<uuid:process_uuid>/', FifoNextToPick.as_view(), name='fifo-next-to-pick'),
 
     # admin fetaures
     path('admin-process/process-list/', ProductProcessList.as_view(), name='process-list-admin'),
@@ -1,202 +1,111 @@
-from .models import ProductObject
-from django.db.models import Count, Case, When, Value, DateField, F
+from .models import ProductObject, FIFO_FAR_FUTURE
+from django.db.models import Exists, OuterRef, Q
 from django.utils.timezone import now
 from datetime import timedelta
 
-from django.conf import settings
-from rest_framework.exceptions import ValidationError
-from .models import OneToOneMap
-import pyodbc
 from datetime import datetime
 
-import requests
-from requests.exceptions import RequestException
-from .custom_validators import ValidationErrorWithCode
-
-port = settings.MICRO_SERVICE_PORT
-name = settings.MICRO_SERVICE_NAME
+from global_app.outbox import enqueue
+from .services.printer_service import get_printer_connector
+from .outbox import POKE_KIND, POKE_TARGET
 
 def get_printer_info_from_card(production_card):
-    conn_str = (
-        f"DRIVER={{SQL Server}};"
-        f"SERVER={settings.EXTERNAL_SQL_SERVER};"
-        f"DATABASE={settings.EXTERNAL_SQL_DB};"
-        f"UID={settings.EXTERNAL_SQL_USER};"
-        f"PWD={settings.EXTERNAL_SQL_PASSWORD}"
+    # Połączenia z puli i wyniki z pamięci - patrz services/printer_service.py
+    return get_printer_connector().printer_info(production_card)
+
+
+def fifo_sort_date(obj):
+    return obj.exp_date_in_process or obj.expire_date or FIFO_FAR_FUTURE
+
+
+def fifo_queue(current_process_id, sub_product_id=None, excluded_ids=()):
+    """
+    Obiekty do wybrania w kolejności FIFO (najstarszy pierwszy) - idzie po indeksie idx_fifo_rank.
+    Konkurencją są pojedyncze obiekty i puste matki (matka z dziećmi liczy się przez dzieci).
+    """
+    children = ProductObject.objects.filter(mother_object=OuterRef('pk'))
+    queryset = (
+        ProductObject.objects
+        .alias(has_children=Exists(children))
+        .filter(current_process_id=current_process_id, current_place__isnull=False)
+        .filter(Q(is_mother=False) | Q(is_mother=True, has_children=False))
+        .exclude(id__in=excluded_ids)
+        .select_related('current_place')
+        .order_by('fifo_sort_date', 'created_at')
     )
+    if sub_product_id is not None:
+        queryset = queryset.filter(sub_product_id=sub_product_id)
+    return queryset
+
 
-    try:
-        conn = pyodbc.connect(conn_str)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT TOP 1 *
-            FROM printers
-            WHERE name IN (?, ?, ?)
-            ORDER BY
-                CASE
-                    WHEN name = ? THEN 0
-                    WHEN name = ? THEN 1
-                    ELSE 2
-                END
-            """,
-            (str(production_card), f"{production_card}_str1", f"{production_card}_str2",
-            str(production_card), f"{production_card}_str1")
-        )
-        result = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
-        
-    except Exception as e:
-        # Zmieniamy na ValidationErrorWithCode
-        raise ValidationErrorWithCode(
-            message=f"Błąd SQL: {str(e)}", 
-            code="external_db_error"
-        )
-
-    if not result:
-        raise ValidationErrorWithCode(
-            message=f"Brak danych drukarki dla karty: {production_card}", 
-            code="printer_data_not_found"
-        )
-
-    printer_name = result[3]   # '15007535'
-    raw_model_name = result[4]  # np. 'LF(AIM-H10-SAC305); LF(OM-338-PT)'
-    model_names = [x.strip() for x in raw_model_name.split(';') if x.strip()]
-
-    mapped_names = []
-
-    for name in model_names:
-        try:
-            map_entry = OneToOneMap.objects.get(s_input=name)
-            mapped_names.append(map_entry.s_output)
-        except OneToOneMap.DoesNotExist:
-            raise ValidationErrorWithCode(
-                message=f"Brak mapowania dla modelu: {name}", 
-                code="mapping_missing"
-            )
-
-    return mapped_names, printer_name
+def _oldest_competitor(current_process_id, sub_product_id, excluded_ids):
+    return (
+        fifo_queue(current_process_id, excluded_ids=excluded_ids)
+        .filter(sub_product_id=sub_product_id)
+        .first()
+    )
 
 
-def check_fifo_violation(current_object):
-    if not current_object.current_process:
+def _fifo_violation(current_object, oldest):
+    if oldest is None:
         return None
 
-    qs_filters = {
-        'current_process': current_object.current_process,
-        'current_place__isnull': False,
-        'sub_product': current_object.sub_product,
-    }
-
-    excluded_ids = [current_object.id]
-
-    if current_object.is_mother:
-        excluded_ids += list(current_object.child_object.values_list('id', flat=True))
-
-    children = ProductObject.objects.filter(
-        is_mother=False,
-        **qs_filters
-    ).exclude(id__in=excluded_ids).annotate(
-        sort_date=Case(
-            When(exp_date_in_process__isnull=False, then=F('exp_date_in_process')),
-            When(expire_date__isnull=False, then=F('expire_date')),
-            default=Value(now().date() + timedelta(days=365 * 100)),
-            output_field=DateField()
-        )
-    )
-    
-    empty_mothers = ProductObject.objects.filter(
-        is_mother=True,
-        **qs_filters
-        
-    ).exclude(id__in=excluded_ids).annotate(
-        children_count=Count('child_object'),
-        sort_date=Case(
-            When(exp_date_in_process__isnull=False, then=F('exp_date_in_process')),
-            When(expire_date__isnull=False, then=F('expire_date')),
-            default=Value(now().date() + timedelta(days=365 * 100)),
-            output_field=DateField()
-        )
-    ).filter(children_count=0)
-
-    combined = list(children) + list(empty_mothers)
-
-    current_sort_date = (
-        current_object.exp_date_in_process or
-        current_object.expire_date or
-        now().date() + timedelta(days=365 * 100)
-    )
-    current_created_at = current_object.created_at
-
-    for obj in combined:
-        obj_sort_date = obj.sort_date
-        if obj_sort_date < current_sort_date or (
-            obj_sort_date == current_sort_date and obj.created_at < current_created_at - timedelta(hours=2)
-        ):
-            return {
-                "error": (
-                    f"W tym procesie znajduje się produkt, który powinien być wybrany jako pierwszy: "
-                    f"serial: {obj.serial_number}, miejsce: {obj.current_place.name if obj.current_place else 'Brak'}"
-                ),
-                "place": obj.current_place.name if obj.current_place else "Brak",
-                "serial_number": obj.serial_number
-            }
+    current_sort_date = fifo_sort_date(current_object)
+    oldest_sort_date = oldest.fifo_sort_date
+
+    if oldest_sort_date < current_sort_date or (
+        oldest_sort_date == current_sort_date and oldest.created_at < current_object.created_at - timedelta(hours=2)
+    ):
+        return {
+            "error": (
+                f"W tym procesie znajduje się produkt, który powinien być wybrany jako pierwszy: "
+                f"serial: {oldest.serial_number}, miejsce: {oldest.current_place.name if oldest.current_place else 'Brak'}"
+            ),
+            "place": oldest.current_place.name if oldest.current_place else "Brak",
+            "serial_number": oldest.serial_number
+        }
 
     return None
 
-def is_valid_date(date_str):
-    try:
-        datetime.strptime(date_str, "%d%m%y")
-        return True
-    except ValueError:
-        return False
-
-# Im sorry for that, Pisałem na szybko wygląda to okropnie ale działa do zrobienia na później
-def detect_parser_type(full_sn: str) -> str:
-    if not full_sn or not isinstance(full_sn, str):
-        return 'undefined'
-
-    full_sn = full_sn.strip()
-
-    if full_sn.startswith('(V)'):
-        if 'AIM' in full_sn:
-            if '40900900' in full_sn:
-                return 'aim_parser'
-            if '62420118330' in full_sn:
-                return 'aim-v9-parser'
-        elif 'MACDERMID' in full_sn:
-            return 'italgas'
-        elif 'heraeus' in full_sn.lower():
-            return 'heraus_parser'
-        elif 'SE4420' in full_sn:
-            return 'klej_parser'
-
-    if '[)>' in full_sn:
-        return 'alpha_parser'
-    
-    if len(full_sn) > 8 and full_sn[6] == 'D' and is_valid_date(full_sn[:6]) and full_sn[7] == '.':
-        return 'dek_parser'
-    if len(full_sn) > 8 and full_sn[6] == 'E' and is_valid_date(full_sn[:6]) and full_sn[7] == '.':
-        return 'ekra_parser'
-
-    if full_sn.startswith('S') or full_sn.startswith('T') or full_sn.startswith('#') or full_sn.startswith('W'):
-        return 'sito_default'
-
-    return 'undefined'
+
+def check_fifo_violation(current_object):
+    return check_fifo_violations([current_object]).get(current_object.id)
+
+
+def check_fifo_violations(objects):
+    """
+    FIFO dla jednego lub wielu obiektów - jedno zapytanie "czy jest coś starszego" na (proces, sub_product).
+    Obiekty z listy i ich dzieci nie są dla siebie konkurencją (wychodzą razem).
+    Wystarczy najstarszy konkurent: jeśli on nie łamie FIFO, to żaden inny też nie.
+    """
+    objects = [obj for obj in objects if obj.current_process_id]
+    if not objects:
+        return {}
+
+    excluded_ids = set()
+    for obj in objects:
+        excluded_ids.add(obj.id)
+        if obj.is_mother:
+            excluded_ids.update(child.id for child in obj.child_object.all())
+
+    groups = {}
+    for obj in objects:
+        groups.setdefault((obj.current_process_id, obj.sub_product_id), []).append(obj)
+
+    violations = {}
+    for (current_process_id, sub_product_id), group in groups.items():
+        oldest = _oldest_competitor(current_process_id, sub_product_id, excluded_ids)
+        for obj in group:
+            result = _fifo_violation(obj, oldest)
+            if result:
+                violations[obj.id] = result
+
+    return violations
+
 
 def poke_process(process_id):
-    try:
-        response = requests.get(f"http://127.0.0.1:{port}/{name}/new-product-poke/{process_id}/", timeout=30)
-
-        if response.status_code >= 200 and response.status_code < 1000:
-            return True
-        
-        raise ValidationError({"error": "Błąd podczas wykonywania poke – endpoint zwrócił błąd."})
-
-    except requests.exceptions.RequestException as e:
-        print("POKE ERROR:", e)
-        raise ValidationError({"error": "Nie udało się skontaktować z endpointem poke."})
-    
\ No newline at end of file
+    """
+    Powiadamia mikroserwis o nowym produkcie. Poke idzie przez outbox (checkprocess/outbox.py) -
+    wołać w transakcji ruchu, wysyła go drain_outbox z ponowieniami.
+    """
+    return enqueue(POKE_KIND, POKE_TARGET, {'process_id': process_id})
@@ -1,7 +1,10 @@
-from .models import ProductObject, ProductProcess, AppToKill, Edge, Place, ProductProcessCondition, ConditionLog, LogFromMistake
+from .models import AppToKill, ConditionLog, LogFromMistake
 from django.shortcuts import get_list_or_404
-from django.core.exceptions import ObjectDoesNotExist
-from .utils import check_fifo_violation
+from .utils import check_fifo_violation, check_fifo_violations
+from .services.movement_context import MovementContext
+from .services.heartbeat_service import get_last_check
+from .services.error_log_writer import get_error_log_writer
+from .services.occupancy_service import place_is_busy
 from django.utils.timezone import now
 from datetime import timedelta
 from django.utils import timezone
@@ -9,21 +12,30 @@ from .custom_validators import ValidationErrorWithCode
 
 
 class ProcessMovementValidator:
-    def __init__(self, process_uuid, full_sn, place_name, movement_type, who):
+    def __init__(self, process_uuid, full_sn, place_name, movement_type, who, context=None):
         self.process_uuid = process_uuid
         self.full_sn = full_sn
         self.place_name = place_name
         self.movement_type = movement_type
         self.who = who
+        # Wspólny z handlerem i widokiem - proces, miejsce i obiekt ładowane raz na request
+        self.context = context or MovementContext(process_uuid, place_name)
         
         self.product_object = None
         self.process = None
         self.place = None
+
+    @property
+    def graph(self):
+        return self.context.graph
+
+    @property
+    def settings(self):
+        return self.context.settings
         
     def run(self):
         # Loading function to put sth in Bad Logs -> in the future put them inside class but now I have no test to provide this
-        self.load_process()
-        self.load_place()
+        self.load_context([self.full_sn])
 
         try:
             self.validate_movement_type()
@@ -74,17 +86,19 @@ class ProcessMovementValidator:
         except ValidationErrorWithCode as e:
             # Łapiemy błąd, zapisujemy do bazy i rzucamy dalej
             self.save_error_log(e)
+            self.context.unit_of_work.flush()
             raise e
         
         except Exception as e:
             # Opcjonalnie: łapanie krytycznych błędów (np. błąd kodu)
             self.save_error_log(ValidationErrorWithCode(str(e), code="internal_error"))
+            self.context.unit_of_work.flush()
             raise e
 
 
     def validate_status_of_line(self):
         if self.process.killing_app:
-            last_check = self.place.group.last_check
+            last_check = get_last_check(self.place.group)
             if not last_check or (timezone.now() - last_check) > timedelta(minutes=1):
                 raise ValidationErrorWithCode(
                     message='Aplikacja na maszynie nie odpowiada – nie można produkować',
@@ -94,17 +108,15 @@ class ProcessMovementValidator:
             return
         
     def validate_process_condition_settings(self):
-        if not hasattr(self.process, 'conditions'):
+        if not self.settings.has_conditions:
             raise ValidationErrorWithCode(
                 message='Ten proces nie ma ustwaień condition nie można nim sprawdzać stanu produktu',
                 code='bad_condition_settings'
             )
     
     def validate_object_existence_and_status(self):
-        try:
-            self.product_object = ProductObject.objects.get(full_sn=self.full_sn)
-        except ProductObject.DoesNotExist:
-            self.product_object = None
+        if not self.product_object or self.product_object.full_sn != self.full_sn:
+            self.try_load_object()
 
         if not self.product_object:
             raise ValidationErrorWithCode(
@@ -118,10 +130,7 @@ class ProcessMovementValidator:
             )
             
     def try_load_object(self):
-        try:
-            self.product_object = ProductObject.objects.get(full_sn=self.full_sn)
-        except ProductObject.DoesNotExist:
-            self.product_object = None
+        self.product_object = self.context.get_object(self.full_sn)
             
     def validate_no_current_place_in_move(self):
         if self.product_object.current_place is None:
@@ -152,18 +161,14 @@ class ProcessMovementValidator:
             )
             
     def validate_settings_in_process(self):
-        for attr in ['defaults','starts','conditions','endings']:
-            try:
-                if getattr(self.process, attr):
-                    return
-            except ObjectDoesNotExist:
-                pass
+        if self.settings.has_any:
+            return
         raise ValidationErrorWithCode('Proces nie ma zdefiniowanych żadnych ustawień.', 'no_process_settings')
     
     def validate_product_not_already_in_process(self):
-        current_process = self.product_object.current_process
+        current_process_id = self.product_object.current_process_id
 
-        if current_process and str(current_process.id) == str(self.process.id):
+        if current_process_id and str(current_process_id) == str(self.process.id):
             raise ValidationErrorWithCode(
                 message='Ten produkt już znajduje się w tym procesie.',
                 code='already_in_process'
@@ -186,31 +191,31 @@ class ProcessMovementValidator:
             )
             
     def validate_process_and_current_process(self):
-        current_process = self.product_object.current_process
+        current_process_id = self.product_object.current_process_id
         
-        if not current_process or str(current_process.id) != str(self.process_uuid):
+        if not current_process_id or str(current_process_id) != str(self.process_uuid):
             raise ValidationErrorWithCode(
                 message='Ten produkt nie należy do tego procesu i nie możesz go przenieść.',
                 code='process_mismatch'
             )
         
-        self.process = current_process
+        if not self.process:
+            self.process = self.product_object.current_process
     
     def validate_edge_can_move(self):
-        try:
-            target_process = ProductProcess.objects.get(id=self.process_uuid)
-        except ProductProcess.DoesNotExist:
+        if not self.process or str(self.process.id) != str(self.process_uuid):
             raise ValidationErrorWithCode('Docelowy proces nie istnieje.','target_process_not_found')
 
-        src = self.product_object.current_process
-        has_edge = Edge.objects.filter(source=src, target=target_process).exists()
-        if not has_edge:
-            src_label = src.label if src else '(brak bieżącego procesu)'
+        src_id = self.product_object.current_process_id
+        if not self.graph.has_edge(src_id, self.process.id):
+            if not src_id:
+                src_label = '(brak bieżącego procesu)'
+            else:
+                src_label = self.graph.label(src_id) or self.product_object.current_process.label
             raise ValidationErrorWithCode(
-                message=f'Brak przejścia z procesu "{src_label}" do "{target_process.label}".',
+                message=f'Brak przejścia z procesu "{src_label}" do "{self.process.label}".',
                 code='edge_not_defined'
             )
-        self.process = target_process
             
     def validate_fifo_rules(self):
         if self.process.respect_fifo_rules:
@@ -224,15 +229,14 @@ class ProcessMovementValidator:
             return
             
     def validate_only_one_place(self):
-        try:
-            place = Place.objects.get(name=self.place_name, process=self.process)
-        except:
+        place = self.place
+        if not place:
             raise ValidationErrorWithCode(
                 message='Podane miejsce nie istnieje',
                 code='place_not_found'
             )
         if place.only_one_product_object:
-            if ProductObject.objects.filter(current_place=place, end=False).exists():
+            if place_is_busy(place.id):
                 raise ValidationErrorWithCode(
                 message='To miejsce jest oznaczone jako "jeden produkt jedno miejsce" a w nim już coś się znajduje',
                 code='busy_place'
@@ -247,19 +251,15 @@ class ProcessMovementValidator:
                 )
             
     def validate_process_receive_with_current_place(self):
+        # Proces i miejsce są już w kontekście - tu tylko sprawdzamy, czy się znalazły
         if not self.process:
-            try:
-                self.process = ProductProcess.objects.get(id=self.process_uuid)
-            except ProductProcess.DoesNotExist:
-                raise ValidationErrorWithCode(
-                    message='Proces nie istnieje.',
-                    code='process_not_found'
-                )
+            raise ValidationErrorWithCode(
+                message='Proces nie istnieje.',
+                code='process_not_found'
+            )
             
         if self.movement_type != 'check':
-            try:
-                self.place = Place.objects.get(name=self.place_name, process=self.process)
-            except Place.DoesNotExist:
+            if not self.place:
                 raise ValidationErrorWithCode(
                     message='Podane miejsce nie istnieje lub nie należy do wskazanego procesu.',
                     code='place_not_found'
@@ -273,31 +273,31 @@ class ProcessMovementValidator:
             return
         
         try:
-            kill_flag = AppToKill.objects.get(line_name=self.place)
+            kill_flag = self.place.apptokill
         except AppToKill.DoesNotExist:
             raise ValidationErrorWithCode(
                 message='AppKill nie istnieje',
                 code='app_kill_no_exist'
             )
-        kill_flag.killing_flag = True
-        kill_flag.save()
+        # Zapis przy flush - udany przyjazd i tak cofa flagę w handlerze, wtedy do bazy nie idzie nic
+        self.context.unit_of_work.update(kill_flag, killing_flag=True)
     
     def validate_is_trash_process(self):
-        if not hasattr(self.process, 'endings'):
+        if not self.settings.has_endings:
             raise ValidationErrorWithCode(
                 message='Ten proces nie jest oznaczony jako trash (brakuje ustawień zakończenia).',
                 code='not_a_trash_process'
             )
         
     def check_current_process_condition(self):
-        src = getattr(self.product_object, 'current_process', None)
-        if not src:
+        src_id = getattr(self.product_object, 'current_process_id', None)
+        if not src_id:
             return False
         
-        if not Edge.objects.filter(source=src, target=self.process).exists():
+        if not self.graph.has_edge(src_id, self.process.id):
             return False
         
-        return ProductProcessCondition.objects.filter(product_process=src).exists()
+        return self.graph.is_condition(src_id)
     
     def check_cond_path(self):
         if self.process.cond_path is None:
@@ -305,8 +305,8 @@ class ProcessMovementValidator:
                 message="Poprzednia faza jest warunkowa, ale w docelowej nie skonfigurowano drogi True/False.",
                 code="no_settings_phase"
             )
-        src = self.product_object.current_process
-        cond_log = (ConditionLog.objects.filter(process=src, product=self.product_object).order_by('-time_date').first())
+        src_id = self.product_object.current_process_id
+        cond_log = (ConditionLog.objects.filter(process_id=src_id, product=self.product_object).order_by('-time_date').first())
         if not cond_log:
             raise ValidationErrorWithCode(
                 message="Brak logu z fazy warunkowej — nie można przyjąć obiektu do nowego procesu.",
@@ -331,7 +331,10 @@ class ProcessMovementValidator:
         Pomocnicza metoda do zapisu logu. 
         Bezpiecznie obsługuje brakujące obiekty self.process czy self.place.
         """
-        LogFromMistake.objects.create(
+        get_error_log_writer().add(self.build_error_log(exception_obj))
+
+    def build_error_log(self, exception_obj):
+        return LogFromMistake(
             process=self.process, 
             place=self.place,
             product_object=self.product_object,
@@ -349,18 +352,118 @@ class ProcessMovementValidator:
 
     # LOAD FUNCTIONS
 
-    def load_process(self):
-        try:
-            self.process = ProductProcess.objects.get(id=self.process_uuid)
-        except (ObjectDoesNotExist, ValueError, TypeError):
-            self.process = None
+    def load_context(self, full_sns):
+        self.context.load(full_sns)
+        self.process = self.context.process
+        self.place = self.context.place
 
-    def load_place(self):
-        if not self.process:
-            self.place = None
-            return
+
+class BatchProcessMovementValidator(ProcessMovementValidator):
+    """
+    Walidacja listy SN naraz (ProductMoveListView).
+    Proces, miejsce, ustawienia i linia sprawdzane są raz, obiekty ładowane jednym zapytaniem,
+    FIFO liczone raz na grupę. Błędy per SN zbierane są w self.errors zamiast przerywać całą listę.
+    """
+    SUPPORTED_MOVEMENT_TYPES = ('move', 'receive')
+
+    def __init__(self, process_uuid, full_sns, place_name, movement_type, who, context=None):
+        super().__init__(process_uuid, None, place_name, movement_type, who, context=context)
+        self.full_sns = list(dict.fromkeys(full_sns))
+        self.loaded_objects = {}
+        self.product_objects = {}
+        self.errors = {}
+
+    def run(self):
+        self.load_context(self.full_sns)
 
         try:
-            self.place = Place.objects.get(name=self.place_name, process=self.process)
-        except (ObjectDoesNotExist, ValueError, TypeError):
-            self.place = None
\ No newline at end of file
+            self.validate_movement_type()
+            self.validate_who_make_move()
+
+            if self.movement_type not in self.SUPPORTED_MOVEMENT_TYPES:
+                raise ValidationErrorWithCode(
+                    message=f'Typ ruchu "{self.movement_type}" nie jest obsługiwany dla listy.',
+                    code='movement_type_does_not_exist'
+                )
+
+            if self.movement_type == 'receive':
+                self.validate_process_receive_with_current_place()
+                self.validate_only_one_place()
+                self.validate_only_one_place_for_batch()
+                self.set_killing_flag_on_true_if_need()
+                self.validate_settings_in_process()
+                self.validate_status_of_line()
+
+            elif self.movement_type == 'move' and self.process:
+                self.validate_settings_in_process()
+
+        except ValidationErrorWithCode as e:
+            self.save_error_log(e)
+            self.context.unit_of_work.flush()
+            raise e
+
+        self.loaded_objects = self.load_objects()
+
+        for sn in self.full_sns:
+            self.full_sn = sn
+            self.product_object = self.loaded_objects.get(sn)
+            try:
+                self.validate_object(sn)
+            except ValidationErrorWithCode as e:
+                self.errors[sn] = e
+            else:
+                self.product_objects[sn] = self.product_object
+
+        if self.movement_type == 'move' and self.process and self.process.respect_fifo_rules:
+            self.validate_fifo_rules_for_batch()
+
+        self.save_error_logs()
+        self.full_sn = None
+        self.product_object = None
+
+    def validate_object(self, sn):
+        self.validate_object_existence_and_status()
+
+        if self.movement_type == 'receive':
+            self.validate_product_not_already_in_process()
+            # Z fazy warunkowej obiekt może przejść tylko do gałęzi zgodnej z wynikiem (Pass/Fail)
+            if self.check_current_process_condition():
+                self.check_cond_path()
+            else:
+                self.validate_receive_without_move()
+            self.validate_edge_can_move()
+
+        elif self.movement_type == 'move':
+            self.validate_process_and_current_process()
+            self.validate_no_current_place_in_move()
+            self.validate_object_quranteen_time()
+
+    def validate_only_one_place_for_batch(self):
+        if self.place.only_one_product_object and len(self.full_sns) > 1:
+            raise ValidationErrorWithCode(
+                message='To miejsce jest oznaczone jako "jeden produkt jedno miejsce" - nie można przyjąć kilku produktów naraz',
+                code='busy_place'
+            )
+
+    def validate_fifo_rules_for_batch(self):
+        violations = check_fifo_violations(self.product_objects.values())
+        for sn, product_object in list(self.product_objects.items()):
+            result = violations.get(product_object.id)
+            if result:
+                self.errors[sn] = ValidationErrorWithCode(message=result["error"], code="fifo_violation")
+                del self.product_objects[sn]
+
+    def load_objects(self):
+        return dict(self.context.objects)
+
+    def try_load_object(self):
+        self.product_object = self.loaded_objects.get(self.full_sn)
+
+    def save_error_logs(self):
+        logs = []
+        for sn, error in self.errors.items():
+            self.full_sn = sn
+            self.product_object = self.loaded_objects.get(sn)
+            logs.append(self.build_error_log(error))
+        if logs:
+            get_error_log_writer().add(*logs)
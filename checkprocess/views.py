@@ -1,4 +1,6 @@
 from django.shortcuts import get_object_or_404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.db import transaction, IntegrityError, models
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
@@ -9,15 +11,15 @@ from rest_framework import viewsets, status, filters, mixins
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import ValidationError, NotFound
 from rest_framework.generics import ListAPIView, GenericAPIView, UpdateAPIView
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import OrderingFilter
 
 from .permissions import HasPermCanSeeAdminPage, HasPermCanUpdateAdminPage
-from .filters import ProductObjectFilter, ProductObjectProcessLogFilter
-from .parsers import get_parser
-from .utils import detect_parser_type, get_printer_info_from_card, poke_process
-from .validation import ProcessMovementValidator, ValidationErrorWithCode
+from .filters import ProductObjectFilter, ProductObjectProcessLogExportFilter, TrigramSearchFilter
+from .parsers import parse_sn
+from .utils import get_printer_info_from_card, poke_process, fifo_queue
+from .validation import ProcessMovementValidator, BatchProcessMovementValidator, ValidationErrorWithCode
 from .models import (Product, ProductProcess, ProductObject, ProductObjectProcess, ProductObjectProcessLog, Place, AppToKill, Edge, SubProduct,
                     LastProductOnPlace, PlaceGroupToAppKill, MessageToApp, LogFromMistake)
 
@@ -25,13 +27,26 @@ from .serializers import(ProductSerializer, ProductProcessSerializer, ProductObj
                         ProductObjectProcessLogSerializer, PlaceSerializer, EdgeSerializer, BulkProductObjectCreateSerializer, BulkProductObjectCreateToMotherSerializer,
                         PlaceGroupToAppKillSerializer, RetoolingSerializer, StencilStartProdSerializer, LogFromMistakeSerializer, ProductProcessSimpleSerializer,
                         AppToKillSerializer, PlaceSerializerAdmin, UnifyLogsSerializer, ProductObjectAdminSerializer, ProductObjectAdminSerializerProcessHelper,
-                        PlaceGroupToAppKillUpdateSerializer, ProductObjectAdminSerializerPlaceHelper)
+                        PlaceGroupToAppKillUpdateSerializer, ProductObjectAdminSerializerPlaceHelper, FifoNextToPickSerializer)
 
-from checkprocess.services.movement_service import MovementHandler
+from checkprocess.services.movement_service import MovementHandler, BatchMovementHandler
 from checkprocess.services.edge_service import EdgeSameInSameOut
-
-from datetime import timedelta, date, datetime
-from rest_framework.pagination import PageNumberPagination
+from checkprocess.services.kill_service import aget_kill_snapshot, apop_due_message, kill_status_payload, open_kill_stream
+from checkprocess.services.heartbeat_service import arecord_heartbeat
+from checkprocess.services.message_scheduler import schedule_stencil_warnings, cancel_pending_messages
+from checkprocess.services.bulk_create_service import BulkProductObjectCreator, BulkChildObjectCreator
+from checkprocess.services.log_export import export_rows, EXPORT_FORMATS
+from checkprocess.services.occupancy_service import sub_product_counts
+from checkprocess.services.movement_context import MovementContext
+from checkprocess.services.unit_of_work import UnitOfWork
+from checkprocess.services.idempotency import idempotent_scan
+from global_app.async_views import MachineAsyncView
+
+from datetime import date, datetime
+import base64
+import json
+from rest_framework.pagination import PageNumberPagination, BasePagination
+from rest_framework.utils.urls import replace_query_param
 
 
 class BasicProcessPagination(PageNumberPagination):
@@ -95,7 +110,7 @@ class ProductObjectViewSet(viewsets.ModelViewSet):
     serializer_class = ProductObjectSerializer
     queryset = ProductObject.objects.all()
 
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+    filter_backends = [DjangoFilterBackend, OrderingFilter, TrigramSearchFilter]
     filterset_class = ProductObjectFilter
 
     ordering_fields = [
@@ -233,14 +248,11 @@ class ProductObjectViewSet(viewsets.ModelViewSet):
         mother_sn = serializer.validated_data.pop('mother_sn', None)
         mother_obj = None
         
-        parser_type = detect_parser_type(full_sn)
-        
         if not hasattr(process, 'starts'):
             raise ValidationError("To nie jest process startowy")
 
         try:
-            parser = get_parser(parser_type)
-            sub_product, serial_number, production_date, expire_date, serial_type, q_code = parser.parse(full_sn)
+            sub_product, serial_number, production_date, expire_date, serial_type, q_code = parse_sn(full_sn)
         except ValueError as e:
             raise ValidationError(str(e))
         
@@ -326,19 +338,29 @@ class ProductObjectProcessLogViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'], url_path='all-logs')
     def all_logs(self, request):
-        logs = (
-            ProductObjectProcessLog.objects
-            .select_related('product_object', 'process', 'place')
-            .order_by('-entry_time')
-        )
-
-        serializer = self.get_serializer(logs, many=True)
-        data = serializer.data
-
-        return Response(data)
+        """
+        Eksport logów strumieniem (?export_format=ndjson|csv) z filtrami date_from, date_to, process, place, sn.
+        Wiersze idą prosto z kursora serwerowego - pamięć stała, pierwsze bajty od razu.
+        """
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({"export_format": f"Dostępne formaty: {', '.join(EXPORT_FORMATS)}."})
+
+        # date_from / date_to zawężają zapytanie do partycji z tego zakresu
+        logs = ProductObjectProcessLog.objects.order_by('-entry_time')
+        filterset = ProductObjectProcessLogExportFilter(request.query_params, queryset=logs)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        stream, content_type = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(stream(export_rows(filterset.qs)), content_type=content_type)
+        if export_format == 'csv':
+            response['Content-Disposition'] = 'attachment; filename="process-logs.csv"'
+        return response
 
 
 class ProductMoveView(APIView):
+    @idempotent_scan
     def post(self, request, *args, **kwargs):
         
         process_uuid = self.kwargs.get('process_uuid')
@@ -348,24 +370,21 @@ class ProductMoveView(APIView):
         who = request.data.get('who')
         result = request.data.get('result')
 
+        validator = ProcessMovementValidator(process_uuid, full_sn, place_name, movement_type, who)
         try:
-            validator = ProcessMovementValidator(process_uuid, full_sn, place_name, movement_type, who)
             validator.run()
             
             product_object = validator.product_object
             place = validator.place
             process = validator.process
-            new_place = product_object.current_place
-            MessageToApp.objects.filter(line=new_place, send=False).update(send=True)
-            handler = MovementHandler.get_handler(movement_type, product_object, place, process, who, result)
+            cancel_pending_messages([product_object.current_place_id])
+            handler = MovementHandler.get_handler(movement_type, product_object, place, process, who, result, context=validator.context)
             handler.execute()
 
-            obj = ProductObject.objects.get(full_sn=full_sn)
-            
             return Response(
                 {"detail": "Ruch został wykonany pomyślnie.",
-                 "id": obj.id,
-                 "is_mother": obj.is_mother},
+                 "id": product_object.id,
+                 "is_mother": product_object.is_mother},
                 status=status.HTTP_200_OK
             )
         
@@ -374,9 +393,15 @@ class ProductMoveView(APIView):
                 {"detail": e.message, "code": e.code},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        finally:
+            # Zapisy walidatora, których nie zabrał handler (np. killing_flag po błędzie)
+            validator.context.unit_of_work.flush()
 
         
 class ProductMoveListView(APIView):
+    # Bez wersji wsadowej - każdy SN przechodzi walidację i handler pojedynczego skanu, jak wcześniej
+    PER_SN_MOVEMENT_TYPES = ('check', 'trash')
+
     def post(self, request, *args, **kwargs):
         
         process_uuid = self.kwargs.get('process_uuid')
@@ -389,38 +414,47 @@ class ProductMoveListView(APIView):
         if not isinstance(full_sn, list):
             full_sn = [full_sn]
         
-        product_objects = ProductObject.objects.filter(full_sn__in=full_sn)
-        processes = product_objects.values_list("current_process_id", flat=True).distinct()
-        if processes.count() > 1:
+        # Obiekty ładowane raz - ten sam kontekst dostaje walidator i handler
+        context = MovementContext(process_uuid, place_name).load(full_sn)
+        processes = {obj.current_process_id for obj in context.objects.values()}
+        if len(processes) > 1:
             return Response(
                 {"detail": "Wszystkie obiekty muszą należeć do tego samego procesu."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        responses = []
+        if movement_type in self.PER_SN_MOVEMENT_TYPES:
+            return self.move_one_by_one(process_uuid, full_sn, place_name, movement_type, who, result)
 
         try:
-            for sn in full_sn:
-                validator = ProcessMovementValidator(process_uuid, sn, place_name, movement_type, who)
-                validator.run()
-                
-                product_object = validator.product_object
-                place = validator.place
-                process = validator.process
-                
-                handler = MovementHandler.get_handler(movement_type, product_object, place, process, who, result)
-                handler.execute()
+            validator = BatchProcessMovementValidator(process_uuid, full_sn, place_name, movement_type, who, context=context)
+            validator.run()
 
-                obj = ProductObject.objects.get(full_sn=sn)
-                
-                responses.append({
+            if validator.errors:
+                first_error = next(iter(validator.errors.values()))
+                return Response(
+                    {"detail": first_error.message,
+                     "code": first_error.code,
+                     "results": [
+                         {"full_sn": sn, "detail": e.message, "code": e.code} for sn, e in validator.errors.items()
+                     ]},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            handler = BatchMovementHandler.get_handler(
+                movement_type, validator.product_objects.values(), validator.place, validator.process, who, context=context
+            )
+            handler.execute()
+
+            responses = [
+                {
                     "id": obj.id,
                     "is_mother": obj.is_mother,
                     "full_sn": sn,
                     "detail": "Ruch został wykonany pomyślnie."
-                })
-
-                last_sn = sn 
+                }
+                for sn, obj in validator.product_objects.items()
+            ]
 
             return Response(responses, status=status.HTTP_200_OK)
 
@@ -429,9 +463,42 @@ class ProductMoveListView(APIView):
                 {"detail": e.message, "code": e.code},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        finally:
+            context.unit_of_work.flush()
+
+    def move_one_by_one(self, process_uuid, full_sns, place_name, movement_type, who, result):
+        responses = []
+        for sn in full_sns:
+            validator = ProcessMovementValidator(process_uuid, sn, place_name, movement_type, who)
+            try:
+                validator.run()
+
+                product_object = validator.product_object
+                handler = MovementHandler.get_handler(
+                    movement_type, product_object, validator.place, validator.process, who, result, context=validator.context
+                )
+                handler.execute()
+
+            except ValidationErrorWithCode as e:
+                return Response(
+                    {"detail": e.message, "code": e.code},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            finally:
+                validator.context.unit_of_work.flush()
+
+            responses.append({
+                "id": product_object.id,
+                "is_mother": product_object.is_mother,
+                "full_sn": sn,
+                "detail": "Ruch został wykonany pomyślnie."
+            })
+
+        return Response(responses, status=status.HTTP_200_OK)
 
 
 class ScrapProduct(APIView):
+    @idempotent_scan
     def post(self, request, *args, **kwargs):
         process_uuid = self.kwargs.get('process_uuid')
         place_name = request.data.get('place_name')
@@ -471,6 +538,7 @@ class ScrapProduct(APIView):
     
 
 class ContinueProduction(APIView):
+    @idempotent_scan
     def post(self, request, *args, **kwargs):
         process_uuid = self.kwargs.get('process_uuid')
         place_name = request.data.get('place_name')
@@ -482,8 +550,8 @@ class ContinueProduction(APIView):
         if movement_type != 'receive':
             raise ValidationError("Tylko przyjmowanie dla tego enpointu")
         
+        validator = ProcessMovementValidator(process_uuid, full_sn, place_name, movement_type, who)
         try:
-            validator = ProcessMovementValidator(process_uuid, full_sn, place_name, movement_type, who)
             validator.run()
             
             product_object = validator.product_object
@@ -504,7 +572,7 @@ class ContinueProduction(APIView):
                 raise ValidationError("Nie możesz użyć tej pasty do tego produktu – ostatnia używana była inna.")
 
             
-            handler = MovementHandler.get_handler(movement_type, product_object, place, process, who)
+            handler = MovementHandler.get_handler(movement_type, product_object, place, process, who, context=validator.context)
             handler.execute()
             
             return Response(
@@ -517,6 +585,9 @@ class ContinueProduction(APIView):
                 {"detail": e.message, "code": e.code},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        finally:
+            # Zapisy walidatora, których nie zabrał handler (np. killing_flag po błędzie)
+            validator.context.unit_of_work.flush()
 
 
 class StencilStartNewProd(GenericAPIView):
@@ -558,35 +629,19 @@ class StencilStartNewProd(GenericAPIView):
                         code="poke_required"
                     )
 
-                if defaults.use_poke:
-                    poke_process(7)
+                with transaction.atomic():
+                    handler = MovementHandler.get_handler(movement_type, product_object, place, process, who, context=validator.context)
+                    handler.execute()
 
-                handler = MovementHandler.get_handler(movement_type, product_object, place, process, who)
-                handler.execute()
+                    schedule_stencil_warnings(place, product_object.product)
 
-                message_one = 'Produkcja tym sitem trwa ponad 7.5 godziny za 30 min aplikacja zostanie wyłączona'
-                message_two = 'Produkcja trwa już 8 godzin wyłączam aplikacje do czasu przezbrojenia'
-
-                MessageToApp.objects.create(
-                    line=place,
-                    message=message_one,
-                    send=False,
-                    when_trigger=timezone.now() + timedelta(hours=7, minutes=30),
-                    product=product_object.product
-                )
-
-                MessageToApp.objects.create(
-                    line=place,
-                    message=message_two,
-                    send=False,
-                    when_trigger=timezone.now() + timedelta(hours=8),
-                    product=product_object.product
-                )
+                    LastProductOnPlace.objects.create(
+                        product_process=process, 
+                        place=place
+                    )
 
-                LastProductOnPlace.objects.create(
-                    product_process=process, 
-                    place=place
-                )
+                    # Poke trafia do outboxu razem z ruchem - request nie czeka na mikroserwis
+                    poke_process(7)
                 
                 return Response(
                     {"detail": "Ruch został wykonany pomyślnie."},
@@ -610,6 +665,9 @@ class StencilStartNewProd(GenericAPIView):
                 {"detail": "Wystąpił nieoczekiwany błąd serwera.", "code": "unknown_error"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        finally:
+            # Zapisy walidatora, których nie zabrał handler (np. killing_flag po błędzie)
+            validator.context.unit_of_work.flush()
 
 
 class ProductStartNewProduction(APIView):
@@ -647,7 +705,9 @@ class ProductStartNewProduction(APIView):
                 if product_object.sub_product.name not in normalized_names:
                     raise ValidationError({"error": "Nie możesz użyć tego typu pasty dla tego produktu"})
                 
-                handler = MovementHandler.get_handler(movement_type, product_object, place, process, who, printer_name=printer_name)
+                handler = MovementHandler.get_handler(
+                    movement_type, product_object, place, process, who, printer_name=printer_name, context=validator.context
+                )
                 handler.execute()
                 
                 LastProductOnPlace.objects.create(product_process=process, place=place, p_type=product_object.sub_product, name_of_productig_product=printer_name)
@@ -671,94 +731,48 @@ class ProductStartNewProduction(APIView):
                 {"detail": str(e), "code": "unknown_error"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        finally:
+            # Zapisy walidatora, których nie zabrał handler (np. killing_flag po błędzie)
+            validator.context.unit_of_work.flush()
 
 
-class AppKillStatusView(APIView):
-    def get(self, request):
-        group_name = request.query_params.get("group")
+class AppKillStatusView(MachineAsyncView):
+    async def get(self, request):
+        group_name = request.GET.get("group")
         if not group_name:
-            return Response({"error": "Brakuje parametru 'group'."}, status=status.HTTP_400_BAD_REQUEST)
+            return self.respond({"error": "Brakuje parametru 'group'."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            group = PlaceGroupToAppKill.objects.get(name=group_name)
-        except PlaceGroupToAppKill.DoesNotExist:
-            return Response({"error": f"Grupa '{group_name}' nie istnieje."}, status=status.HTTP_404_NOT_FOUND)
-        
-        if group.checking == False:
-            return Response({
-                "group": group_name,
-                "expired": False,
-                "places_with_expired": [],
-                "kill": False,
-                "per_place": {}
-            }, status=200)
-
-        places_qs = (
-            Place.objects
-            .filter(group=group, process__killing_app=True)
-            .only("id", "name")
-        )
+        current_time = timezone.now()
+        snapshot = await aget_kill_snapshot(group_name, current_time)
+        if snapshot is None:
+            return self.respond({"error": f"Grupa '{group_name}' nie istnieje."}, status=status.HTTP_404_NOT_FOUND)
 
-        place_ids = list(places_qs.values_list("id", flat=True))
+        if not snapshot.is_active:
+            return self.respond(kill_status_payload(snapshot))
 
-        if not place_ids:
-            return Response({
-                "group": group_name,
-                "expired": False,
-                "places_with_expired": [],
-                "kill": False,
-                "per_place": {}
-            }, status=200)
-        
-        current_time = timezone.now()
-        today = date.today()
+        message_to_send = await apop_due_message(snapshot, current_time)
+        await arecord_heartbeat(snapshot.group_id, current_time)
 
-        expired_conditions = Q(
-            exp_date_in_process__lt=today
-        ) | Q(
-            max_in_process__isnull=False,
-            max_in_process__lt=current_time 
-        )
-        expired_ids = list(
-            ProductObject.objects.filter(
-                expired_conditions,
-                current_place_id__in=place_ids
-            ).values_list("current_place_id", flat=True).distinct()
-        )
-        places_with_expired = list(
-            Place.objects.filter(id__in=expired_ids).values_list("name", flat=True)
-        )
-        expired_any = bool(expired_ids)
-
-        msg_obj = MessageToApp.objects.filter(
-            line__in=place_ids,
-            send=False,
-            when_trigger__lte=timezone.now()
-        ).order_by("when_trigger").first()
-
-        message_to_send = msg_obj.message if msg_obj else ""
-        if msg_obj:
-            msg_obj.send = True
-            msg_obj.save()
-
-        per_place_flags = dict(
-            AppToKill.objects.filter(line_name_id__in=place_ids)
-            .values_list("line_name_id", "killing_flag")
-        )
-        manual_kill_any = any(per_place_flags.values()) if per_place_flags else False
-        effective_kill = manual_kill_any or expired_any
-        
-        group.last_check = timezone.now()
-        group.save()
+        return self.respond(kill_status_payload(snapshot, message_to_send))
 
-        return Response({
-            "group": group_name,
-            "expired": expired_any,
-            "places_with_expired": places_with_expired,
-            "kill": effective_kill,
-            "per_place": per_place_flags,
-            "message": message_to_send
-        }, status=200)
+
+class AppKillStreamView(APIView):
+    """
+    Strumień SSE tylko pod ASGI (MachineFixture/asgi.py). Pod WSGI Django musi najpierw wyczerpać asynchroniczny
+    strumień, a ten się nie kończy - request wisiałby bez końca, zbierając zdarzenia w pamięci.
+    """
+    def get(self, request, group_name):
+        if not isinstance(request._request, ASGIRequest):
+            return Response(
+                {"error": "Strumień wymaga serwera ASGI - użyj /kill-app/ (odpytywanie).", "code": "asgi_required"},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+
+        group_id = PlaceGroupToAppKill.objects.filter(name=group_name).values_list("id", flat=True).first()
+        if group_id is None:
+            return Response({"error": f"Grupa '{group_name}' nie istnieje."}, status=status.HTTP_404_NOT_FOUND)
+
+        return open_kill_stream(request._request, group_id, group_name)
         
 
 class GraphImportView(APIView):
@@ -837,65 +851,32 @@ class BulkProductObjectCreateView(APIView):
             raise ValidationError("To nie jest process startowy")
 
         try:
-            with transaction.atomic():
-                try:
-                    place_obj = Place.objects.get(name=place_name, process=process)
-                except:
-                    raise ValidationError("Takie miejsce nie istnieje")
-                created_serials = []
-
-                for obj in objects_data:
-                    full_sn = obj.get('full_sn')
-                    if not full_sn:
-                        raise ValidationError("Brakuje 'full_sn' w jednym z obiektów.")
-
-                    parser_type = detect_parser_type(full_sn)
-                    try:
-                        parser = get_parser(parser_type)
-                        sub_product, serial_number, production_date, expire_date, serial_type, q_code = parser.parse(full_sn)
-                    except ValueError as e:
-                        raise ValidationError(f"Błąd parsowania SN '{full_sn}': {str(e)}")
-
-                    try:
-                        sub_product_obj = SubProduct.objects.get(product=product, name=sub_product)
-                    except SubProduct.DoesNotExist:
-                        raise ValidationError(f"SubProduct '{sub_product}' nie istnieje dla produktu '{product.name}'.")
-
-                    product_object = ProductObject(
-                        full_sn=full_sn,
-                        product=product,
-                        sub_product=sub_product_obj,
-                        serial_number=serial_number,
-                        production_date=production_date,
-                        expire_date=expire_date,
-                        current_place=place_obj,
-                        current_process=process
-                    )
+            place_obj = Place.objects.get(name=place_name, process=process)
+        except Place.DoesNotExist:
+            raise ValidationError("Takie miejsce nie istnieje")
 
-                    if serial_type and serial_type == "M" and q_code == "12":
-                        product_object.is_mother = True
-                    
-                    if serial_type == 'karton':
-                        product_object.is_mother = True
-
-                    product_object.save()
-                    created_serials.append(serial_number)
-
-                    ProductObjectProcessLog.objects.create(
-                        product_object=product_object,
-                        process=process,
-                        entry_time=timezone.now(),
-                        who_entry=who_entry,
-                        place=place_obj,
-                        movement_type='create'
-                    )
+        full_sns = [obj.get('full_sn') for obj in objects_data]
+        if not all(full_sns):
+            raise ValidationError("Brakuje 'full_sn' w jednym z obiektów.")
 
+        creator = BulkProductObjectCreator(product, process, place_obj, who_entry)
+        if not creator.prepare(full_sns):
+            return Response(
+                {"error": "Nie dodano obiektów - popraw błędne SN.", "results": creator.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            created = creator.save()
         except IntegrityError as e:
             if "unique" in str(e).lower():
                 raise ValidationError({"error": "Jeden z obiektów już istnieje"})
             raise ValidationError("Błąd podczas zapisu")
 
-        return Response({"message": "Dodano obiekty", "serials": created_serials}, status=status.HTTP_201_CREATED)
+        return Response(
+            {"message": "Dodano obiekty", "serials": [product_object.serial_number for product_object in created]},
+            status=status.HTTP_201_CREATED
+        )
 
             
 class BulkProductObjectCreateAndAddMotherView(APIView):
@@ -909,85 +890,67 @@ class BulkProductObjectCreateAndAddMotherView(APIView):
 
         product = get_object_or_404(Product, pk=product_id)
         process = get_object_or_404(ProductProcess, pk=process_uuid)
-        mother = get_object_or_404(ProductObject, full_sn=mother_sn, is_mother=True)
-
-        place_name = mother.current_place.name if mother.current_place else None
+        mother = get_object_or_404(ProductObject.objects.select_related('current_place'), full_sn=mother_sn, is_mother=True)
 
         if not process.starts:
             raise ValidationError("To nie jest process startowy")
 
-        try:
-            with transaction.atomic():
-                if place_name and mother.current_place:
-                    try:
-                        place_obj = Place.objects.get(name=place_name, process=process)
-                    except Place.DoesNotExist:
-                        raise ValidationError("Takie miejsce nie istnieje")
-                else:
-                    place_obj = None
-                created_serials = []
-
-                for obj in objects_data:
-                    full_sn = obj.get('full_sn')
-                    if not full_sn:
-                        raise ValidationError("Brakuje 'full_sn' w jednym z obiektów.")
-
-                    parser_type = detect_parser_type(full_sn)
-                    try:
-                        parser = get_parser(parser_type)
-                        sub_product, serial_number, production_date, expire_date, serial_type, q_code = parser.parse(full_sn)
-                    except ValueError as e:
-                        raise ValidationError(f"Błąd parsowania SN '{full_sn}': {str(e)}")
-
-                    try:
-                        sub_product_obj = SubProduct.objects.get(product=product, name=sub_product)
-                    except SubProduct.DoesNotExist:
-                        raise ValidationError(f"SubProduct '{sub_product}' nie istnieje dla produktu '{product.name}'.")
-                    
-                    existing_children_count = ProductObject.objects.filter(
-                        mother_object=mother,
-                        sub_product=sub_product_obj
-                    ).count()
-
-                    if sub_product_obj.child_limit is not None and existing_children_count >= sub_product_obj.child_limit:
-                        raise ValidationError(
-                            f"Przekroczono limit {sub_product_obj.child_limit} dla SubProduct '{sub_product_obj.name}' (matka {mother.full_sn})."
-                        )
-
-                    product_object = ProductObject(
-                        full_sn=full_sn,
-                        product=product,
-                        sub_product=sub_product_obj,
-                        serial_number=serial_number,
-                        production_date=production_date,
-                        expire_date=expire_date,
-                        current_place=place_obj,
-                        current_process=process,
-                        exp_date_in_process = mother.exp_date_in_process if mother else None,
-                        quranteen_time = mother.quranteen_time if mother else None,
-                        mother_object = mother
-                    )
+        if mother.current_place:
+            try:
+                place_obj = Place.objects.get(name=mother.current_place.name, process=process)
+            except Place.DoesNotExist:
+                raise ValidationError("Takie miejsce nie istnieje")
+        else:
+            place_obj = None
 
-                    product_object.save()
-                    created_serials.append(serial_number)
+        full_sns = [obj.get('full_sn') for obj in objects_data]
+        if not all(full_sns):
+            raise ValidationError("Brakuje 'full_sn' w jednym z obiektów.")
 
-                    ProductObjectProcessLog.objects.create(
-                        product_object=product_object,
-                        process=process,
-                        entry_time=timezone.now(),
-                        who_entry=who_entry,
-                        place=place_obj,
-                        movement_type='create'
+        try:
+            with transaction.atomic():
+                creator = BulkChildObjectCreator(product, process, place_obj, who_entry, mother)
+                if not creator.prepare(full_sns):
+                    return Response(
+                        {"error": "Nie dodano obiektów - popraw błędne SN.", "results": creator.errors},
+                        status=status.HTTP_400_BAD_REQUEST
                     )
+                created = creator.save()
 
         except IntegrityError as e:
             if "unique" in str(e).lower():
                 raise ValidationError({"error": "Jeden z obiektów już istnieje"})
             raise ValidationError("Błąd podczas zapisu")
 
-        return Response({"message": "Dodano obiekty", "serials": created_serials}, status=status.HTTP_201_CREATED)
+        return Response(
+            {"message": "Dodano obiekty", "serials": [product_object.serial_number for product_object in created]},
+            status=status.HTTP_201_CREATED
+        )
     
 
+class FifoNextToPick(APIView):
+    max_limit = 100
+
+    def get(self, request, process_uuid):
+        sub_product_id = request.query_params.get('sub_product')
+
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({"detail": "Parametr 'limit' musi być liczbą."}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"detail": "Parametr 'limit' musi być większy od zera."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, self.max_limit)
+
+        if sub_product_id is not None and not sub_product_id.isdigit():
+            return Response({"detail": "Parametr 'sub_product' musi być liczbą."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = fifo_queue(process_uuid, sub_product_id=sub_product_id).select_related('sub_product')[:limit]
+        serializer = FifoNextToPickSerializer(queryset, many=True)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class ListGroupsStatuses(ListAPIView):
     serializer_class = PlaceGroupToAppKillSerializer
     queryset = PlaceGroupToAppKill.objects.all()
@@ -1011,21 +974,8 @@ class SubProductsCounter(ListAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Filtruj ProductObject
-        queryset = (
-            ProductObject.objects.filter(
-                product_id=product_id,
-                current_process_id=process_uuid,
-                current_place__isnull=False,
-            )
-            .values("sub_product__name")
-            .annotate(count=Count("id"))
-        )
-
-        result = {}
-        for row in queryset:
-            name = row["sub_product__name"] or "Brak sub produktu"
-            result[name] = row["count"]
+        # Liczniki PlaceOccupancy zamiast grupowania wszystkich obiektów procesu
+        result = sub_product_counts(product_id, process_uuid)
 
         return Response(result, status=status.HTTP_200_OK)
     
@@ -1051,72 +1001,74 @@ class RetoolingView(GenericAPIView):
         if not place:
             raise ValidationError({"error": "Nie znaleziono miejsca dla danego procesu."})
 
-        try:
-            kill_flag = AppToKill.objects.get(line_name=place)
-        except AppToKill.DoesNotExist:
-            raise ValidationErrorWithCode(
-                message="AppKill nie istnieje dla danego miejsca.",
-                code="app_kill_no_exist"
-            )
+        # Flaga kill ustawiana na czas przezbrojenia - przy błędzie zostaje True, przy sukcesie wraca i do bazy nie idzie nic
+        with UnitOfWork() as unit_of_work:
+            try:
+                kill_flag = AppToKill.objects.get(line_name=place)
+            except AppToKill.DoesNotExist:
+                raise ValidationErrorWithCode(
+                    message="AppKill nie istnieje dla danego miejsca.",
+                    code="app_kill_no_exist"
+                )
 
-        kill_flag.killing_flag = True
-        kill_flag.save()
+            unit_of_work.update(kill_flag, killing_flag=True)
 
-        if movement_type != "retooling":
-            raise ValidationError({"error": "Nieprawidłowy typ ruchu (oczekiwano 'retooling')."})
+            if movement_type != "retooling":
+                raise ValidationError({"error": "Nieprawidłowy typ ruchu (oczekiwano 'retooling')."})
 
-        if not production_card:
-            raise ValidationError({"error": "Bez karty nie możemy pójść dalej."})
+            if not production_card:
+                raise ValidationError({"error": "Bez karty nie możemy pójść dalej."})
 
-        normalized_names, printer_name = get_printer_info_from_card(production_card)
+            normalized_names, printer_name = get_printer_info_from_card(production_card)
 
-        try:
-            product_object = ProductObject.objects.get(current_process=process, current_place=place)
-        except:
-            raise ValidationError({"error": "Nie można przezbroic bo w środku nie ma pasty"})
+            try:
+                product_object = ProductObject.objects.get(current_process=process, current_place=place)
+            except:
+                raise ValidationError({"error": "Nie można przezbroic bo w środku nie ma pasty"})
         
-        today = timezone.localdate()
-        expiry = product_object.exp_date_in_process or product_object.expire_date
+            today = timezone.localdate()
+            expiry = product_object.exp_date_in_process or product_object.expire_date
 
-        if expiry and expiry < today:
-            raise ValidationError({"error": "Obiekt jest przeterminowany"})
+            if expiry and expiry < today:
+                raise ValidationError({"error": "Obiekt jest przeterminowany"})
 
-        if not product_object.sub_product:
-            raise ValidationError({"error": "Obiekt nie ma przypisanego subproduktu."})
+            if not product_object.sub_product:
+                raise ValidationError({"error": "Obiekt nie ma przypisanego subproduktu."})
 
-        if product_object.sub_product.name not in normalized_names:
-            raise ValidationError({"error": "Nie możesz użyć tego typu pasty dla tego produktu."})
+            if product_object.sub_product.name not in normalized_names:
+                raise ValidationError({"error": "Nie możesz użyć tego typu pasty dla tego produktu."})
         
-        last_production = (
-            LastProductOnPlace.objects
-            .filter(product_process=process, place=place)
-            .order_by('-date')
-            .first()
-        )
-
-        if not last_production:
-            raise ValidationErrorWithCode(
-                message="Brak historii pasty na tym stanowisku.",
-                code="NO_PASTE_HISTORY"
+            last_production = (
+                LastProductOnPlace.objects
+                .filter(product_process=process, place=place)
+                .order_by('-date')
+                .first()
             )
 
-        if last_production.p_type.name != product_object.sub_product.name:
-            raise ValidationError({"error": "Nie możesz użyć tej pasty do tego produktu – ostatnia używana była inna."})
+            if not last_production:
+                raise ValidationErrorWithCode(
+                    message="Brak historii pasty na tym stanowisku.",
+                    code="NO_PASTE_HISTORY"
+                )
+
+            if last_production.p_type.name != product_object.sub_product.name:
+                raise ValidationError({"error": "Nie możesz użyć tej pasty do tego produktu – ostatnia używana była inna."})
 
-        if kill_flag.killing_flag:
-            kill_flag.killing_flag = False
-            kill_flag.save()
+            if kill_flag.killing_flag:
+                unit_of_work.update(kill_flag, killing_flag=False)
+
+            cancel_pending_messages([place.id])
         
-        ProductObjectProcessLog.objects.create(
-            product_object=product_object,
-            process=process,
-            entry_time=timezone.now(),
-            who_entry=who,
-            place=place,
-            movement_type=movement_type
-        )
+            ProductObjectProcessLog.objects.create(
+                product_object=product_object,
+                process=process,
+                entry_time=timezone.now(),
+                who_entry=who,
+                place=place,
+                movement_type=movement_type
+            )
 
-        return Response({"success": "Objekt przezbrojony"}, status=status.HTTP_200_OK)
+            return Response({"success": "Objekt przezbrojony"}, status=status.HTTP_200_OK)
         
 
 class LogFromMistakeData(mixins.ListModelMixin, viewsets.GenericViewSet):
@@ -1128,10 +1080,86 @@ class LogFromMistakeData(mixins.ListModelMixin, viewsets.GenericViewSet):
     ordering_fields = []
 
 
-class UnifyLogsPagination(PageNumberPagination):
+class AdminPagePagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class UnifyLogsPagination(BasePagination):
+    """
+    Stronicowanie po kluczu (date, log_type, id) malejąco. Kursor niesie klucz ostatniego wiersza strony,
+    a granica trafia do każdej gałęzi UNION ALL osobno - dalsze strony kosztują tyle co pierwsza, bez COUNT(*).
+    """
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            date_value, log_type, log_id = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return datetime.fromisoformat(date_value), log_type, int(log_id)
+        except (TypeError, ValueError):
+            raise NotFound("Nieprawidłowy kursor.")
+
+    def encode_cursor(self, row):
+        key = [row['date'].isoformat(), row['log_type'], row['id']]
+        return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+    @staticmethod
+    def after_cursor(queryset, log_type, cursor):
+        # (date, log_type, id) < kursor - log_type jest stały w gałęzi, więc zostaje warunek na date/id
+        cursor_date, cursor_type, cursor_id = cursor
+        if log_type < cursor_type:
+            return queryset.filter(date__lte=cursor_date)
+        if log_type > cursor_type:
+            return queryset.filter(date__lt=cursor_date)
+        return queryset.filter(Q(date__lt=cursor_date) | Q(date=cursor_date, id__lt=cursor_id))
+
+    def paginate_branches(self, branches, request):
+        """
+        branches: lista (log_type, queryset z adnotacją date). Każda gałąź dostaje granicę kursora
+        i własny LIMIT, unia sortuje już tylko po 2 * (page_size + 1) wierszy.
+        """
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        limited = []
+        for log_type, queryset in branches:
+            if cursor:
+                queryset = self.after_cursor(queryset, log_type, cursor)
+            limited.append(queryset.order_by('-date', '-id')[:self.page_size_value + 1])
+
+        union_qs = limited[0].union(*limited[1:], all=True).order_by('-date', '-log_type', '-id')
+        rows = list(union_qs[:self.page_size_value + 1])
+
+        self.has_more = len(rows) > self.page_size_value
+        self.page = rows[:self.page_size_value]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_more:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'has_more': self.has_more,
+            'results': data,
+        })
 
 
 class UnifiedLogsViewSet(viewsets.GenericViewSet):
@@ -1199,41 +1227,16 @@ class UnifiedLogsViewSet(viewsets.GenericViewSet):
             'proc_id', 'proc_label', 'pl_id', 'pl_name', 'info', 'object_id'
         )
 
-        union_qs = mistakes_qs.union(process_qs, all=True)
-        union_qs = union_qs.order_by('-date')
-
-        page = self.paginate_queryset(union_qs)
-        if page is not None:
-            mapped_data = [
-                {
-                    'id': item['id'],
-                    'log_type': item['log_type'],
-                    'date': item['date'],
-                    'who_value': item['who_value'],
-                    'movement': item['movement'],
-                    'info': item['info'],
-                    'proc_id': item['proc_id'],
-                    'proc_label': item['proc_label'],
-                    'pl_id': item['pl_id'],
-                    'pl_name': item['pl_name'],
-                    'info_code': item['info_code'],
-                    'product_object_name': item['product_object_name'],
-                    'object_id': item['object_id']
-                }
-                for item in page
-            ]
-
-            serializer = self.get_serializer(mapped_data, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        return Response(serializer.data)
+        page = self.paginator.paginate_branches([('MISTAKE', mistakes_qs), ('PROCESS', process_qs)], request)
+        serializer = self.get_serializer(page, many=True)
+        return self.paginator.get_paginated_response(serializer.data)
     
 
 class ProductObjectAdminViewSet(viewsets.ModelViewSet):
     serializer_class = ProductObjectAdminSerializer
     queryset = ProductObject.objects.all()
-    pagination_class = UnifyLogsPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = AdminPagePagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, TrigramSearchFilter]
     search_fields = ['full_sn', 'serial_number', 'sito_basic_unnamed_place', 'free_plain_text']
 
     def get_permissions(self):
@@ -1260,7 +1263,7 @@ class ProductObjectAdminViewSet(viewsets.ModelViewSet):
 
 class ProductObjectAdminViewSetProcessHelper(ListAPIView):
     serializer_class = ProductObjectAdminSerializerProcessHelper
-    pagination_class = UnifyLogsPagination
+    pagination_class = AdminPagePagination
     permission_classes = [HasPermCanUpdateAdminPage]
     queryset = ProductProcess.objects.none()
 
@@ -1271,7 +1274,7 @@ class ProductObjectAdminViewSetProcessHelper(ListAPIView):
 
 class ProductObjectAdminViewSetPlaceHelper(ListAPIView):
     serializer_class = ProductObjectAdminSerializerPlaceHelper
-    pagination_class = UnifyLogsPagination
+    pagination_class = AdminPagePagination
     permission_classes = [HasPermCanUpdateAdminPage]
     queryset = Place.objects.none()
 
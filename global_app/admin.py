@@ -3,4 +3,5 @@ from .models import *
 
 
 admin.site.register(MailingGroup)
-admin.site.register(UserToMail)
\ No newline at end of file
+admin.site.register(UserToMail)
+admin.site.register(OutboxMessage)
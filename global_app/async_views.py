@@ -0,0 +1,42 @@
+import json
+
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class MachineAsyncView(View):
+    """
+    Baza dla endpointów odpytywanych bez przerwy przez maszyny. Handlery są async (ORM przez a*-metody),
+    więc pod ASGI (MachineFixture/asgi.py) połączenie nie trzyma wątku przez cały request.
+    APIView z DRF nie obsługuje async - dane parsujemy sami, walidujemy tym samym serializerem DRF
+    (czysty Python, bez bazy), a odpowiedź ma ten sam JSON co wcześniej z Response.
+    """
+    serializer_class = None
+
+    def get_data(self, request):
+        if request.method == 'GET':
+            return request.GET
+        if request.content_type == 'application/json':
+            return json.loads(request.body or b'{}')
+        return request.POST
+
+    def respond(self, payload, status=200):
+        # Jak JSONRenderer z DRF - zwarty JSON, polskie znaki bez escapowania
+        return JsonResponse(payload, status=status, safe=False, json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')})
+
+    def validate(self, request):
+        """
+        Zwraca (validated_data, None) albo (None, odpowiedź 400) - ten sam format błędów co is_valid(raise_exception=True).
+        """
+        try:
+            data = self.get_data(request)
+        except ValueError as e:
+            return None, self.respond({"detail": f"JSON parse error - {e}"}, status=400)
+
+        serializer = self.serializer_class(data=data)
+        if not serializer.is_valid():
+            return None, self.respond(serializer.errors, status=400)
+        return serializer.validated_data, None
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.module_loading import autodiscover_modules
+
+from global_app.outbox import OutboxWorker, OUTBOX_BATCH_SIZE, OUTBOX_WORKERS
+
+
+class Command(BaseCommand):
+    help = "Wysyła zaległe wiadomości z outboxu (poke, maile) z ponowieniami i limitami na cel."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help="Co ile sekund sprawdzać outbox, gdy jest pusty (0 = opróżnij raz i zakończ)."
+        )
+        parser.add_argument('--workers', type=int, default=OUTBOX_WORKERS, help="Rozmiar puli wątków wysyłki.")
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        autodiscover_modules('outbox')
+
+        interval = options['interval']
+        worker = OutboxWorker(workers=options['workers'], batch_size=options['batch_size'])
+
+        try:
+            while True:
+                processed = worker.run_once()
+                if processed:
+                    self.stdout.write(f"Obsłużono {processed} wiadomości.")
+                    continue
+
+                if not interval:
+                    break
+
+                close_old_connections()
+                time.sleep(interval)
+        finally:
+            worker.close()
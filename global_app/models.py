@@ -14,3 +14,48 @@ class UserToMail(models.Model):
 
     def __str__(self):
         return f'{self.mail_group.name} - {self.email}'
+
+
+class OutboxMessage(models.Model):
+    """
+    Efekt uboczny (poke, mail, wywołanie mikroserwisu) zapisany w tej samej transakcji co zmiana biznesowa.
+    Wysyłką zajmuje się drain_outbox - request nie czeka na odbiorcę, a restart workera nic nie gubi.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Oczekuje'),
+        (STATUS_SENDING, 'W wysyłce'),
+        (STATUS_SENT, 'Wysłano'),
+        (STATUS_FAILED, 'Błąd'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    target = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['available_at'],
+                name='idx_outbox_pending',
+                condition=models.Q(status='pending'),
+            ),
+            models.Index(
+                fields=['target', 'locked_until'],
+                name='idx_outbox_sending',
+                condition=models.Q(status='sending'),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} -> {self.target} ({self.status})'
@@ -0,0 +1,225 @@
+import random
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.mail import get_connection, EmailMultiAlternatives
+from django.db import connection, connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import OutboxMessage, UserToMail
+
+
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_WORKERS = 4
+OUTBOX_LEASE = timedelta(minutes=2) # po tym czasie wiadomość "w wysyłce" martwego workera wraca do kolejki
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BACKOFF_BASE = 5 # sekundy, podwajane przy każdej próbie
+OUTBOX_BACKOFF_MAX = 15 * 60
+OUTBOX_DEFAULT_TARGET_LIMIT = 20
+OUTBOX_CLAIM_LOCK = 7_140_015 # klucz pg_advisory_xact_lock - rezerwacje z kilku workerów po kolei, żeby limity celów się zgadzały
+
+EMAIL_KIND = 'email'
+EMAIL_TARGET = 'smtp'
+EMAIL_CHUNK_SIZE = 20
+
+OUTBOX_HANDLERS = {}
+OUTBOX_TARGET_LIMITS = {EMAIL_TARGET: 50}
+
+
+def outbox_handler(kind):
+    """
+    Rejestruje funkcję wysyłającą wiadomości danego rodzaju. Dostaje listę payloadów z jednej paczki
+    i zwraca listę błędów tej samej długości (None = wysłano). Wyjątek oznacza błąd całej paczki.
+    Moduły outbox.py aplikacji są ładowane przez autodiscover w drain_outbox.
+    """
+    def register(func):
+        OUTBOX_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def set_target_limit(target, limit):
+    OUTBOX_TARGET_LIMITS[target] = limit
+
+
+def enqueue(kind, target, payload, delay=None):
+    """
+    Zapisuje efekt uboczny do wysłania. Wołać w tej samej transakcji co zmiana, której dotyczy -
+    wycofanie transakcji wycofuje też wiadomość.
+    """
+    available_at = timezone.now() + (delay or timedelta())
+    return OutboxMessage.objects.create(kind=kind, target=target, payload=payload, available_at=available_at)
+
+
+def backoff(attempts):
+    delay = min(OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX)
+    # Rozrzut, żeby wiadomości z jednej awarii nie wracały wszystkie w tej samej sekundzie
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def claim_batch(batch_size=OUTBOX_BATCH_SIZE, current_time=None):
+    """
+    Rezerwuje paczkę wiadomości do wysłania z poszanowaniem limitów celów (ile może być naraz w wysyłce).
+    Zarezerwowane dostają status "w wysyłce" z dzierżawą - jeśli worker padnie, po OUTBOX_LEASE wracają do kolejki.
+    """
+    current_time = current_time or timezone.now()
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [OUTBOX_CLAIM_LOCK])
+
+        in_flight = dict(
+            OutboxMessage.objects
+            .filter(status=OutboxMessage.STATUS_SENDING, locked_until__gt=current_time)
+            .values('target')
+            .annotate(total=Count('id'))
+            .values_list('target', 'total')
+        )
+
+        candidates = (
+            OutboxMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=OutboxMessage.STATUS_PENDING, available_at__lte=current_time) |
+                Q(status=OutboxMessage.STATUS_SENDING, locked_until__lte=current_time)
+            )
+            .order_by('available_at', 'id')[:batch_size]
+        )
+
+        claimed = []
+        for message in candidates:
+            limit = OUTBOX_TARGET_LIMITS.get(message.target, OUTBOX_DEFAULT_TARGET_LIMIT)
+            if in_flight.get(message.target, 0) >= limit:
+                continue
+            in_flight[message.target] = in_flight.get(message.target, 0) + 1
+            claimed.append(message)
+
+        if claimed:
+            locked_until = current_time + OUTBOX_LEASE
+            OutboxMessage.objects.filter(id__in=[message.id for message in claimed]).update(
+                status=OutboxMessage.STATUS_SENDING, locked_until=locked_until, attempts=F('attempts') + 1
+            )
+            for message in claimed:
+                message.status = OutboxMessage.STATUS_SENDING
+                message.locked_until = locked_until
+                message.attempts += 1
+
+    return claimed
+
+
+def _deliver_group(kind, messages):
+    handler = OUTBOX_HANDLERS.get(kind)
+    if handler is None:
+        return [f"Brak handlera dla rodzaju '{kind}'"] * len(messages)
+
+    try:
+        errors = handler([message.payload for message in messages])
+    except Exception as e:
+        return [str(e) or e.__class__.__name__] * len(messages)
+
+    return [str(error) if error else None for error in errors]
+
+
+def _deliver_group_in_thread(kind, messages):
+    try:
+        return _deliver_group(kind, messages)
+    finally:
+        # Wątek puli mógł otworzyć własne połączenie (np. handler maili czyta odbiorców)
+        connections.close_all()
+
+
+def complete(messages, errors, current_time=None):
+    current_time = current_time or timezone.now()
+
+    sent_ids = [message.id for message, error in zip(messages, errors) if not error]
+    if sent_ids:
+        OutboxMessage.objects.filter(id__in=sent_ids).update(
+            status=OutboxMessage.STATUS_SENT, sent_at=current_time, locked_until=None, last_error=''
+        )
+
+    for message, error in zip(messages, errors):
+        if not error:
+            continue
+
+        if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+            update = {'status': OutboxMessage.STATUS_FAILED}
+        else:
+            update = {'status': OutboxMessage.STATUS_PENDING, 'available_at': current_time + backoff(message.attempts)}
+
+        OutboxMessage.objects.filter(id=message.id).update(locked_until=None, last_error=error, **update)
+
+
+class OutboxWorker:
+    """
+    Opróżnia outbox: rezerwuje paczkę, dzieli ją na grupy (rodzaj, cel) i każdą grupę wysyła jednym
+    wywołaniem handlera w ograniczonej puli wątków. workers=1 wysyła w bieżącym wątku.
+    """
+    def __init__(self, workers=OUTBOX_WORKERS, batch_size=OUTBOX_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def run_once(self, current_time=None):
+        claimed = claim_batch(self.batch_size, current_time)
+        if not claimed:
+            return 0
+
+        groups = defaultdict(list)
+        for message in claimed:
+            groups[(message.kind, message.target)].append(message)
+
+        if self.executor:
+            futures = [
+                (messages, self.executor.submit(_deliver_group_in_thread, kind, messages))
+                for (kind, target), messages in groups.items()
+            ]
+            results = [(messages, future.result()) for messages, future in futures]
+        else:
+            results = [(messages, _deliver_group(kind, messages)) for (kind, target), messages in groups.items()]
+
+        for messages, errors in results:
+            complete(messages, errors)
+
+        return len(claimed)
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown(wait=True)
+
+
+@outbox_handler(EMAIL_KIND)
+def deliver_emails(payloads):
+    # Jedno połączenie SMTP na całą paczkę zamiast wątku i połączenia na każdy mail
+    mail_connection = get_connection()
+    mail_connection.open()
+
+    errors = []
+    try:
+        for payload in payloads:
+            emails = UserToMail.objects.filter(
+                mail_group__name=payload['group_name']
+            ).values_list('email', flat=True)
+
+            messages = [
+                EmailMultiAlternatives(
+                    subject=payload['subject'],
+                    body=payload['body'],
+                    from_email=payload.get('from_email', 'spea_card@biton.pl'),
+                    to=[email],
+                    connection=mail_connection
+                )
+                for email in emails
+            ]
+
+            try:
+                for start in range(0, len(messages), EMAIL_CHUNK_SIZE):
+                    mail_connection.send_messages(messages[start:start + EMAIL_CHUNK_SIZE])
+            except Exception as e:
+                errors.append(str(e) or e.__class__.__name__)
+            else:
+                errors.append(None)
+    finally:
+        mail_connection.close()
+
+    return errors
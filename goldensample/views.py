@@ -20,6 +20,8 @@ from datetime import date, timedelta, datetime
 
 import re
 
+from global_app.async_views import MachineAsyncView
+
 class MasterSampleCheckView(GenericAPIView):
     serializer_class = MasterSampleCheckSerializer
 
@@ -234,21 +236,22 @@ class MasterSampleRetrieveUpdateView(RetrieveUpdateDestroyAPIView):
         return Response(MasterSampleSerializerList(instance).data)
     
 
-class MachineTimeStampView(GenericAPIView):
+class MachineTimeStampView(MachineAsyncView):
     serializer_class = MachineTimeStampSerializer
 
-    def post(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        machine_name = serializer.validated_data['machine_name']
+    async def post(self, request, *args, **kwargs):
+        data, error = self.validate(request)
+        if error:
+            return error
+        machine_name = data['machine_name']
 
-        machine, created = MachineGoldensTime.objects.get_or_create(
+        machine, created = await MachineGoldensTime.objects.aget_or_create(
             machine_name=machine_name,
             defaults={'date_time': timezone.now()},
         )
         
         if created:
-            return Response(
+            return self.respond(
                 {"returnCodeDescription": "Machine Valid",
                  "returnCode": 200},
                 status=status.HTTP_200_OK
@@ -257,13 +260,13 @@ class MachineTimeStampView(GenericAPIView):
         time_diff = timezone.now() - machine.date_time
 
         if time_diff > timedelta(hours=8):
-            return Response(
+            return self.respond(
                 {"returnCodeDescription": "Machine Block",
                  "returnCode": 123},
                 status=status.HTTP_200_OK
             )
         
-        return Response(
+        return self.respond(
                 {"returnCodeDescription": "Machine Valid",
                  "returnCode": 200},
                 status=status.HTTP_200_OK
@@ -323,13 +326,13 @@ class ClearSamplesResult(GenericAPIView):
         return Response({"status": "ok"})
 
 
-class CheckGoldensFWK(GenericAPIView):
+class CheckGoldensFWK(MachineAsyncView):
     serializer_class = CheckMasterSampleFWK
 
-    def post(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        data = serializer.validated_data
+    async def post(self, request, *args, **kwargs):
+        data, error = self.validate(request)
+        if error:
+            return error
 
         sn = data['sn']
         result = data['result']
@@ -339,60 +342,60 @@ class CheckGoldensFWK(GenericAPIView):
         
         valid_results = ("pass", "fail", None, "")
         if result not in valid_results:
-            return Response(
+            return self.respond(
                 {"comment": "result must be 'pass' or 'fail' (or omitted).", "result": False},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        timer_obj, _ = EndCodeTimeFWK.objects.get_or_create(machine_id=machine, site=site, endcode=internal_code)
+        timer_obj, _ = await EndCodeTimeFWK.objects.aget_or_create(machine_id=machine, site=site, endcode=internal_code)
 
         try:
-            temp_set = TempMasterShow.objects.get(machine_id=machine, site=site, if_set=True)
-            master = MasterSample.objects.select_related('master_type').filter(sn=temp_set.sn).first()
-            last = LastResultFWK.objects.filter(machine_id=machine, site=site).order_by('-date_time_tested').first()
+            temp_set = await TempMasterShow.objects.aget(machine_id=machine, site=site, if_set=True)
+            master = await MasterSample.objects.select_related('master_type').filter(sn=temp_set.sn).afirst()
+            last = await LastResultFWK.objects.filter(machine_id=machine, site=site).order_by('-date_time_tested').afirst()
 
             # Backtaking logic:
             # Master verifies previous test -> compare current master result type with previous test result
             if master and last and master.master_type.compute_name.lower() == result:
-                check, _ = TempCheckMasterFWK.objects.get_or_create(machine_id=machine, site=site)
+                check, _ = await TempCheckMasterFWK.objects.aget_or_create(machine_id=machine, site=site)
                 mt = master.master_type.compute_name.lower()
                 if mt == 'pass':
                     check.pass_res = True
                 elif mt == 'fail':
                     check.fail_res = True
-                check.save()
+                await check.asave()
 
                 if check.pass_res and check.fail_res:
                     timer_obj.last_good_tested = timezone.now()
-                    timer_obj.save()
+                    await timer_obj.asave()
 
                     check.pass_res = False
                     check.fail_res = False
-                    check.save()
+                    await check.asave()
                     temp_set.if_set = False
-                    temp_set.save()
+                    await temp_set.asave()
 
         except TempMasterShow.DoesNotExist:
             pass
         
-        master_for_sn = MasterSample.objects.filter(sn=sn).first()
+        master_for_sn = await MasterSample.objects.filter(sn=sn).afirst()
         if master_for_sn:
-            has_code = master_for_sn.endcodes.filter(code=internal_code).exists()
+            has_code = await master_for_sn.endcodes.filter(code=internal_code).aexists()
 
             if has_code:
-                temp_obj, _ = TempMasterShow.objects.get_or_create(machine_id=machine, site=site)
+                temp_obj, _ = await TempMasterShow.objects.aget_or_create(machine_id=machine, site=site)
                 temp_obj.if_set = True
                 temp_obj.sn = sn
-                temp_obj.save()
+                await temp_obj.asave()
         if not master_for_sn:
             try:
-                temp_obj_non = TempMasterShow.objects.get(machine_id=machine, site=site)
+                temp_obj_non = await TempMasterShow.objects.aget(machine_id=machine, site=site)
                 temp_obj_non.if_set = False
-                temp_obj_non.save()
-            except:
+                await temp_obj_non.asave()
+            except Exception:
                 ...
 
-        LastResultFWK.objects.create(
+        await LastResultFWK.objects.acreate(
             sn=sn,
             result=result.lower() if result else None,
             machine_id=machine,
@@ -405,7 +408,7 @@ class CheckGoldensFWK(GenericAPIView):
                 machine_id = match.group(1)
 
                 if machine_id != str(machine):
-                    return Response(
+                    return self.respond(
                         {
                             "comment": f"Ten wzorzec nie moze byc testowany na tej maszynie",
                             "result": False
@@ -413,30 +416,30 @@ class CheckGoldensFWK(GenericAPIView):
                         status=status.HTTP_200_OK
                     )
                 
-            return Response({"comment": "Testujesz Wzorca",
+            return self.respond({"comment": "Testujesz Wzorca",
                              "result": True}, status=status.HTTP_200_OK)
 
         last_good = getattr(timer_obj, 'last_good_tested', None)
         last_endcode = getattr(timer_obj, 'endcode', None)
 
         if not result:
-            return Response({"comment": "To pierwszy cykl testowy i nalezy przetestowac wzorce",
+            return self.respond({"comment": "To pierwszy cykl testowy i nalezy przetestowac wzorce",
                             "result": False}, status=status.HTTP_200_OK)
 
         if not last_good:
-            return Response({"comment": "Nalezy przetestowac wzorce [minelo wiecej niz 8godzin]",
+            return self.respond({"comment": "Nalezy przetestowac wzorce [minelo wiecej niz 8godzin]",
                              "result": False}, status=status.HTTP_200_OK)
         
         if not last_endcode or last_endcode != internal_code:
-            return Response({"comment": "Nalezy przetestowac wzorce [zmiana 'internal code']",
+            return self.respond({"comment": "Nalezy przetestowac wzorce [zmiana 'internal code']",
                             "result": False}, status=status.HTTP_200_OK)
 
         time_diff = timezone.now() - last_good
         if time_diff > timedelta(hours=8):
-            return Response({"comment": "Nalezy przetestowac wzorce [minelo wiecej niz 8godzin]",
+            return self.respond({"comment": "Nalezy przetestowac wzorce [minelo wiecej niz 8godzin]",
                              "result": False}, status=status.HTTP_200_OK)
         
-        return Response({"comment": "Pass",
+        return self.respond({"comment": "Pass",
                         "result": True}, status=status.HTTP_200_OK)
     
 
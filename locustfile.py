@@ -1,3 +1,13 @@
+"""
+Obciążenie endpointów odpytywanych przez maszyny - porównanie WSGI i ASGI na tych samych danych:
+
+    gunicorn MachineFixture.wsgi:application -w 4
+    gunicorn MachineFixture.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+    locust --headless -u 1000 -r 100 -t 60s -H http://127.0.0.1:8000
+
+Dane: grupa "SMT 11", fixture "ICT-7" (z licznikiem), dowolne machine_name / machine_id.
+"""
 from locust import HttpUser, task, between
 
 class KillAppUser(HttpUser):
@@ -10,3 +20,31 @@ class KillAppUser(HttpUser):
             params={"group": "SMT 11"},
             name="kill-app?group=SMT 11"
         )
+
+
+class MachineUser(HttpUser):
+    wait_time = between(0.1, 0.5)
+
+    @task(3)
+    def machine_validation(self):
+        self.client.post(
+            "/api/golden-samples/machine_validation/",
+            json={"machine_name": "FWK-LOCUST"},
+            name="machine_validation"
+        )
+
+    @task(3)
+    def cycles_limit(self):
+        self.client.post(
+            "/api/machine-cycles-limit-exceeded/",
+            json={"fixture_name": "ICT-7"},
+            name="machine-cycles-limit-exceeded"
+        )
+
+    @task(1)
+    def check_goldens(self):
+        self.client.post(
+            "/api/golden-samples/mastersample/fwk/check/",
+            json={"sn": "PCB-LOCUST", "site": 1, "machine_id": "FWK-LOCUST", "internal_code": "A1", "result": "pass"},
+            name="mastersample/fwk/check"
+        )
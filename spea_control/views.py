@@ -1,4 +1,5 @@
 from django.shortcuts import render, get_object_or_404
+from django.db import transaction
 from django.db.models import OuterRef, Subquery, FileField
 from rest_framework import viewsets, status, generics
 from rest_framework.generics import GenericAPIView
@@ -11,7 +12,7 @@ from .serializers import SpeaCardSerializer, DiagnosisFileSerializer, SpeaCardLo
 from .models import SpeaCard, LocationSpea, DiagnosisFile
 from .filters import SpeaCardFilter
 from .utils import create_log_to_spea
-from global_app.utils import send_mass_email_threaded
+from global_app.utils import send_mass_email
 
 
 class SpeaCardViewSet(viewsets.ModelViewSet):
@@ -41,11 +42,12 @@ class SpeaCardViewSet(viewsets.ModelViewSet):
         if spea_card.is_broken:
             return Response({"error": "Spea Card is already broken"}, status=status.HTTP_400_BAD_REQUEST)
         
-        spea_card.is_broken = True
-        spea_card.save(update_fields=["is_broken"])
+        with transaction.atomic():
+            spea_card.is_broken = True
+            spea_card.save(update_fields=["is_broken"])
 
-        create_log_to_spea(spea_card, 'Set_Bad')
-        send_mass_email_threaded('SpeaGroup', 'Ustawienie nowej karty na uszkodzoną', f'{spea_card.sn} Została oznaczona jako uszkodzona')
+            create_log_to_spea(spea_card, 'Set_Bad')
+            send_mass_email('SpeaGroup', 'Ustawienie nowej karty na uszkodzoną', f'{spea_card.sn} Została oznaczona jako uszkodzona')
 
         return Response({"success": "Success"}, status=status.HTTP_200_OK)
 
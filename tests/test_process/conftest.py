@@ -1,5 +1,7 @@
 import pytest
+from django.core.cache import cache
 from rest_framework.test import APIClient
+from checkprocess.services.error_log_writer import get_error_log_writer
 from pytest_factoryboy import register
 from .factories import ProductFactory, ProductProcessFactory, PlaceProcessFactory, SubProductFactory, ProductObjectFactory, EdgeFactory
 
@@ -13,4 +15,20 @@ register(EdgeFactory)
 
 @pytest.fixture
 def api_client():
-    return APIClient()
\ No newline at end of file
+    return APIClient()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def error_log_writer(monkeypatch):
+    # W testach logi błędów zapisywane od razu - wątek w tle pisałby poza transakcją testu
+    writer = get_error_log_writer()
+    monkeypatch.setattr(writer, 'flush_interval', 0)
+    monkeypatch.setattr(writer, 'recent', {})
+    return writer
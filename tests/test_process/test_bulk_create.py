@@ -0,0 +1,107 @@
+import pytest
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from checkprocess.models import ProductObject, ProductObjectProcessLog
+from checkprocess.services.bulk_create_service import BulkProductObjectCreator
+
+
+def _alpha_sn(number):
+    return f"[)>@06@1P262298@1T52916365@3SJ{number}@Q500GM000@6D20250702@14D20251229@@"
+
+
+@pytest.fixture
+def start_setup(product_factory, product_process_factory, place_process_factory, sub_product_factory):
+    product = product_factory()
+    process = product_process_factory(product=product, start=True)
+    place = place_process_factory(process=process, name="MAGAZYN")
+    sub_product_factory(product=product, name="Alpha")
+    url = reverse('bulk-product-object-create', args=[product.id, process.id])
+    return url, place
+
+
+@pytest.mark.django_db
+def test_pallet_is_created_with_constant_queries(api_client, start_setup, django_assert_max_num_queries):
+    url, place = start_setup
+    payload = {"place_name": "MAGAZYN", "who_entry": "51123", "objects": [{"full_sn": _alpha_sn(1000 + i)} for i in range(200)]}
+
+    with django_assert_max_num_queries(12):
+        response = api_client.post(url, payload, format="json")
+
+    assert response.status_code == 201
+    assert len(response.data["serials"]) == 200
+    assert ProductObject.objects.filter(current_place=place).count() == 200
+    assert ProductObjectProcessLog.objects.filter(movement_type="create").count() == 200
+
+
+class _PastDeadlineCreator(BulkProductObjectCreator):
+    def build_object(self, full_sn, *args):
+        product_object = super().build_object(full_sn, *args)
+        if full_sn == _alpha_sn(1):
+            product_object.max_in_process = timezone.now() - timedelta(minutes=1)
+        return product_object
+
+
+@pytest.mark.django_db
+def test_bulk_insert_sets_expiry_flag_like_save(start_setup):
+    url, place = start_setup
+    creator = _PastDeadlineCreator(place.process.product, place.process, place, "51123")
+    assert creator.prepare([_alpha_sn(1), _alpha_sn(2)])
+
+    creator.save()
+
+    assert ProductObject.objects.get(full_sn=_alpha_sn(1)).expired_at is not None
+    assert ProductObject.objects.get(full_sn=_alpha_sn(2)).expired_at is None
+
+
+@pytest.mark.django_db
+def test_errors_are_reported_per_item(api_client, start_setup, product_object_factory):
+    url, place = start_setup
+    product_object_factory(product=place.process.product, sub_product=None, full_sn=_alpha_sn(1))
+    payload = {"place_name": "MAGAZYN", "who_entry": "51123",
+               "objects": [{"full_sn": _alpha_sn(1)}, {"full_sn": _alpha_sn(2)}, {"full_sn": "[)>@06@@"}]}
+
+    response = api_client.post(url, payload, format="json")
+
+    assert response.status_code == 400
+    assert [item["code"] for item in response.data["results"]] == ["object_already_exists", "parse_error"]
+    assert not ProductObject.objects.filter(full_sn=_alpha_sn(2)).exists()
+
+
+@pytest.mark.django_db
+def test_carton_limit_is_checked_once_for_the_whole_batch(api_client, start_setup, product_object_factory, django_assert_max_num_queries):
+    url, place = start_setup
+    product = place.process.product
+    alpha = product.subproduct.get(name="Alpha")
+    alpha.child_limit = 5
+    alpha.save()
+    mother = product_object_factory(product=product, sub_product=alpha, current_place=place, full_sn="CARTON-9", is_mother=True)
+    product_object_factory(product=product, sub_product=alpha, full_sn=_alpha_sn(1), mother_object=mother)
+
+    url = reverse('bulk-product-object-create-to-mother', args=[product.id, place.process.id])
+    payload = {"who_entry": "51123", "mother_sn": "CARTON-9", "objects": [{"full_sn": _alpha_sn(10 + i)} for i in range(4)]}
+    with django_assert_max_num_queries(16):
+        response = api_client.post(url, payload, format="json")
+    assert response.status_code == 201
+    assert mother.child_object.count() == 5
+
+    payload["objects"] = [{"full_sn": _alpha_sn(20)}]
+    response = api_client.post(url, payload, format="json")
+    assert response.status_code == 400
+    assert response.data["results"][0]["code"] == "child_limit_exceeded"
+
+
+@pytest.mark.django_db
+def test_children_inherit_expired_deadline_of_mother(api_client, start_setup, product_object_factory):
+    url, place = start_setup
+    product = place.process.product
+    mother = product_object_factory(product=product, sub_product=product.subproduct.get(name="Alpha"), current_place=place,
+                                    full_sn="CARTON-OLD", is_mother=True)
+    ProductObject.objects.filter(pk=mother.pk).update(exp_date_in_process=timezone.localdate() - timedelta(days=1))
+
+    url = reverse('bulk-product-object-create-to-mother', args=[product.id, place.process.id])
+    payload = {"who_entry": "51123", "mother_sn": "CARTON-OLD", "objects": [{"full_sn": _alpha_sn(20)}, {"full_sn": _alpha_sn(21)}]}
+    response = api_client.post(url, payload, format="json")
+
+    assert response.status_code == 201
+    assert ProductObject.objects.filter(mother_object=mother, expired_at__isnull=False).count() == 2
@@ -0,0 +1,112 @@
+import pytest
+from datetime import timedelta
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from checkprocess.models import LogFromMistake
+from checkprocess.services.error_log_writer import ErrorLogWriter
+
+
+def _log(full_sn="SN-1", code="wrong_place", place_name="P1", created_at=None):
+    return LogFromMistake(
+        product_sn=full_sn, error_code=code, error_message="Błąd", place_name_raw=place_name,
+        created_at=created_at or timezone.now()
+    )
+
+
+@pytest.mark.django_db
+def test_logs_are_buffered_and_flushed_in_one_batch():
+    writer = ErrorLogWriter(flush_interval=60, collapse_window=0)
+    writer.start = lambda: None  # bez wątku - flush wołany ręcznie
+
+    writer.add(*[_log(full_sn=f"SN-{i}") for i in range(50)])
+    assert not LogFromMistake.objects.exists()
+
+    # Poza INSERT-em tylko savepoint, który w teście otacza zapis
+    with CaptureQueriesContext(connection) as queries:
+        writer.flush()
+    assert [query["sql"].split()[0] for query in queries].count("INSERT") == 1
+    assert LogFromMistake.objects.count() == 50
+
+
+@pytest.mark.django_db
+def test_full_queue_writes_in_caller():
+    writer = ErrorLogWriter(flush_interval=60, queue_size=2, collapse_window=0)
+    writer.start = lambda: None
+
+    writer.add(_log(full_sn="A"), _log(full_sn="B"), _log(full_sn="C"))
+
+    assert list(LogFromMistake.objects.values_list('product_sn', flat=True)) == ["C"]
+    writer.flush()
+    assert LogFromMistake.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_repeated_scan_is_collapsed_into_counter():
+    writer = ErrorLogWriter(flush_interval=0, collapse_window=60)
+    start = timezone.now()
+
+    writer.add(_log(created_at=start), _log(created_at=start + timedelta(seconds=1)))
+    writer.add(_log(created_at=start + timedelta(seconds=5)))
+    writer.add(_log(code="other_error", created_at=start + timedelta(seconds=6)))
+
+    log = LogFromMistake.objects.get(error_code="wrong_place")
+    assert log.repeat_count == 3
+    assert log.last_seen_at == start + timedelta(seconds=5)
+    assert LogFromMistake.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_repeat_outside_window_starts_new_row():
+    writer = ErrorLogWriter(flush_interval=0, collapse_window=60)
+    start = timezone.now()
+
+    writer.add(_log(created_at=start), _log(created_at=start + timedelta(seconds=61)))
+
+    assert LogFromMistake.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_close_flushes_pending_logs():
+    writer = ErrorLogWriter(flush_interval=60, collapse_window=0)
+    writer.start = lambda: None
+    writer.add(_log())
+
+    writer.close()
+    assert LogFromMistake.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rejected_row_does_not_take_the_batch_with_it(place_process_factory):
+    writer = ErrorLogWriter(flush_interval=60, collapse_window=0)
+    writer.start = lambda: None
+    deleted_place = place_process_factory()
+    orphan = _log(full_sn="B")
+    orphan.place_id = deleted_place.id
+    deleted_place.delete()
+
+    writer.add(_log(full_sn="A"), orphan, _log(full_sn="C"))
+    writer.flush()
+
+    assert sorted(LogFromMistake.objects.values_list('product_sn', flat=True)) == ["A", "C"]
+    assert writer.queue.empty()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_logs_wait_in_queue_while_database_is_down(monkeypatch):
+    writer = ErrorLogWriter(flush_interval=60, batch_size=2, collapse_window=0)
+    writer.start = lambda: None
+    writer.add(*[_log(full_sn=f"SN-{i}") for i in range(5)])
+
+    def database_down(*args, **kwargs):
+        raise OperationalError("server closed the connection unexpectedly")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(LogFromMistake.objects, "bulk_create", database_down)
+        writer.flush()
+
+    assert not LogFromMistake.objects.exists()
+    assert writer.queue.qsize() == 5
+
+    writer.flush()
+    assert LogFromMistake.objects.count() == 5
@@ -0,0 +1,53 @@
+import importlib
+import pytest
+from datetime import timedelta
+from django.apps import apps
+from django.core.management import call_command
+from django.utils import timezone
+from checkprocess.models import ProductObject
+from checkprocess.services.movement_service import MovementHandler
+
+
+@pytest.mark.django_db
+def test_sweeper_marks_only_objects_past_deadline(product_factory, place_process_factory, product_object_factory):
+    product = product_factory()
+    place = place_process_factory()
+    now = timezone.now()
+
+    product_object_factory(product=product, sub_product=None, current_place=place, full_sn="OLD", max_in_process=now + timedelta(seconds=1))
+    product_object_factory(product=product, sub_product=None, current_place=place, full_sn="FRESH", max_in_process=now + timedelta(days=1))
+    ProductObject.objects.filter(full_sn="OLD").update(max_in_process=now - timedelta(minutes=1))
+
+    call_command("sweep_expired")
+
+    assert list(ProductObject.objects.filter(expired_at__isnull=False).values_list("full_sn", flat=True)) == ["OLD"]
+
+
+@pytest.mark.django_db
+def test_receive_clears_flag_when_deadline_is_renewed(product_factory, product_process_factory, place_process_factory, product_object_factory):
+    product = product_factory()
+    process = product_process_factory(product=product, normal=True)
+    place = place_process_factory(process=process)
+    obj = product_object_factory(product=product, sub_product=None, current_process=process, current_place=place,
+                                 full_sn="RENEW", max_in_process=timezone.now() - timedelta(hours=1))
+    assert obj.expired_at is not None
+
+    MovementHandler.get_handler('receive', obj, place, process, '51123').execute()
+
+    obj.refresh_from_db()
+    assert obj.expired_at is None
+
+
+@pytest.mark.django_db
+def test_migration_backfills_objects_expired_before_it(product_factory, place_process_factory, product_object_factory):
+    product = product_factory()
+    place = place_process_factory()
+    now = timezone.now()
+    product_object_factory(product=product, sub_product=None, current_place=place, full_sn="OLD", max_in_process=now - timedelta(hours=1))
+    product_object_factory(product=product, sub_product=None, current_place=place, full_sn="FRESH", max_in_process=now + timedelta(days=1))
+    ProductObject.objects.update(expired_at=None)
+
+    migration = importlib.import_module("checkprocess.migrations.0067_productobject_expired_at")
+    migration.fill_expired_at(apps, None)
+
+    assert list(ProductObject.objects.filter(expired_at__isnull=False).values_list("full_sn", flat=True)) == ["OLD"]
@@ -0,0 +1,55 @@
+import pytest
+from datetime import date
+from django.urls import reverse
+from checkprocess.utils import check_fifo_violation
+
+
+def _process_with_objects(product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory, exp_dates):
+    product = product_factory()
+    process = product_process_factory(product=product, normal=True, respect_fifo_rules=True)
+    place = place_process_factory(process=process)
+    sub_product = sub_product_factory(product=product)
+
+    objects = [
+        product_object_factory(product=product, sub_product=sub_product, current_process=process, current_place=place,
+                               full_sn=f"FIFO-{i}", serial_number=f"FIFO-{i}", exp_date_in_process=exp_date)
+        for i, exp_date in enumerate(exp_dates)
+    ]
+    return process, sub_product, objects
+
+
+@pytest.mark.django_db
+def test_fifo_violation_points_to_oldest(product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory):
+    process, sub_product, objects = _process_with_objects(
+        product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory,
+        [date(2030, 1, 3), date(2030, 1, 1), date(2030, 1, 2)]
+    )
+
+    violation = check_fifo_violation(objects[0])
+
+    assert violation["serial_number"] == "FIFO-1"
+    assert check_fifo_violation(objects[1]) is None
+
+
+@pytest.mark.django_db
+def test_next_to_pick_returns_fifo_order(api_client, product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory):
+    process, sub_product, objects = _process_with_objects(
+        product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory,
+        [date(2030, 1, 3), None, date(2030, 1, 1)]
+    )
+
+    url = reverse('fifo-next-to-pick', args=[process.id])
+    response = api_client.get(url, {"sub_product": sub_product.id, "limit": 2})
+
+    assert response.status_code == 200
+    assert [row["full_sn"] for row in response.data] == ["FIFO-2", "FIFO-0"]
+
+
+@pytest.mark.django_db
+def test_next_to_pick_rejects_bad_parameters(api_client, product_process_factory):
+    url = reverse('fifo-next-to-pick', args=[product_process_factory(normal=True).id])
+
+    for params in ({"limit": -1}, {"limit": 0}, {"limit": "abc"}, {"sub_product": "x"}):
+        assert api_client.get(url, params).status_code == 400, params
+    # process_uuid przechodzi przez konwerter <uuid:> - zły format to 404, nie 500
+    assert api_client.get("/api/process/fifo/next-to-pick/not-a-uuid/").status_code == 404
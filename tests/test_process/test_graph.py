@@ -0,0 +1,46 @@
+import pytest
+from checkprocess.services.graph_service import get_process_graph
+
+
+@pytest.mark.django_db
+def test_graph_contains_edges_and_condition_nodes(product_factory, product_process_factory, edge_factory):
+    product = product_factory()
+    process_source = product_process_factory(product=product, condition=True)
+    process_target = product_process_factory(product=product, normal=True, cond_path=True)
+    edge_factory(source=process_source, target=process_target)
+
+    graph = get_process_graph(product.id)
+
+    assert graph.has_edge(process_source.id, process_target.id)
+    assert not graph.has_edge(process_target.id, process_source.id)
+    assert graph.is_condition(process_source.id)
+    assert not graph.is_condition(process_target.id)
+    assert graph.node(process_target.id)['cond_path'] is True
+
+
+@pytest.mark.django_db
+def test_graph_served_from_cache_without_queries(product_factory, product_process_factory, edge_factory, django_assert_num_queries):
+    product = product_factory()
+    process_source = product_process_factory(product=product, start=True)
+    process_target = product_process_factory(product=product, normal=True)
+    edge_factory(source=process_source, target=process_target)
+
+    get_process_graph(product.id)
+
+    with django_assert_num_queries(0):
+        graph = get_process_graph(product.id)
+        assert graph.has_edge(process_source.id, process_target.id)
+
+
+@pytest.mark.django_db
+def test_graph_rebuilt_after_edge_change(product_factory, product_process_factory, edge_factory, django_capture_on_commit_callbacks):
+    product = product_factory()
+    process_source = product_process_factory(product=product, start=True)
+    process_target = product_process_factory(product=product, normal=True)
+
+    assert not get_process_graph(product.id).has_edge(process_source.id, process_target.id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        edge_factory(source=process_source, target=process_target)
+
+    assert get_process_graph(product.id).has_edge(process_source.id, process_target.id)
@@ -0,0 +1,30 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from checkprocess.models import PlaceGroupToAppKill
+from checkprocess.serializers import PlaceGroupToAppKillSerializer
+from checkprocess.services.heartbeat_service import record_heartbeat
+
+
+@pytest.mark.django_db
+def test_heartbeat_flushes_once_per_interval(django_assert_num_queries):
+    stale = timezone.now() - timedelta(hours=1)
+    group = PlaceGroupToAppKill.objects.create(name="SMT 12", last_check=stale)
+
+    with django_assert_num_queries(1):
+        for _ in range(20):
+            record_heartbeat(group.id)
+
+    group.refresh_from_db()
+    assert group.last_check > stale
+
+
+@pytest.mark.django_db
+def test_status_uses_fresh_heartbeat():
+    group = PlaceGroupToAppKill.objects.create(name="SMT 13", last_check=timezone.now() - timedelta(hours=1))
+    assert PlaceGroupToAppKillSerializer(group).data["status"] is False
+
+    record_heartbeat(group.id)
+
+    # Obiekt z pamięci nadal ma stary last_check - status bierze świeży sygnał z cache
+    assert PlaceGroupToAppKillSerializer(group).data["status"] is True
@@ -0,0 +1,99 @@
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import cache
+from checkprocess.models import LogFromMistake, ProductObjectProcessLog
+from checkprocess.services.idempotency import SCAN_IN_PROGRESS, scan_fingerprint, scan_key
+
+
+@pytest.fixture
+def receive_setup(product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory):
+    product = product_factory()
+    process_source = product_process_factory(product=product, start=True)
+    process_target = product_process_factory(product=product, normal=True)
+    place = place_process_factory(process=process_target)
+    edge_factory(source=process_source, target=process_target)
+    product_object_factory(product=product, sub_product=sub_product_factory(product=product), current_process=process_source, full_sn="PASTE-IDEM")
+    return process_target, place
+
+
+def _move(api_client, process, payload, **headers):
+    return api_client.post(f"/api/process/product-object/move/{process.id}/", payload, format="json", headers=headers)
+
+
+@pytest.mark.django_db
+def test_repeated_scan_replays_first_response(api_client, receive_setup, django_assert_num_queries):
+    process, place = receive_setup
+    payload = {"full_sn": "PASTE-IDEM", "place_name": place.name, "movement_type": "receive", "who": "51123"}
+
+    first = _move(api_client, process, payload)
+    with django_assert_num_queries(0):
+        second = _move(api_client, process, payload)
+
+    assert first.status_code == second.status_code == 200
+    assert second.data == first.data
+    assert second["Idempotent-Replayed"] == "true"
+    assert ProductObjectProcessLog.objects.filter(product_object__full_sn="PASTE-IDEM").count() == 1
+
+
+@pytest.mark.django_db
+def test_repeated_failing_scan_logs_mistake_once(api_client, receive_setup):
+    process, place = receive_setup
+    payload = {"full_sn": "NIE-MA-TAKIEGO", "place_name": place.name, "movement_type": "receive", "who": "51123"}
+
+    first = _move(api_client, process, payload)
+    second = _move(api_client, process, payload)
+
+    assert first.status_code == second.status_code == 400
+    assert second.data == first.data
+    assert LogFromMistake.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_idempotency_key_replays_same_body_and_rejects_other_body(api_client, receive_setup):
+    process, place = receive_setup
+    payload = {"full_sn": "PASTE-IDEM", "place_name": place.name, "movement_type": "receive", "who": "51123"}
+
+    first = _move(api_client, process, payload, **{"Idempotency-Key": "scan-1"})
+    retried = _move(api_client, process, payload, **{"Idempotency-Key": "scan-1"})
+    reused = _move(api_client, process, dict(payload, who="51124"), **{"Idempotency-Key": "scan-1"})
+    other = _move(api_client, process, payload, **{"Idempotency-Key": "scan-2"})
+
+    assert first.status_code == 200
+    assert retried.data == first.data and retried["Idempotent-Replayed"] == "true"
+    assert reused.status_code == 422
+    assert reused.data["code"] == "idempotency_key_reused"
+    # Nowy klucz to nowy skan - obiekt jest już przyjęty
+    assert other.status_code == 400
+
+
+def test_concurrent_claim_is_taken_once():
+    key, _ = scan_key("ProductMoveView", "/scan/", {"full_sn": "PASTE-IDEM"})
+    barrier = threading.Barrier(8)
+
+    def claim(worker):
+        barrier.wait()
+        return cache.add(key, (worker, SCAN_IN_PROGRESS))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        claimed = list(executor.map(claim, range(8)))
+
+    assert claimed.count(True) == 1
+    assert cache.get(key) == (claimed.index(True), SCAN_IN_PROGRESS)
+
+
+@pytest.mark.django_db
+def test_scan_in_progress_returns_conflict(api_client, receive_setup, monkeypatch):
+    process, place = receive_setup
+    payload = {"full_sn": "PASTE-IDEM", "place_name": place.name, "movement_type": "receive", "who": "51123"}
+    monkeypatch.setattr("checkprocess.services.idempotency.SCAN_WAIT_TIMEOUT", 0)
+    # Pierwszy skan wciąż w obsłudze
+    path = f"/api/process/product-object/move/{process.id}/"
+    key, _ = scan_key("ProductMoveView", path, payload)
+    cache.add(key, (scan_fingerprint(path, payload), SCAN_IN_PROGRESS))
+
+    response = _move(api_client, process, payload)
+
+    assert response.status_code == 409
+    assert response.data["code"] == "scan_in_progress"
+    assert not ProductObjectProcessLog.objects.exists()
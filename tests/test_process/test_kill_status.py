@@ -0,0 +1,173 @@
+import asyncio
+import pytest
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import connections
+from django.test import AsyncClient
+from django.urls import reverse
+from django.utils import timezone
+from checkprocess.models import PlaceGroupToAppKill, AppToKill, MessageToApp
+from checkprocess.services import kill_service
+from checkprocess.services.kill_service import get_kill_snapshot, KillSnapshot, KILL_SNAPSHOT_GENERATION_KEY
+
+
+@pytest.fixture
+def kill_group(product_factory, product_process_factory, place_process_factory):
+    group = PlaceGroupToAppKill.objects.create(name="SMT 11", last_check=timezone.now())
+    product = product_factory()
+    process = product_process_factory(product=product, normal=True, killing_app=True)
+    place = place_process_factory(process=process, group=group)
+    AppToKill.objects.create(line_name=place, killing_flag=False)
+    return group, product, process, place
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+def _poll(api_client):
+    return api_client.get(reverse('kill-app'), {"group": "SMT 11"})
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cached_poll_is_constant(api_client, kill_group, django_assert_max_num_queries):
+    _poll(api_client)
+
+    with django_assert_max_num_queries(1):
+        response = _poll(api_client)
+
+    assert response.status_code == 200
+    assert response.json()["kill"] is False
+
+
+@pytest.mark.django_db(transaction=True)
+def test_flag_change_and_expired_object_refresh_snapshot(api_client, kill_group, product_object_factory):
+    group, product, process, place = kill_group
+    assert _poll(api_client).json()["kill"] is False
+
+    flag = AppToKill.objects.get(line_name=place)
+    flag.killing_flag = True
+    flag.save()
+    assert _poll(api_client).json()["kill"] is True
+
+    flag.killing_flag = False
+    flag.save()
+    product_object_factory(product=product, sub_product=None, current_process=process, current_place=place,
+                           full_sn="EXP-1", max_in_process=timezone.now() - timedelta(hours=1))
+
+    response = _poll(api_client)
+    assert response.json()["expired"] is True
+    assert response.json()["places_with_expired"] == [place.name]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_due_message_is_sent_once(api_client, kill_group):
+    group, product, process, place = kill_group
+    MessageToApp.objects.create(line=place, message="Zmiana lotu", when_trigger=timezone.now() - timedelta(minutes=1))
+
+    assert _poll(api_client).json()["message"] == "Zmiana lotu"
+    assert _poll(api_client).json()["message"] == ""
+
+
+@pytest.mark.django_db
+def test_snapshot_rebuilds_when_object_expires(kill_group, product_object_factory):
+    group, product, process, place = kill_group
+    current_time = timezone.now()
+    product_object_factory(product=product, sub_product=None, current_process=process, current_place=place,
+                           full_sn="EXP-2", max_in_process=current_time + timedelta(hours=1))
+
+    assert get_kill_snapshot("SMT 11", current_time).expired is False
+    assert get_kill_snapshot("SMT 11", current_time + timedelta(hours=2)).expired is True
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_subscribers_get_only_changes(kill_group, monkeypatch):
+    group, product, process, place = kill_group
+    sent = []
+    monkeypatch.setattr(kill_service, "send_event", lambda channel, event_type, data: sent.append((channel, data)))
+
+    kill_service.mark_kill_stream_alive(group.id)
+    kill_service.publish_kill_status("SMT 11")
+    kill_service.publish_kill_status("SMT 11")
+    assert len(sent) == 1
+
+    flag = AppToKill.objects.get(line_name=place)
+    flag.killing_flag = True
+    flag.save()
+
+    assert len(sent) == 2
+    assert sent[-1][0] == f"kill-group-{group.id}"
+    assert sent[-1][1]["kill"] is True
+
+
+@pytest.mark.django_db(transaction=True)
+def test_snapshot_built_before_commit_is_not_served(kill_group):
+    group, product, process, place = kill_group
+    # Poll odczytał generację i zbudował snapshot, zanim zmiana flagi się zacommitowała
+    key = kill_service._snapshot_key("SMT 11")
+    stale = KillSnapshot.build("SMT 11", timezone.now())
+
+    flag = AppToKill.objects.get(line_name=place)
+    flag.killing_flag = True
+    flag.save()
+    cache.set(key, stale)
+
+    assert get_kill_snapshot("SMT 11").kill is True
+
+
+@pytest.mark.django_db
+def test_lost_generation_does_not_revive_old_snapshots(kill_group):
+    key = kill_service._snapshot_key("SMT 11")
+    kill_service.invalidate_all_kill_snapshots()
+    cache.delete(KILL_SNAPSHOT_GENERATION_KEY)
+
+    assert kill_service._snapshot_key("SMT 11") != key
+
+
+async def _wait_for(received, marker, timeout=10):
+    async def wait():
+        while marker not in received:
+            await asyncio.sleep(0.05)
+    await asyncio.wait_for(wait(), timeout)
+
+
+@pytest.mark.anyio
+@pytest.mark.django_db(transaction=True)
+async def test_stream_sends_initial_state_and_pushed_change(kill_group):
+    group, product, process, place = kill_group
+    response = await AsyncClient().get(reverse('kill-app-stream', args=["SMT 11"]))
+    assert response.status_code == 200
+
+    received = bytearray()
+
+    async def drain():
+        async for chunk in response.streaming_content:
+            received.extend(chunk)
+
+    reader = asyncio.create_task(drain())
+    try:
+        await _wait_for(received, b'"kill": false')
+        await asyncio.sleep(0.5)
+
+        # Zmiana flagi idzie przez send_event -> Redis, jak z innego workera
+        flag = await AppToKill.objects.aget(line_name=place)
+        flag.killing_flag = True
+        await sync_to_async(flag.save)()
+
+        await _wait_for(received, b'"kill": true')
+        assert b'event: kill-status' in received
+    finally:
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        # Połączenie z wątku sync_to_async blokowałoby usunięcie testowej bazy
+        await sync_to_async(connections.close_all)()
+
+
+@pytest.mark.django_db
+def test_stream_is_refused_under_wsgi(api_client, kill_group):
+    response = api_client.get(reverse('kill-app-stream', args=["SMT 11"]))
+
+    assert response.status_code == 501
+    assert response.data["code"] == "asgi_required"
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from checkprocess.models import ProductObjectProcessLog
+from checkprocess.services.log_export import EXPORT_FIELDS
+
+
+URL = "/api/process/product-object-process-logs/all-logs/"
+
+
+@pytest.fixture
+def logs(product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory):
+    product = product_factory()
+    process = product_process_factory(product=product)
+    place = place_process_factory(process=process)
+    sub_product = sub_product_factory(product=product)
+    first = product_object_factory(product=product, sub_product=sub_product, full_sn="SN-EXPORT-1")
+    second = product_object_factory(product=product, sub_product=sub_product, full_sn="SN-EXPORT-2")
+
+    now = timezone.now()
+    for days, product_object in [(0, first), (1, second), (40, first)]:
+        log = ProductObjectProcessLog.objects.create(product_object=product_object, process=process, place=place, movement_type='move')
+        ProductObjectProcessLog.objects.filter(id=log.id).update(entry_time=now - timedelta(days=days))
+    return process, place, now
+
+
+def _content(response):
+    assert response.streaming
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+def test_ndjson_export_streams_filtered_rows(api_client, logs):
+    process, place, now = logs
+
+    response = api_client.get(URL, {"sn": "SN-EXPORT-1", "process": str(process.id), "place": place.id})
+    rows = [json.loads(line) for line in _content(response).splitlines()]
+
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert [row["full_sn"] for row in rows] == ["SN-EXPORT-1", "SN-EXPORT-1"]
+    assert rows[0]["entry_time"] > rows[1]["entry_time"]
+    assert rows[0]["place_name"] == place.name
+    assert list(rows[0]) == EXPORT_FIELDS
+
+
+@pytest.mark.django_db
+def test_csv_export_with_date_range(api_client, logs):
+    process, place, now = logs
+
+    response = api_client.get(URL, {"export_format": "csv", "date_from": (now - timedelta(days=7)).isoformat()})
+    rows = list(csv.reader(io.StringIO(_content(response))))
+
+    assert rows[0] == EXPORT_FIELDS
+    assert sorted(row[3] for row in rows[1:]) == ["SN-EXPORT-1", "SN-EXPORT-2"]
+
+
+@pytest.mark.django_db
+def test_unknown_export_format_is_rejected(api_client):
+    assert api_client.get(URL, {"export_format": "xml"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_invalid_date_range_is_rejected(api_client):
+    response = api_client.get(URL, {"date_from": "wczoraj"})
+
+    assert response.status_code == 400
+    assert "date_from" in response.data
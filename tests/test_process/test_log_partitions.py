@@ -0,0 +1,166 @@
+import gzip
+import importlib
+import pytest
+from django.apps import apps
+from datetime import timedelta
+from django.db import connection
+from django.utils import timezone
+from checkprocess.models import ProductObject, ProductObjectProcessLog
+from checkprocess.services.log_partitions import (ensure_partitions, archive_partitions, existing_partitions,
+                                                  is_partitioned, month_start, add_months, partition_name, DEFAULT_PARTITION)
+
+
+def _count(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {table}")
+        return cursor.fetchone()[0]
+
+
+@pytest.fixture
+def logged_object(product_factory, sub_product_factory, product_object_factory):
+    product = product_factory()
+    return product_object_factory(product=product, sub_product=sub_product_factory(product=product))
+
+
+migration = importlib.import_module("checkprocess.migrations.0069_partition_process_log")
+
+
+def _run(operation):
+    # Baza testowa powstaje bez migracji (--nomigrations) - konwersję uruchamiamy wprost z 0069
+    with connection.schema_editor() as schema_editor:
+        operation(apps, schema_editor)
+
+
+def _primary_key():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'",
+                       [ProductObjectProcessLog._meta.db_table])
+        return cursor.fetchone()[0]
+
+
+def _log_at(product_object, entry_time):
+    log = ProductObjectProcessLog.objects.create(product_object=product_object, movement_type='move')
+    ProductObjectProcessLog.objects.filter(id=log.id).update(entry_time=entry_time)
+    return log
+
+
+@pytest.mark.django_db
+def test_conversion_keeps_rows_and_prunes_recent_queries(logged_object):
+    product_object = logged_object
+    now = timezone.now()
+    old_month = month_start(now - timedelta(days=90))
+    old_log = _log_at(product_object, now - timedelta(days=90))
+    new_log = _log_at(product_object, now)
+
+    _run(migration.partition_process_log)
+
+    assert is_partitioned()
+    months = existing_partitions()
+    assert months[0] == old_month
+    assert months[-1] == add_months(month_start(now), migration.MONTHS_AHEAD)
+    assert set(ProductObjectProcessLog.objects.values_list('id', flat=True)) == {old_log.id, new_log.id}
+
+    # Sekwencja id kontynuuje numerację starej tabeli
+    assert ProductObjectProcessLog.objects.create(product_object=product_object).id > new_log.id
+
+    plan = ProductObjectProcessLog.objects.filter(entry_time__gte=month_start(now)).explain()
+    assert partition_name(month_start(now)) in plan
+    assert partition_name(old_month) not in plan
+
+
+@pytest.mark.django_db
+def test_migration_on_populated_table_keeps_rows_and_orm_access(logged_object):
+    product_object = logged_object
+    now = timezone.now()
+    logs = {_log_at(product_object, now - timedelta(days=days)).id: days for days in (0, 15, 40, 100, 400)}
+    before = dict(ProductObjectProcessLog.objects.values_list('id', 'entry_time'))
+
+    _run(migration.partition_process_log)
+
+    assert is_partitioned()
+    assert dict(ProductObjectProcessLog.objects.values_list('id', 'entry_time')) == before
+    assert _primary_key() == "PRIMARY KEY (id, entry_time)"
+
+    # Model dalej traktuje id jako pk - odczyt, zapis i usuwanie po samym id trafiają w jeden wiersz
+    log = ProductObjectProcessLog.objects.get(pk=max(logs))
+    log.who_entry = "po migracji"
+    log.save()
+    assert ProductObjectProcessLog.objects.filter(who_entry="po migracji").count() == 1
+
+    # Klucze obce odtworzone - kasowanie obiektu dalej kaskadowo usuwa logi
+    ProductObject.objects.filter(pk=product_object.pk).delete()
+    assert ProductObjectProcessLog.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_migration_reverse_restores_plain_table(logged_object):
+    product_object = logged_object
+    now = timezone.now()
+    for days in (0, 40, 400):
+        _log_at(product_object, now - timedelta(days=days))
+    _run(migration.partition_process_log)
+    last = _log_at(product_object, now)
+    before = dict(ProductObjectProcessLog.objects.values_list('id', 'entry_time'))
+
+    _run(migration.unpartition_process_log)
+
+    assert not is_partitioned()
+    assert existing_partitions() == []
+    assert _primary_key() == "PRIMARY KEY (id)"
+    assert dict(ProductObjectProcessLog.objects.values_list('id', 'entry_time')) == before
+    assert ProductObjectProcessLog.objects.create(product_object=product_object).id > last.id
+
+    # Indeksy i klucze obce wracają pod tymi samymi nazwami
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM pg_indexes WHERE tablename = %s AND indexname = 'idx_log_object_time'",
+                       [ProductObjectProcessLog._meta.db_table])
+        assert cursor.fetchone()[0] == 1
+    ProductObject.objects.filter(pk=product_object.pk).delete()
+    assert ProductObjectProcessLog.objects.count() == 0
+
+    # Ponowne przejście do przodu działa na odtworzonej tabeli
+    _run(migration.partition_process_log)
+    assert is_partitioned()
+
+
+@pytest.mark.django_db
+def test_missing_partition_takes_rows_from_default(logged_object):
+    product_object = logged_object
+    _run(migration.partition_process_log)
+
+    # Poza partycjami założonymi przez migrację (bieżący miesiąc + MONTHS_AHEAD)
+    future = timezone.now() + timedelta(days=130)
+    _log_at(product_object, future)
+    assert _count(DEFAULT_PARTITION) == 1
+
+    created = ensure_partitions(months_ahead=6)
+
+    assert partition_name(month_start(future)) in created
+    assert _count(partition_name(month_start(future))) == 1
+    assert _count(DEFAULT_PARTITION) == 0
+    assert ensure_partitions(months_ahead=6) == []
+
+
+@pytest.mark.django_db
+def test_old_partitions_are_archived(logged_object, tmp_path):
+    product_object = logged_object
+    now = timezone.now()
+    old_month = add_months(month_start(now), -12)
+    older_month = add_months(old_month, -1)
+    old_log = _log_at(product_object, old_month + timedelta(days=1))
+    _log_at(product_object, older_month + timedelta(days=1))
+    _log_at(product_object, now)
+    _run(migration.partition_process_log)
+
+    archived = dict(archive_partitions(retention_months=12, current_time=now))
+
+    assert _count(archived[older_month]) == 1
+    assert old_month not in archived
+    assert ProductObjectProcessLog.objects.count() == 2
+
+    # Miesiąc spada poza okno retencji dopiero miesiąc później - wtedy trafia do pliku
+    archived_to_file = dict(archive_partitions(retention_months=11, current_time=now, archive_dir=tmp_path))
+    with gzip.open(archived_to_file[old_month], 'rt') as archive_file:
+        lines = archive_file.read().splitlines()
+    assert len(lines) == 2 and lines[1].startswith(f"{old_log.id},")
+    assert ProductObjectProcessLog.objects.count() == 1
@@ -0,0 +1,47 @@
+import pytest
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from base.models import Fixture, CounterSumFromLastMaint
+from base.views import CheckExceedCyclesLimit
+from checkprocess.views import AppKillStatusView
+from goldensample.models import EndCodeTimeFWK, LastResultFWK, MachineGoldensTime
+from goldensample.views import CheckGoldensFWK, MachineTimeStampView
+
+
+def test_machine_polling_views_are_async():
+    for view in (AppKillStatusView, MachineTimeStampView, CheckGoldensFWK, CheckExceedCyclesLimit):
+        assert view.view_is_async, view
+
+
+@pytest.mark.django_db
+def test_machine_timestamp_validates_and_blocks_stale_machine(api_client):
+    url = reverse('machine_validation')
+
+    assert api_client.post(url, {}, format="json").json() == {"machine_name": ["You need to provide machine_name"]}
+    assert api_client.post(url, {"machine_name": "FWK-1"}, format="json").json()["returnCode"] == 200
+
+    MachineGoldensTime.objects.filter(machine_name="FWK-1").update(date_time=timezone.now() - timedelta(hours=9))
+    # Maszyny wysyłają też zwykły formularz
+    assert api_client.post(url, {"machine_name": "FWK-1"}).json()["returnCode"] == 123
+
+
+@pytest.mark.django_db
+def test_check_goldens_first_cycle(api_client):
+    payload = {"sn": "PCB-1", "site": 1, "machine_id": "FWK-1", "internal_code": "A1"}
+
+    response = api_client.post(reverse('master-type-FWK'), payload, format="json")
+
+    assert response.status_code == 200
+    assert response.json() == {"comment": "To pierwszy cykl testowy i nalezy przetestowac wzorce", "result": False}
+    assert EndCodeTimeFWK.objects.filter(machine_id="FWK-1", site=1, endcode="A1").exists()
+    assert LastResultFWK.objects.get(machine_id="FWK-1").result is None
+
+
+@pytest.mark.django_db
+def test_cycles_limit(api_client):
+    url = reverse('limit-exceeded')
+    Fixture.objects.create(name="ICT-7", cycles_limit=10, counter_last_maint=CounterSumFromLastMaint.objects.create(counter=10))
+
+    assert api_client.post(url, {"fixture_name": "ICT-7"}, format="json").json() == {"fail": "Limit exceeded stop machine"}
+    assert api_client.post(url, {"fixture_name": "ICT-0"}, format="json").json() == {"error": "Fixture doesnt exist"}
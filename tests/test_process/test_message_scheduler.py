@@ -0,0 +1,29 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from checkprocess.services.message_scheduler import (schedule_stencil_warnings, claim_due_message, cancel_pending_messages,
+                                                      next_due_at)
+
+
+@pytest.mark.django_db
+def test_warnings_are_handed_out_in_due_order_once(place_process_factory, product_factory):
+    place = place_process_factory()
+    start = timezone.now()
+    schedule_stencil_warnings(place, product_factory(), start_time=start)
+
+    assert claim_due_message([place.id], start) is None
+    assert next_due_at([place.id]) == start + timedelta(hours=7, minutes=30)
+
+    later = start + timedelta(hours=9)
+    assert "7.5 godziny" in claim_due_message([place.id], later)
+    assert "8 godzin" in claim_due_message([place.id], later)
+    assert claim_due_message([place.id], later) is None
+
+
+@pytest.mark.django_db
+def test_cancel_drops_pending_messages(place_process_factory, product_factory):
+    place = place_process_factory()
+    schedule_stencil_warnings(place, product_factory())
+
+    assert cancel_pending_messages([place.id]) == 2
+    assert next_due_at([place.id]) is None
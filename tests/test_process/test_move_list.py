@@ -0,0 +1,158 @@
+import pytest
+from checkprocess.models import ConditionLog, ProductObject, ProductObjectProcessLog, LogFromMistake
+
+
+def _receive_setup(product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory, count):
+    product = product_factory()
+    process_source = product_process_factory(product=product, start=True)
+    process_target = product_process_factory(product=product, normal=True)
+    place = place_process_factory(process=process_target)
+    sub_product = sub_product_factory(product=product)
+    edge_factory(source=process_source, target=process_target)
+
+    objects = [
+        product_object_factory(product=product, sub_product=sub_product, current_process=process_source, full_sn=f"SN-LIST-{i}")
+        for i in range(count)
+    ]
+    return process_target, place, objects
+
+
+@pytest.mark.django_db
+def test_move_list_receive_happy_path(api_client, product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory):
+    process_target, place, objects = _receive_setup(
+        product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory, 3
+    )
+
+    payload = {
+        "full_sn": [obj.full_sn for obj in objects],
+        "place_name": place.name,
+        "movement_type": "receive",
+        "who": "51123",
+    }
+
+    response = api_client.post(f"/api/process/product-object/move-list/{process_target.id}/", payload, format="json")
+    assert response.status_code == 200, response.data
+    assert [item["full_sn"] for item in response.data] == payload["full_sn"]
+
+    for obj in ProductObject.objects.all():
+        assert obj.current_place == place
+        assert obj.current_process_id == process_target.id
+        assert obj.max_in_process is not None
+
+    assert ProductObjectProcessLog.objects.filter(movement_type="receive").count() == 3
+
+
+@pytest.mark.django_db
+def test_move_list_rejects_whole_batch_on_error(api_client, product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory):
+    process_target, place, objects = _receive_setup(
+        product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory, 2
+    )
+
+    payload = {
+        "full_sn": [objects[0].full_sn, "SN-DOES-NOT-EXIST"],
+        "place_name": place.name,
+        "movement_type": "receive",
+        "who": "51123",
+    }
+
+    response = api_client.post(f"/api/process/product-object/move-list/{process_target.id}/", payload, format="json")
+    assert response.status_code == 400
+    assert response.data["code"] == "object_does_not_exist"
+    assert response.data["results"][0]["full_sn"] == "SN-DOES-NOT-EXIST"
+
+    assert not ProductObject.objects.filter(current_place=place).exists()
+    assert not ProductObjectProcessLog.objects.exists()
+    assert LogFromMistake.objects.get().error_code == "object_does_not_exist"
+
+
+@pytest.mark.django_db
+def test_move_list_query_count_does_not_grow_with_batch(api_client, product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory, django_assert_max_num_queries):
+    process_target, place, objects = _receive_setup(
+        product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory, 20
+    )
+
+    payload = {
+        "full_sn": [obj.full_sn for obj in objects],
+        "place_name": place.name,
+        "movement_type": "receive",
+        "who": "51123",
+    }
+
+    with django_assert_max_num_queries(20):
+        response = api_client.post(f"/api/process/product-object/move-list/{process_target.id}/", payload, format="json")
+    assert response.status_code == 200, response.data
+
+
+@pytest.mark.django_db
+def test_move_list_moves_mother_with_children(api_client, product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory):
+    product = product_factory()
+    process = product_process_factory(product=product, normal=True, respect_fifo_rules=False)
+    place = place_process_factory(process=process)
+    sub_product = sub_product_factory(product=product)
+
+    mother = product_object_factory(product=product, sub_product=sub_product, current_process=process, current_place=place, full_sn="MOTHER-1", is_mother=True)
+    for i in range(3):
+        product_object_factory(product=product, sub_product=sub_product, current_process=process, current_place=place, full_sn=f"CHILD-{i}", mother_object=mother)
+
+    payload = {
+        "full_sn": ["MOTHER-1"],
+        "place_name": place.name,
+        "movement_type": "move",
+        "who": "51123",
+    }
+
+    response = api_client.post(f"/api/process/product-object/move-list/{process.id}/", payload, format="json")
+    assert response.status_code == 200, response.data
+
+    assert not ProductObject.objects.filter(current_place__isnull=False).exists()
+    assert ProductObject.objects.filter(mother_object=mother).count() == 3
+    assert ProductObjectProcessLog.objects.filter(movement_type="move", place=place).count() == 4
+
+
+@pytest.mark.django_db
+def test_move_list_receive_from_condition_follows_result(api_client, product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory):
+    product = product_factory()
+    process_condition = product_process_factory(product=product, condition=True)
+    process_pass = product_process_factory(product=product, normal=True, cond_path=True)
+    process_fail = product_process_factory(product=product, normal=True, cond_path=False)
+    place_pass = place_process_factory(process=process_pass)
+    place_fail = place_process_factory(process=process_fail)
+    edge_factory(source=process_condition, target=process_pass)
+    edge_factory(source=process_condition, target=process_fail)
+
+    sub_product = sub_product_factory(product=product)
+    obj = product_object_factory(product=product, sub_product=sub_product, current_process=process_condition, full_sn="SN-COND-1")
+    ConditionLog.objects.create(process=process_condition, product=obj, result=True)
+
+    payload = {"full_sn": ["SN-COND-1"], "movement_type": "receive", "who": "51123"}
+
+    response = api_client.post(f"/api/process/product-object/move-list/{process_fail.id}/", dict(payload, place_name=place_fail.name), format="json")
+    assert response.status_code == 400
+    assert response.data["code"] == "wrong_condition"
+
+    response = api_client.post(f"/api/process/product-object/move-list/{process_pass.id}/", dict(payload, place_name=place_pass.name), format="json")
+    assert response.status_code == 200, response.data
+    obj.refresh_from_db()
+    assert obj.current_place == place_pass
+
+
+@pytest.mark.django_db
+def test_move_list_trash_goes_through_single_scan_path(api_client, product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory):
+    product = product_factory()
+    process_source = product_process_factory(product=product, start=True)
+    process_trash = product_process_factory(product=product, trash=True)
+    place = place_process_factory(process=process_trash)
+    edge_factory(source=process_source, target=process_trash)
+    sub_product = sub_product_factory(product=product)
+    objects = [
+        product_object_factory(product=product, sub_product=sub_product, current_process=process_source, full_sn=f"SN-TRASH-{i}")
+        for i in range(2)
+    ]
+
+    payload = {"full_sn": [obj.full_sn for obj in objects], "place_name": place.name, "movement_type": "trash", "who": "51123"}
+    response = api_client.post(f"/api/process/product-object/move-list/{process_trash.id}/", payload, format="json")
+
+    assert response.status_code == 200, response.data
+    assert [item["full_sn"] for item in response.data] == payload["full_sn"]
+    assert ProductObject.objects.filter(end=True, current_place=place).count() == 2
+    assert ProductObjectProcessLog.objects.filter(movement_type="trash").count() == 2
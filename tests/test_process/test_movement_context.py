@@ -0,0 +1,73 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from checkprocess.services.graph_service import get_process_graph
+from checkprocess.services.movement_context import MovementContext
+from checkprocess.services.settings_service import get_process_settings
+from checkprocess.validation import ProcessMovementValidator, ValidationErrorWithCode
+
+
+@pytest.fixture
+def receive_setup(product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory):
+    product = product_factory()
+    process_source = product_process_factory(product=product, start=True)
+    process_target = product_process_factory(product=product, normal=True)
+    place = place_process_factory(process=process_target)
+    sub_product = sub_product_factory(product=product)
+    edge_factory(source=process_source, target=process_target)
+
+    mother = product_object_factory(product=product, sub_product=sub_product, current_process=process_source, full_sn="CARTON-CTX", is_mother=True)
+    product_object_factory(product=product, sub_product=sub_product, current_process=process_source, full_sn="JAR-CTX", mother_object=mother)
+    return process_target, place
+
+
+def _selects_from(queries, table):
+    return [query for query in queries if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']]
+
+
+@pytest.mark.django_db
+def test_context_resolves_relations_up_front(receive_setup, django_assert_num_queries):
+    process, place = receive_setup
+
+    with django_assert_num_queries(3):
+        context = MovementContext(process.id, place.name).load(["CARTON-CTX", "JAR-CTX"])
+
+    with django_assert_num_queries(0):
+        assert context.place.process == context.process == process
+        assert context.process.respect_fifo_rules is not None
+        assert context.place.group is None
+        carton = context.get_object("CARTON-CTX")
+        assert carton.current_process.label
+        assert carton.sub_product.name
+        assert [child.full_sn for child in carton.child_object.all()] == ["JAR-CTX"]
+        assert context.get_object("JAR-CTX").mother_object.full_sn == "CARTON-CTX"
+
+
+@pytest.mark.django_db
+def test_receive_loads_process_place_and_object_once(api_client, receive_setup):
+    process, place = receive_setup
+    payload = {"full_sn": "CARTON-CTX", "place_name": place.name, "movement_type": "receive", "who": "51123"}
+    # Graf i ustawienia mają własny cache - liczymy tylko ładowanie procesu, miejsca i obiektu
+    get_process_graph(process.product_id)
+    get_process_settings(process.id)
+
+    with CaptureQueriesContext(connection) as captured:
+        response = api_client.post(f"/api/process/product-object/move/{process.id}/", payload, format="json")
+
+    assert response.status_code == 200, response.data
+    assert len(_selects_from(captured.captured_queries, "checkprocess_place")) == 1
+    assert len(_selects_from(captured.captured_queries, "checkprocess_productprocess")) == 0
+    # Obiekt z relacjami + dzieci (prefetch), bez ponownego ładowania w widoku
+    assert len(_selects_from(captured.captured_queries, "checkprocess_productobject")) == 2
+
+
+@pytest.mark.django_db
+def test_validator_reports_missing_place_from_context(receive_setup):
+    process, place = receive_setup
+    validator = ProcessMovementValidator(process.id, "CARTON-CTX", "NIE-MA-TAKIEGO", "receive", "51123")
+
+    with pytest.raises(ValidationErrorWithCode) as error:
+        validator.run()
+
+    assert error.value.code == 'place_not_found'
+    assert validator.process == process
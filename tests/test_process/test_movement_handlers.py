@@ -0,0 +1,44 @@
+import pytest
+from checkprocess.models import ProductObject, ProductObjectProcessLog
+from checkprocess.services.movement_service import MovementHandler
+
+
+def _carton(product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory, children):
+    product = product_factory()
+    process = product_process_factory(product=product, normal=True)
+    place = place_process_factory(process=process)
+    sub_product = sub_product_factory(product=product)
+
+    mother = product_object_factory(product=product, sub_product=sub_product, current_process=process, current_place=place, full_sn="CARTON-1", is_mother=True)
+    for i in range(children):
+        product_object_factory(product=product, sub_product=sub_product, current_process=process, current_place=place, full_sn=f"JAR-{i}", mother_object=mother)
+    return process, place, mother
+
+
+@pytest.mark.django_db
+def test_move_carton_costs_constant_statements(product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory, django_assert_max_num_queries):
+    process, place, mother = _carton(product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory, 12)
+
+    handler = MovementHandler.get_handler('move', mother, place, process, '51123')
+    with django_assert_max_num_queries(8):
+        handler.execute()
+
+    assert not ProductObject.objects.filter(current_place__isnull=False).exists()
+    assert ProductObject.objects.exclude(quranteen_time=None).count() == 13
+    assert ProductObjectProcessLog.objects.filter(movement_type='move', place=place).count() == 13
+
+
+@pytest.mark.django_db
+def test_move_last_child_alone_ends_mother(product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory):
+    process, place, mother = _carton(product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory, 1)
+    child = ProductObject.objects.get(full_sn="JAR-0")
+
+    MovementHandler.get_handler('move', child, place, process, '51123').execute()
+
+    child.refresh_from_db()
+    mother.refresh_from_db()
+    assert child.mother_object is None
+    assert child.ex_mother == "CARTON-1"
+    assert mother.end is True
+    assert mother.current_place is None
+    assert mother.current_process is None
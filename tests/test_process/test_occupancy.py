@@ -0,0 +1,91 @@
+import pytest
+from django.core.management import call_command
+from checkprocess.models import PlaceOccupancy, ProductObject
+from checkprocess.services.movement_service import MovementHandler
+from checkprocess.services.occupancy_service import count_occupancy, place_is_busy, reconcile_occupancy
+
+
+@pytest.fixture
+def warehouse(product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory):
+    product = product_factory()
+    process = product_process_factory(product=product, normal=True)
+    source = place_process_factory(process=process, name="REGAL-1")
+    target = place_process_factory(process=process, name="REGAL-2")
+    alpha = sub_product_factory(product=product, name="Alpha")
+    beta = sub_product_factory(product=product, name="Beta")
+
+    mother = product_object_factory(product=product, sub_product=alpha, current_process=process, current_place=source, full_sn="CARTON-1", is_mother=True)
+    for i in range(3):
+        product_object_factory(product=product, sub_product=alpha, current_process=process, current_place=source, full_sn=f"JAR-{i}", mother_object=mother)
+    product_object_factory(product=product, sub_product=beta, current_process=process, current_place=source, full_sn="BETA-1")
+    return process, source, target, mother
+
+
+def _stored():
+    return {
+        (process_id, place_id, sub_product_id): quantity
+        for process_id, place_id, sub_product_id, quantity in PlaceOccupancy.objects.filter(quantity__gt=0).values_list(
+            'process_id', 'place_id', 'sub_product_id', 'quantity'
+        )
+    }
+
+
+@pytest.mark.django_db
+def test_counters_follow_moves_receives_and_trash(warehouse):
+    process, source, target, mother = warehouse
+    assert _stored() == count_occupancy()
+
+    MovementHandler.get_handler('move', ProductObject.objects.get(pk=mother.pk), None, process, '51123').execute()
+    assert _stored() == count_occupancy()
+    assert PlaceOccupancy.objects.get(place=source, sub_product__name="Beta").quantity == 1
+
+    MovementHandler.get_handler('receive', ProductObject.objects.get(pk=mother.pk), target, process, '51123').execute()
+    assert PlaceOccupancy.objects.get(place=target, sub_product__name="Alpha").quantity == 4
+
+    MovementHandler.get_handler('trash', ProductObject.objects.get(full_sn="BETA-1"), source, process, '51123').execute()
+    assert _stored() == count_occupancy()
+    assert not place_is_busy(source.id)
+    assert place_is_busy(target.id)
+
+
+@pytest.mark.django_db
+def test_counter_endpoint_reads_occupancy(api_client, warehouse):
+    process, source, target, mother = warehouse
+
+    response = api_client.get("/api/process/counter-products/", {"product_id": process.product_id, "process_uuid": str(process.id)})
+
+    assert response.status_code == 200
+    assert response.data == {"Alpha": 4, "Beta": 1}
+
+
+@pytest.mark.django_db
+def test_counters_follow_objects_loaded_with_deferred_fields(warehouse):
+    process, source, target, mother = warehouse
+
+    beta = ProductObject.objects.only('id', 'full_sn').get(full_sn="BETA-1")
+    beta.current_place = target
+    beta.save()
+    assert _stored() == count_occupancy()
+
+    jar = ProductObject.objects.defer('end').get(full_sn="JAR-0")
+    jar.end = True
+    jar.save()
+    assert _stored() == count_occupancy()
+
+    ProductObject.objects.only('id').get(full_sn="JAR-1").delete()
+    assert _stored() == count_occupancy()
+
+
+@pytest.mark.django_db
+def test_reconcile_rebuilds_drifted_counters(warehouse):
+    process, source, target, mother = warehouse
+    PlaceOccupancy.objects.filter(place=source, sub_product__name="Alpha").update(quantity=40)
+    ProductObject.objects.filter(full_sn="BETA-1").update(current_place=target)
+
+    drift = reconcile_occupancy(fix=False)
+    assert len(drift) == 3
+    assert PlaceOccupancy.objects.get(place=source, sub_product__name="Alpha").quantity == 40
+
+    call_command('reconcile_occupancy')
+    assert _stored() == count_occupancy()
+    assert reconcile_occupancy(fix=False) == []
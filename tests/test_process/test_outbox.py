@@ -0,0 +1,85 @@
+import pytest
+import requests
+from datetime import timedelta
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from checkprocess.outbox import POKE_KIND
+from checkprocess.utils import poke_process
+from global_app.models import OutboxMessage, MailingGroup, UserToMail
+from global_app.outbox import OutboxWorker, claim_batch, enqueue, set_target_limit, OUTBOX_LEASE, OUTBOX_MAX_ATTEMPTS
+from global_app.utils import send_mass_email
+
+
+@pytest.mark.django_db
+def test_rolled_back_change_drops_its_message():
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            poke_process(7)
+            raise RuntimeError
+
+    assert not OutboxMessage.objects.exists()
+
+
+@pytest.mark.django_db
+@patch('checkprocess.outbox.requests.get')
+def test_pokes_for_same_process_share_one_call(mock_get):
+    mock_get.return_value.status_code = 200
+    poke_process(7)
+    poke_process(7)
+
+    assert OutboxWorker(workers=1).run_once() == 2
+
+    assert mock_get.call_count == 1
+    assert OutboxMessage.objects.filter(status=OutboxMessage.STATUS_SENT).count() == 2
+
+
+@pytest.mark.django_db
+@patch('checkprocess.outbox.requests.get', side_effect=requests.exceptions.ConnectionError("down"))
+def test_failed_poke_backs_off_and_finally_fails(mock_get):
+    message = poke_process(7)
+    worker = OutboxWorker(workers=1)
+
+    worker.run_once()
+    message.refresh_from_db()
+    assert message.status == OutboxMessage.STATUS_PENDING
+    assert message.attempts == 1
+    assert message.available_at > timezone.now()
+    assert "down" in message.last_error
+
+    # Przed końcem backoffu wiadomość nie jest brana ponownie
+    assert worker.run_once() == 0
+
+    OutboxMessage.objects.filter(id=message.id).update(attempts=OUTBOX_MAX_ATTEMPTS - 1, available_at=timezone.now())
+    worker.run_once()
+    message.refresh_from_db()
+    assert message.status == OutboxMessage.STATUS_FAILED
+
+
+@pytest.mark.django_db
+def test_target_limit_caps_messages_in_flight():
+    set_target_limit('slow-target', 2)
+    for _ in range(5):
+        enqueue(POKE_KIND, 'slow-target', {'process_id': 1})
+
+    assert len(claim_batch()) == 2
+    assert claim_batch() == []
+
+    # Dzierżawa martwego workera wygasa - wiadomości wracają do kolejki
+    assert len(claim_batch(current_time=timezone.now() + OUTBOX_LEASE + timedelta(seconds=1))) == 2
+
+
+@pytest.mark.django_db
+def test_group_emails_are_sent_by_worker(mailoutbox):
+    group = MailingGroup.objects.create(name='SpeaGroup')
+    UserToMail.objects.create(mail_group=group, email='a@example.com')
+    UserToMail.objects.create(mail_group=group, email='b@example.com')
+
+    send_mass_email('SpeaGroup', 'Temat', 'Treść')
+    assert mailoutbox == []
+
+    call_command('drain_outbox', workers=1)
+
+    assert sorted(mail.to[0] for mail in mailoutbox) == ['a@example.com', 'b@example.com']
+    assert OutboxMessage.objects.get().status == OutboxMessage.STATUS_SENT
@@ -0,0 +1,46 @@
+import pytest
+from datetime import date
+from rest_framework.exceptions import ValidationError
+from checkprocess.benchmarks.parsers_benchmark import CORPUS
+from checkprocess.parsers import detect_parser_type, get_parser, parse_sn, parse_many
+
+
+@pytest.mark.parametrize("full_sn, parser_type", CORPUS)
+def test_corpus_is_detected(full_sn, parser_type):
+    assert detect_parser_type(full_sn) == parser_type
+
+
+def test_parsers_are_singletons():
+    assert get_parser('alpha_parser') is get_parser('alpha_parser')
+
+    with pytest.raises(ValidationError):
+        get_parser('undefined')
+
+
+def test_label_fields_and_carton():
+    sub_product, serial_number, production_date, expire_date, serial_type, q_code = parse_sn(
+        "(V)AIM(P)40900900(S)2503AH10-0417(D)20250312(E)20250912(Q)6 KG"
+    )
+
+    assert (sub_product, serial_number, serial_type, q_code) == ('AIM-H10', '2503AH10-0417', 'karton', '6 KG')
+    assert (production_date, expire_date) == (date(2025, 3, 12), date(2025, 9, 12))
+
+
+def test_parse_many_reports_errors_per_item():
+    results = parse_many(["[)>@06@1P262298@Q12@@", "120325D.520-0012"])
+
+    assert results[0][1] is None and "3S" in results[0][2]
+    assert results[1][1][1] == "520mm DEK 120325D.520-0012"
+
+
+def test_parse_many_keeps_going_after_unknown_format_and_non_text():
+    results = parse_many(["NIEZNANY", ["S123"], "120325D.520-0012"])
+
+    assert results[0][1] is None and "Nieobsługiwany typ parsera" in results[0][2]
+    assert results[1][1] is None and results[1][2] == "SN musi być tekstem."
+    assert results[2][1] is not None
+
+
+def test_parse_sn_rejects_non_text_before_cache():
+    with pytest.raises(ValidationError):
+        parse_sn(["S123"])
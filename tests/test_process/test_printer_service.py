@@ -0,0 +1,86 @@
+import sqlite3
+import pytest
+from checkprocess.custom_validators import ValidationErrorWithCode
+from checkprocess.models import OneToOneMap
+from checkprocess.services.printer_service import PrinterCardConnector
+
+
+@pytest.fixture
+def printer_db(tmp_path):
+    path = tmp_path / "printers.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE printers (id INTEGER, name TEXT, line TEXT, printer TEXT, models TEXT)")
+    conn.executemany("INSERT INTO printers VALUES (?, ?, ?, ?, ?)", [
+        (1, "1001_str2", "SMT 1", "P-OLD", "LF(AIM-H10-SAC305)"),
+        (2, "1001", "SMT 1", "15007535", "LF(AIM-H10-SAC305); LF(OM-338-PT)"),
+        (3, "1002_str1", "SMT 2", "15007536", "LF(OM-338-PT)"),
+    ])
+    conn.commit()
+    conn.close()
+
+    connects = []
+
+    def connect():
+        connects.append(1)
+        return sqlite3.connect(path, check_same_thread=False)
+
+    return connect, connects
+
+
+@pytest.fixture
+def mapping(db):
+    OneToOneMap.objects.create(s_input="LF(AIM-H10-SAC305)", s_output="AIM-H10")
+    OneToOneMap.objects.create(s_input="LF(OM-338-PT)", s_output="OM-338")
+
+
+def test_card_lookup_reuses_connection_and_cache(printer_db, mapping, django_assert_num_queries):
+    connect, connects = printer_db
+    connector = PrinterCardConnector(connect, ttl=60)
+
+    assert connector.printer_info(1001) == (["AIM-H10", "OM-338"], "15007535")
+    assert connector.printer_info(1002) == (["OM-338"], "15007536")
+
+    # Powtórzona karta nie pyta ani SQL Servera, ani bazy o mapowanie
+    with django_assert_num_queries(0):
+        assert connector.printer_info(1001) == (["AIM-H10", "OM-338"], "15007535")
+
+    assert len(connects) == 1
+
+
+def test_unknown_card_is_cached_negatively(printer_db, mapping):
+    connect, connects = printer_db
+    connector = PrinterCardConnector(connect, negative_ttl=60)
+
+    for _ in range(3):
+        with pytest.raises(ValidationErrorWithCode) as exc:
+            connector.printer_info(9999)
+        assert exc.value.code == "printer_data_not_found"
+
+    assert connector.cards["9999"][1] is None
+
+
+def test_sql_error_drops_connection(printer_db, mapping):
+    connect, connects = printer_db
+    connector = PrinterCardConnector(connect)
+    connector.query = "SELECT * FROM missing_table WHERE name IN (?, ?, ?)"
+
+    with pytest.raises(ValidationErrorWithCode) as exc:
+        connector.printer_info(1001)
+    assert exc.value.code == "external_db_error"
+    assert connector.pool.idle.empty()
+
+
+@pytest.mark.django_db
+def test_mapping_change_is_picked_up(printer_db, django_capture_on_commit_callbacks):
+    connect, connects = printer_db
+    connector = PrinterCardConnector(connect)
+    OneToOneMap.objects.create(s_input="LF(OM-338-PT)", s_output="OM-338")
+
+    with pytest.raises(ValidationErrorWithCode) as exc:
+        connector.printer_info(1001)
+    assert exc.value.code == "mapping_missing"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        OneToOneMap.objects.create(s_input="LF(AIM-H10-SAC305)", s_output="AIM-H10")
+
+    assert connector.printer_info(1001) == (["AIM-H10", "OM-338"], "15007535")
@@ -0,0 +1,47 @@
+import pytest
+from django.contrib.auth.models import Permission, User
+from checkprocess.models import ProductObject
+
+
+URL = "/api/process/admin-objects/"
+
+
+@pytest.fixture
+def admin_client(api_client, db):
+    user = User.objects.create_user(username="admin-search")
+    user.user_permissions.add(Permission.objects.get(codename="can_see_admin_page"))
+    api_client.force_authenticate(user)
+    return api_client
+
+
+@pytest.fixture
+def stencils(product_factory, sub_product_factory, product_object_factory):
+    product = product_factory()
+    sub_product = sub_product_factory(product=product)
+    for full_sn, place in [("XSTENCIL-77", "Szafa A"), ("STENCIL-7", "Szafa B"), ("STENCIL-77", "Szafa C"), ("INNY-1", "stencil-7 obok")]:
+        product_object_factory(product=product, sub_product=sub_product, full_sn=full_sn, sito_basic_unnamed_place=place)
+
+
+@pytest.mark.django_db
+def test_search_document_follows_source_fields(stencils):
+    product_object = ProductObject.objects.get(full_sn="STENCIL-7")
+    assert "stencil-7" in product_object.search_document
+    assert "szafa b" in product_object.search_document
+
+
+@pytest.mark.django_db
+def test_exact_full_sn_ranked_first_then_prefix(admin_client, stencils):
+    response = admin_client.get(URL, {"search": "stencil-7"})
+
+    assert response.status_code == 200
+    names = [row["full_sn"] for row in response.data["results"]]
+    assert names[:2] == ["STENCIL-7", "STENCIL-77"]
+    assert set(names[2:]) == {"XSTENCIL-77", "INNY-1"}
+
+
+@pytest.mark.django_db
+def test_every_term_must_match(admin_client, stencils):
+    response = admin_client.get(URL, {"search": "stencil szafa"})
+
+    names = {row["full_sn"] for row in response.data["results"]}
+    assert names == {"XSTENCIL-77", "STENCIL-7", "STENCIL-77"}
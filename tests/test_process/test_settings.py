@@ -0,0 +1,40 @@
+import pytest
+from checkprocess.services.settings_service import get_process_settings
+
+
+@pytest.mark.django_db
+def test_settings_merge_defaults_before_starts(product_process_factory):
+    process = product_process_factory(normal=True)
+
+    settings = get_process_settings(process.id)
+
+    assert settings.has_defaults
+    assert not settings.has_starts
+    assert settings.has_any
+    assert settings.quranteen_time == 5
+    assert settings.quranteen_time_receive == 5
+    assert settings.how_much_days_exp_date == 5
+    assert settings.how_much_hours_max_working == 5
+
+
+@pytest.mark.django_db
+def test_settings_without_any_config(product_process_factory):
+    process = product_process_factory(end=True)
+
+    settings = get_process_settings(process.id)
+
+    assert not settings.has_any
+    assert settings.quranteen_time is None
+    assert settings.how_much_hours_max_working is None
+
+
+@pytest.mark.django_db
+def test_settings_invalidated_on_save(product_process_factory, django_capture_on_commit_callbacks):
+    process = product_process_factory(normal=True)
+    assert get_process_settings(process.id).quranteen_time == 5
+
+    with django_capture_on_commit_callbacks(execute=True):
+        process.defaults.quranteen_time = 12
+        process.defaults.save()
+
+    assert get_process_settings(process.id).quranteen_time == 12
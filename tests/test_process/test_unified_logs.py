@@ -0,0 +1,76 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import Permission, User
+from django.utils import timezone
+from checkprocess.models import LogFromMistake, ProductObjectProcessLog
+
+
+@pytest.fixture
+def admin_client(api_client, db):
+    user = User.objects.create_user(username="admin-logs")
+    user.user_permissions.add(*Permission.objects.filter(codename__in=["can_see_admin_page", "can_update_object_admin_page"]))
+    api_client.force_authenticate(user)
+    return api_client
+
+
+@pytest.fixture
+def place_with_logs(product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory):
+    product = product_factory()
+    process = product_process_factory(product=product)
+    place = place_process_factory(process=process)
+    product_object = product_object_factory(product=product, sub_product=sub_product_factory(product=product))
+
+    now = timezone.now()
+    for minute in range(5):
+        log = ProductObjectProcessLog.objects.create(product_object=product_object, process=process, place=place, movement_type='move')
+        ProductObjectProcessLog.objects.filter(id=log.id).update(entry_time=now - timedelta(minutes=minute))
+        LogFromMistake.objects.create(
+            process=process, place=place, product_sn=product_object.full_sn, error_message="Błąd", error_code="wrong_place",
+            created_at=now - timedelta(minutes=minute)
+        )
+    return place
+
+
+def _walk(client, url):
+    rows = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert "count" not in response.data
+        rows.extend(response.data["results"])
+        url = response.data["next"]
+        assert response.data["has_more"] == bool(url)
+    return rows
+
+
+def test_cursor_pages_cover_union_in_key_order(admin_client, place_with_logs):
+    rows = _walk(admin_client, f"/api/process/place/{place_with_logs.id}/admin-logs/?page_size=3")
+
+    keys = [(row["date"], row["log_type"], row["id"]) for row in rows]
+    assert len(keys) == 10
+    assert len(set(keys)) == 10
+    # Ten sam czas w obu tabelach - PROCESS przed MISTAKE, bez zgubionych i zdublowanych wierszy na granicy strony
+    assert [row["log_type"] for row in rows[:2]] == ["PROCESS", "MISTAKE"]
+    assert keys == sorted(keys, key=lambda key: (key[0], key[1], key[2]), reverse=True)
+
+
+def test_deep_page_bounds_both_branches(admin_client, place_with_logs, django_assert_max_num_queries):
+    first = admin_client.get(f"/api/process/place/{place_with_logs.id}/admin-logs/?page_size=4")
+
+    with django_assert_max_num_queries(3):
+        second = admin_client.get(first.data["next"])
+
+    assert len(second.data["results"]) == 4
+    assert second.data["results"][0]["date"] < first.data["results"][-1]["date"]
+
+
+def test_invalid_cursor_is_rejected(admin_client, place_with_logs):
+    response = admin_client.get(f"/api/process/place/{place_with_logs.id}/admin-logs/?cursor=zepsuty")
+    assert response.status_code == 404
+
+
+def test_admin_objects_keep_page_number_pagination(admin_client, place_with_logs):
+    response = admin_client.get("/api/process/admin-objects/?page_size=1")
+
+    assert response.status_code == 200
+    assert response.data["count"] == 1
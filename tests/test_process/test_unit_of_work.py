@@ -0,0 +1,77 @@
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from checkprocess.models import AppToKill, PlaceGroupToAppKill, ProductObject
+from checkprocess.services.heartbeat_service import record_heartbeat
+from checkprocess.services.movement_service import MovementHandler
+from checkprocess.services.unit_of_work import unit_of_work_stats
+
+
+@pytest.fixture
+def killing_line(product_factory, product_process_factory, place_process_factory, sub_product_factory, edge_factory, product_object_factory):
+    product = product_factory()
+    process_source = product_process_factory(product=product, start=True)
+    process_target = product_process_factory(product=product, normal=True, killing_app=True)
+    group = PlaceGroupToAppKill.objects.create(name="SMT 21", last_check=timezone.now() - timedelta(hours=1))
+    place = place_process_factory(process=process_target, group=group)
+    kill_flag = AppToKill.objects.create(line_name=place)
+    edge_factory(source=process_source, target=process_target)
+
+    sub_product = sub_product_factory(product=product)
+    product_object_factory(product=product, sub_product=sub_product, current_process=process_source, full_sn="PASTE-UOW")
+    return process_target, place, kill_flag
+
+
+def _updates_of(queries, table):
+    return [query for query in queries if query['sql'].startswith(f'UPDATE "{table}"')]
+
+
+def _receive(api_client, process, place):
+    payload = {"full_sn": "PASTE-UOW", "place_name": place.name, "movement_type": "receive", "who": "51123"}
+    return api_client.post(f"/api/process/product-object/move/{process.id}/", payload, format="json")
+
+
+@pytest.mark.django_db
+def test_kill_flag_round_trip_is_not_written(api_client, killing_line):
+    process, place, kill_flag = killing_line
+    record_heartbeat(place.group_id)
+    before = unit_of_work_stats()
+
+    with CaptureQueriesContext(connection) as captured:
+        response = _receive(api_client, process, place)
+
+    assert response.status_code == 200, response.data
+    assert _updates_of(captured.captured_queries, "checkprocess_apptokill") == []
+    kill_flag.refresh_from_db()
+    assert kill_flag.killing_flag is False
+    assert unit_of_work_stats()['saved'] - before['saved'] == 2
+
+
+@pytest.mark.django_db
+def test_kill_flag_stays_set_when_receive_fails(api_client, killing_line):
+    process, place, kill_flag = killing_line
+
+    # Brak heartbeatu linii - walidacja pada po ustawieniu flagi
+    response = _receive(api_client, process, place)
+
+    assert response.data["code"] == "app_does_not_reply"
+    kill_flag.refresh_from_db()
+    assert kill_flag.killing_flag is True
+
+
+@pytest.mark.django_db
+def test_trash_writes_object_once(product_factory, product_process_factory, place_process_factory, sub_product_factory, product_object_factory):
+    product = product_factory()
+    process = product_process_factory(product=product, trash=True)
+    place = place_process_factory(process=process)
+    product_object = product_object_factory(product=product, sub_product=sub_product_factory(product=product), full_sn="TRASH-UOW")
+
+    handler = MovementHandler.get_handler('trash', ProductObject.objects.get(pk=product_object.pk), place, process, '51123')
+    with CaptureQueriesContext(connection) as captured:
+        handler.execute()
+
+    assert len(_updates_of(captured.captured_queries, "checkprocess_productobject")) == 1
+    product_object.refresh_from_db()
+    assert product_object.end and product_object.current_place == place